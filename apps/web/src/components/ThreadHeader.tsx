@@ -100,6 +100,19 @@ export function ThreadHeader({
                 worktree
               </span>
             )}
+            {thread.worktreePending && (
+              <span className="text-[10px] px-1 bg-blue-500/20 rounded" title="Creating isolated worktree">
+                worktree…
+              </span>
+            )}
+            {thread.worktreeError && (
+              <span
+                className="text-[10px] px-1 bg-red-500/20 text-red-600 rounded"
+                title={`No isolated worktree: ${thread.worktreeError}`}
+              >
+                no worktree
+              </span>
+            )}
           </span>
         )}
 
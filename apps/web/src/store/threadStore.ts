@@ -878,6 +878,34 @@ export const useThreadStore = create<ThreadState>((set, get) => ({
       }
     });
 
+    eventSource.addEventListener('worktree_ready', (event) => {
+      updateLastEventId(event);
+      const data = safeJsonParse<{ thread?: Thread }>(event.data, {});
+      if (data.thread) {
+        const { workDir, gitBranch, isWorktree, worktreeBranch } = data.thread;
+        set((state) => ({
+          threads: state.threads.map((t) =>
+            t.id === data.thread!.id
+              ? { ...t, workDir, gitBranch, isWorktree, worktreeBranch, worktreePending: false, worktreeError: null }
+              : t
+          ),
+        }));
+      }
+    });
+
+    eventSource.addEventListener('worktree_failed', (event) => {
+      updateLastEventId(event);
+      const data = safeJsonParse<{ threadId?: string; error?: string | null }>(event.data, {});
+      if (data.threadId) {
+        const worktreeError = data.error || 'Worktree creation failed';
+        set((state) => ({
+          threads: state.threads.map((t) =>
+            t.id === data.threadId ? { ...t, worktreePending: false, worktreeError } : t
+          ),
+        }));
+      }
+    });
+
     eventSource.addEventListener('subthread_status', (event) => {
       updateLastEventId(event);
       const data = safeJsonParse<{ threadId?: string; status?: ThreadStatus; title?: string }>(event.data, {});
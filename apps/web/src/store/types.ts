@@ -38,6 +38,10 @@ export interface Thread {
   gitRepo: string | null;
   isWorktree: boolean;
   worktreeBranch: string | null;
+  // Sub-thread worktree still being created in the background (from thread_created)
+  worktreePending?: boolean;
+  // Why the background worktree could not be created (thread runs in the parent's checkout)
+  worktreeError?: string | null;
   archivedAt: string | null;
   createdAt: string;
   updatedAt: string;
@@ -15,6 +15,9 @@ Architecture:
     core.py (run_agent)
 """
 
+from collections.abc import Callable
+from typing import Any
+
 # Re-export everything for backward compatibility
 from mainthread.agents.core import (
     AgentMessage,
@@ -38,7 +41,21 @@ from mainthread.agents.tools import (
     create_spawn_thread_tool,
 )
 
-# Legacy callback registration functions (for backward compatibility with server.py)
+
+def register_agent_callbacks(**services: Callable[..., Any]) -> None:
+    """Register server callbacks with the service registry in one call.
+
+    Keyword names are ServiceRegistry fields, e.g. create_thread=...,
+    broadcast_question=....
+    """
+    registry = get_registry()
+    for name, callback in services.items():
+        if name.startswith("_") or not hasattr(registry, name):
+            raise TypeError(f"Unknown agent service: {name}")
+        setattr(registry, name, callback)
+
+
+# Legacy callback registration functions (for backward compatibility)
 # These now wrap the service registry
 
 
@@ -126,6 +143,7 @@ __all__ = [
     "create_send_to_thread_tool",
     "create_signal_status_tool",
     "create_spawn_thread_tool",
+    "register_agent_callbacks",
     # Legacy compatibility
     "register_create_thread_callback",
     "register_broadcast_question_callback",
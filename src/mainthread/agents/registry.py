@@ -7,7 +7,7 @@ can query for services they need.
 import asyncio
 import logging
 import time
-from collections.abc import Awaitable, Callable
+from collections.abc import Awaitable, Callable, Coroutine
 from dataclasses import dataclass, field
 from typing import Any
 
@@ -51,6 +51,10 @@ class ServiceRegistry:
     message_rate_limit: int = 5  # Max messages per minute per source thread
     message_window: float = 60.0  # Window in seconds
 
+    # Strong references to fire-and-forget tasks; the event loop only keeps
+    # weak ones, so an untracked task can be garbage collected mid-run
+    _background_tasks: set[asyncio.Task[Any]] = field(default_factory=set)
+
     def reset(self) -> None:
         """Reset all state for hot reload compatibility."""
         self._pending_questions = {}
@@ -59,6 +63,20 @@ class ServiceRegistry:
         self._rate_limit_lock = asyncio.Lock()
         logger.info("Service registry state reset for new event loop")
 
+    def spawn_background(
+        self, coro: Coroutine[Any, Any, Any], description: str
+    ) -> asyncio.Task[Any]:
+        """Run a coroutine as a tracked fire-and-forget task.
+
+        The task is kept alive until it finishes, and a failure is logged
+        with the given description.
+        """
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        task.add_done_callback(lambda t: _log_task_failure(t, description))
+        return task
+
     async def set_pending_answer(self, thread_id: str, answers: dict[str, str]) -> None:
         """Set the answer for a pending question (thread-safe)."""
         async with self._pending_questions_lock:
@@ -121,6 +139,12 @@ class ServiceRegistry:
             return True, ""
 
 
+def _log_task_failure(task: asyncio.Task[Any], description: str) -> None:
+    """Done callback: log the exception a background task ended with, if any."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"{description} failed: {task.exception()}")
+
+
 # Global singleton instance
 _registry: ServiceRegistry | None = None
 
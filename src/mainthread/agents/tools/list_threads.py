@@ -34,8 +34,8 @@ def create_list_threads_tool():
                     else " (main thread)"
                 )
                 status = t.get("status", "unknown")
-                msg_count = len(t.get("messages", []))
-                archived_info = f", Archived: {t['archived_at']}" if t.get("archived_at") else ""
+                msg_count = t.get("messageCount", 0)
+                archived_info = f", Archived: {t['archivedAt']}" if t.get("archivedAt") else ""
                 thread_info.append(
                     f"- {t['title']} (ID: {t['id']}){parent_info}\n"
                     f"  Status: {status}, Messages: {msg_count}{archived_info}"
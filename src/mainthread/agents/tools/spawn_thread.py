@@ -101,6 +101,11 @@ def create_spawn_thread_tool(
             if worktree_info.get("success"):
                 branch = new_thread.get("worktreeBranch", "unknown")
                 worktree_msg = f" Created in isolated worktree on branch `{branch}`."
+            elif worktree_info.get("pending"):
+                worktree_msg = (
+                    " An isolated worktree is being created; the sub-thread runs in it once"
+                    " ready. You will be notified if creation fails."
+                )
             elif worktree_info.get("error"):
                 worktree_msg = f" (Worktree creation skipped: {worktree_info['error']})"
 
@@ -113,11 +118,7 @@ def create_spawn_thread_tool(
                         # Skip adding message since we already added it above
                         await registry.run_thread(new_thread["id"], initial_message, skip_add_message=True)
 
-                    task = asyncio.create_task(delayed_run())
-                    task.add_done_callback(
-                        lambda t: logger.error(f"SpawnThread background task failed: {t.exception()}")
-                        if t.exception() else None
-                    )
+                    registry.spawn_background(delayed_run(), "SpawnThread background task")
                 # Include thread_id in JSON format at end of text for server to parse
                 return {
                     "content": [
@@ -127,7 +127,7 @@ def stats() -> None:
         typer.echo("No database found.")
         return
 
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         # Count threads
         cursor = conn.execute("SELECT COUNT(*) FROM threads")
         thread_count = cursor.fetchone()[0]
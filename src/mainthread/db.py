@@ -1,15 +1,22 @@
 """SQLite database operations for MainThread."""
 
+import atexit
+import json
+import logging
 import os
 import shutil
 import sqlite3
+import threading
 import uuid
+import zlib
 from collections.abc import Iterator
 from contextlib import contextmanager
 from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any
 
+logger = logging.getLogger(__name__)
+
 
 def _get_db_path() -> Path:
     """Get the database path, migrating from old location if needed.
@@ -44,29 +51,179 @@ def _get_db_path() -> Path:
 
 DB_PATH = _get_db_path()
 
+# SQL expression for thread timestamps, generated inside SQLite instead of
+# formatting datetime.now() in Python for every write. Matches the stored
+# datetime.now().isoformat() format (naive local time), at millisecond precision.
+_SQL_NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')"
+
 VALID_ROLES = {"user", "assistant", "system"}
 VALID_STATUSES = {"active", "pending", "running", "needs_attention", "done", "new_message"}
 
 
-@contextmanager
-def get_db() -> Iterator[sqlite3.Connection]:
-    """Get a database connection with proper cleanup."""
-    conn = sqlite3.connect(str(DB_PATH))
+# Per-connection tuning. journal_mode=WAL is persistent and set once in
+# init_database(); the rest must be applied to every new connection.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA synchronous = NORMAL",  # Safe under WAL, avoids an fsync per commit
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",  # 64 MiB page cache
+    "PRAGMA mmap_size = 268435456",  # 256 MiB
+)
+
+
+# WAL allows any number of readers alongside a single writer, so reads and
+# writes use separate connections: one lock-guarded write connection, and a
+# read-only connection per OS thread that never queues behind the writer.
+
+# Per-connection prepared statement cache (sqlite3 default is 128). Connections
+# are long-lived, so hot statements are prepared once and reused; the SQL for
+# the hottest paths is kept in module-level constants below.
+STATEMENT_CACHE_SIZE = 256
+
+_write_conn: sqlite3.Connection | None = None
+_write_lock = threading.Lock()
+_read_local = threading.local()
+# All open read connections, so close_connections() can reach other threads'
+_read_conns: list[sqlite3.Connection] = []
+_read_conns_lock = threading.Lock()
+# Bumped by close_connections() so threads drop their stale cached connection
+_conn_generation = 0
+
+# Stored in PRAGMA user_version once init_database() has run. Bump it whenever
+# the schema or a migration changes so existing databases rerun init once;
+# databases already at this version skip straight past it.
+SCHEMA_VERSION = 2
+
+# The schema is initialized lazily by the first get_db() call, not on import
+_initialized = False
+_init_lock = threading.Lock()
+
+
+def _connect(readonly: bool = False) -> sqlite3.Connection:
+    """Open a tuned connection in autocommit mode (transactions are explicit)."""
+    if readonly:
+        uri = f"{Path(DB_PATH).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+    else:
+        conn = sqlite3.connect(
+            str(DB_PATH),
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _get_write_conn() -> sqlite3.Connection:
+    """Return the shared write connection. Caller must hold _write_lock."""
+    global _write_conn
+    if _write_conn is None:
+        _write_conn = _connect()
+    return _write_conn
+
+
+def _get_read_conn() -> sqlite3.Connection:
+    """Return this thread's read-only connection, opening it on first use."""
+    conn: sqlite3.Connection | None = getattr(_read_local, "conn", None)
+    if conn is None or getattr(_read_local, "generation", None) != _conn_generation:
+        conn = _connect(readonly=True)
+        with _read_conns_lock:
+            _read_conns.append(conn)
+        _read_local.conn = conn
+        _read_local.generation = _conn_generation
+    return conn
+
+
+def close_connections() -> None:
+    """Close the write connection and every thread's read connection.
+
+    Connections are reopened lazily on next use (e.g. after DB_PATH changes).
+    """
+    global _write_conn, _conn_generation, _initialized, _last_event_seq
+    _initialized = False
+    _last_event_seq = None
+    with _write_lock:
+        if _write_conn is not None:
+            _write_conn.close()
+            _write_conn = None
+    with _read_conns_lock:
+        _conn_generation += 1
+        for conn in _read_conns:
+            conn.close()
+        _read_conns.clear()
+
+
+atexit.register(close_connections)
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection, begin: str) -> Iterator[sqlite3.Connection]:
+    """Run the body in an explicit transaction, rolling back on error."""
     try:
+        conn.execute(begin)
         yield conn
-        conn.commit()
+        conn.execute("COMMIT")
     except Exception:
-        conn.rollback()
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
         raise
-    finally:
-        conn.close()
+
+
+@contextmanager
+def get_db(readonly: bool = False) -> Iterator[sqlite3.Connection]:
+    """Get a database connection wrapped in a transaction.
+
+    Writes go through the single shared write connection, serialized by a lock,
+    and use BEGIN IMMEDIATE so the writer lock is taken upfront instead of being
+    upgraded mid-transaction (which can fail with SQLITE_BUSY).
+    Pass readonly=True for pure reads to use this thread's read-only connection
+    with a deferred transaction; these run concurrently with the writer.
+    """
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                init_database()
+    if readonly:
+        conn = _get_read_conn()
+        if conn.in_transaction:
+            # Nested read on the same thread: share the outer snapshot
+            yield conn
+            return
+        with _transaction(conn, "BEGIN") as tx:
+            yield tx
+    else:
+        with _write_lock, _transaction(_get_write_conn(), "BEGIN IMMEDIATE") as tx:
+            yield tx
+
+
+def checkpoint_wal() -> None:
+    """Fold the WAL back into the main database file and truncate it."""
+    with _write_lock:
+        _get_write_conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
 
 
 def init_database() -> None:
-    """Initialize database schema."""
-    with get_db() as conn:
+    """Initialize database schema.
+
+    Runs on the first get_db() call. Databases already at SCHEMA_VERSION
+    skip the schema and migration work, so this is one PRAGMA read.
+    """
+    global _initialized
+    with _write_lock:
+        conn = _get_write_conn()
+        if conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+            _initialized = True
+            return
         # Enable WAL mode once at init (persists across connections)
         conn.execute("PRAGMA journal_mode = WAL")
         conn.executescript("""
@@ -100,6 +257,11 @@ def init_database() -> None:
 
             CREATE INDEX IF NOT EXISTS idx_messages_thread ON messages(thread_id);
             CREATE INDEX IF NOT EXISTS idx_threads_parent ON threads(parent_id);
+            CREATE INDEX IF NOT EXISTS idx_threads_status_updated
+                ON threads(status, updated_at);
+            CREATE INDEX IF NOT EXISTS idx_threads_workdir_created
+                ON threads(work_dir, created_at DESC)
+                WHERE work_dir IS NOT NULL AND work_dir != '';
 
             CREATE TABLE IF NOT EXISTS events (
                 seq_id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -111,8 +273,10 @@ def init_database() -> None:
             );
 
             CREATE INDEX IF NOT EXISTS idx_events_thread_seq ON events(thread_id, seq_id);
+            CREATE INDEX IF NOT EXISTS idx_events_created_at ON events(created_at);
         """)
 
+    with _write_lock, _transaction(_get_write_conn(), "BEGIN IMMEDIATE") as conn:
         # Migration: Add content_blocks column if it doesn't exist
         cursor = conn.execute("PRAGMA table_info(messages)")
         columns = [row[1] for row in cursor.fetchall()]
@@ -148,11 +312,26 @@ def init_database() -> None:
         cursor = conn.execute("PRAGMA table_info(threads)")
         thread_columns = [row[1] for row in cursor.fetchall()]
         if "input_tokens" not in thread_columns:
-            conn.execute("ALTER TABLE threads ADD COLUMN input_tokens INTEGER DEFAULT 0")
+            conn.execute(
+                "ALTER TABLE threads ADD COLUMN input_tokens INTEGER NOT NULL DEFAULT 0"
+            )
         if "output_tokens" not in thread_columns:
-            conn.execute("ALTER TABLE threads ADD COLUMN output_tokens INTEGER DEFAULT 0")
+            conn.execute(
+                "ALTER TABLE threads ADD COLUMN output_tokens INTEGER NOT NULL DEFAULT 0"
+            )
         if "total_cost_usd" not in thread_columns:
-            conn.execute("ALTER TABLE threads ADD COLUMN total_cost_usd REAL DEFAULT 0.0")
+            conn.execute(
+                "ALTER TABLE threads ADD COLUMN total_cost_usd REAL NOT NULL DEFAULT 0.0"
+            )
+        # Databases that added these columns before they were NOT NULL may
+        # hold NULLs; zero them so usage updates can add without COALESCE
+        conn.execute("""
+            UPDATE threads SET
+                input_tokens = COALESCE(input_tokens, 0),
+                output_tokens = COALESCE(output_tokens, 0),
+                total_cost_usd = COALESCE(total_cost_usd, 0.0)
+            WHERE input_tokens IS NULL OR output_tokens IS NULL OR total_cost_usd IS NULL
+        """)
 
         # Migration: Add is_ephemeral column for Task threads
         cursor = conn.execute("PRAGMA table_info(threads)")
@@ -168,6 +347,9 @@ def init_database() -> None:
         if "max_thread_depth" not in thread_columns:
             conn.execute("ALTER TABLE threads ADD COLUMN max_thread_depth INTEGER DEFAULT 1")
 
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    _initialized = True
+
 
 def _format_thread(row: dict[str, Any], messages: list[dict[str, Any]]) -> dict[str, Any]:
     """Format thread row to match frontend expectations."""
@@ -206,7 +388,7 @@ def _format_thread(row: dict[str, Any], messages: list[dict[str, Any]]) -> dict[
 
 def get_all_threads(include_archived: bool = False) -> list[dict[str, Any]]:
     """Get all threads with their messages using a single query."""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         # Fetch all threads and messages in one go to avoid N+1
         where_clause = "" if include_archived else "WHERE t.archived_at IS NULL"
         cursor = conn.execute(f"""
@@ -277,18 +459,89 @@ def get_all_threads(include_archived: bool = False) -> list[dict[str, Any]]:
         ]
 
 
-def get_thread(thread_id: str) -> dict[str, Any] | None:
-    """Get a single thread by ID."""
-    with get_db() as conn:
+def get_thread_summaries() -> list[dict[str, Any]]:
+    """Get unarchived threads with message counts instead of messages.
+
+    For listings that only show a line per thread; message counts come from
+    idx_messages_thread without reading any message content.
+    """
+    with get_db(readonly=True) as conn:
+        cursor = conn.execute("""
+            SELECT t.id, t.title, t.status, t.parent_id, t.archived_at,
+                   (SELECT COUNT(*) FROM messages m WHERE m.thread_id = t.id) AS message_count
+            FROM threads t
+            WHERE t.archived_at IS NULL
+            ORDER BY t.created_at DESC
+        """)
+        return [
+            {
+                "id": row["id"],
+                "title": row["title"],
+                "status": row["status"],
+                "parentId": row["parent_id"],
+                "archivedAt": row["archived_at"],
+                "messageCount": row["message_count"],
+            }
+            for row in cursor
+        ]
+
+
+def get_thread_counts() -> dict[str, int]:
+    """Count threads by archive state without loading them."""
+    with get_db(readonly=True) as conn:
+        total, archived = conn.execute(
+            "SELECT COUNT(*), COUNT(archived_at) FROM threads"
+        ).fetchone()
+    return {"total": total, "active": total - archived, "archived": archived}
+
+
+def get_thread(thread_id: str, include_messages: bool = True) -> dict[str, Any] | None:
+    """Get a single thread by ID.
+
+    Pass include_messages=False when only the thread's own fields are needed;
+    "messages" is then an empty list and the messages query is skipped.
+    """
+    with get_db(readonly=True) as conn:
         cursor = conn.execute("SELECT * FROM threads WHERE id = ?", (thread_id,))
         row = cursor.fetchone()
         if row is None:
             return None
 
-        messages = get_messages_by_thread_internal(conn, thread_id)
+        messages = get_messages_by_thread_internal(conn, thread_id) if include_messages else []
         return _format_thread(dict(row), messages)
 
 
+# Timestamps are stored in local time (see _SQL_NOW), so the cutoff and the
+# elapsed time are computed against the same clock inside SQLite
+_SQL_STUCK_RUNNING_THREADS = """
+    SELECT *,
+        CAST((julianday('now', 'localtime') - julianday(updated_at)) * 86400 AS INTEGER)
+            AS stuck_seconds
+    FROM threads
+    WHERE status = 'running'
+        AND updated_at < strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime', ?)
+        AND archived_at IS NULL
+"""
+
+
+def get_stuck_running_threads(max_age_seconds: int) -> list[dict[str, Any]]:
+    """Get unarchived threads that have been 'running' without an update
+    for longer than max_age_seconds.
+
+    Served by idx_threads_status_updated, so the cost is proportional to the
+    number of running threads rather than all threads. Threads are formatted
+    without messages and carry an extra stuckSeconds field.
+    """
+    with get_db(readonly=True) as conn:
+        cursor = conn.execute(_SQL_STUCK_RUNNING_THREADS, (f"-{max_age_seconds} seconds",))
+        threads = []
+        for row in cursor.fetchall():
+            thread = _format_thread(dict(row), [])
+            thread["stuckSeconds"] = row["stuck_seconds"]
+            threads.append(thread)
+        return threads
+
+
 def get_thread_depth(thread_id: str) -> int:
     """Calculate the depth of a thread in the hierarchy.
 
@@ -300,7 +553,7 @@ def get_thread_depth(thread_id: str) -> int:
     depth = 0
     current_id = thread_id
 
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         while True:
             cursor = conn.execute(
                 "SELECT parent_id FROM threads WHERE id = ?", (current_id,)
@@ -352,20 +605,19 @@ def create_thread(
         raise ValueError(f"Invalid permission mode: {permission_mode}. Must be one of {VALID_PERMISSION_MODES}")
 
     thread_id = str(uuid.uuid4())
-    now = datetime.now().isoformat()
 
     with get_db() as conn:
         conn.execute(
-            """
+            f"""
             INSERT INTO threads (id, title, parent_id, work_dir, model, extended_thinking,
                                  permission_mode, git_branch, git_repo, is_worktree, worktree_branch,
                                  allow_nested_subthreads, max_thread_depth,
                                  created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {_SQL_NOW}, {_SQL_NOW})
             """,
             (thread_id, title, parent_id, work_dir, model, int(extended_thinking),
              permission_mode, git_branch, git_repo, int(is_worktree), worktree_branch,
-             int(allow_nested_subthreads), max_thread_depth, now, now),
+             int(allow_nested_subthreads), max_thread_depth),
         )
 
     thread = get_thread(thread_id)
@@ -374,26 +626,78 @@ def create_thread(
     return thread
 
 
-def update_thread_status(thread_id: str, status: str) -> None:
-    """Update a thread's status."""
+def update_thread_status(thread_id: str, status: str, session_id: str | None = None) -> None:
+    """Update a thread's status.
+
+    If session_id is given it is saved in the same statement, so finishing
+    an agent run costs one commit rather than two.
+    """
     if status not in VALID_STATUSES:
         raise ValueError(f"Invalid status: {status}. Must be one of {VALID_STATUSES}")
 
-    now = datetime.now().isoformat()
     with get_db() as conn:
         conn.execute(
-            "UPDATE threads SET status = ?, updated_at = ? WHERE id = ?",
-            (status, now, thread_id),
+            f"""
+            UPDATE threads SET status = ?, session_id = COALESCE(?, session_id),
+                               updated_at = {_SQL_NOW}
+            WHERE id = ?
+            """,
+            (status, session_id, thread_id),
+        )
+
+
+def bulk_update_thread_status(
+    thread_ids: list[str], status: str, from_status: str | None = None
+) -> list[str]:
+    """Update the status of several threads in one statement.
+
+    If from_status is given, only threads still in that status are changed,
+    so a thread that moved on since it was selected keeps its new status.
+
+    Returns:
+        IDs of the threads that were actually updated.
+    """
+    if status not in VALID_STATUSES:
+        raise ValueError(f"Invalid status: {status}. Must be one of {VALID_STATUSES}")
+    if not thread_ids:
+        return []
+
+    # json_each keeps the SQL text (and its cached statement) independent of
+    # how many IDs are passed
+    with get_db() as conn:
+        cursor = conn.execute(
+            f"""
+            UPDATE threads SET status = ?, updated_at = {_SQL_NOW}
+            WHERE id IN (SELECT value FROM json_each(?))
+                AND (? IS NULL OR status = ?)
+            RETURNING id
+            """,
+            (status, json.dumps(thread_ids), from_status, from_status),
         )
+        return [row[0] for row in cursor.fetchall()]
 
 
 def update_thread_session(thread_id: str, session_id: str) -> None:
     """Update a thread's session ID for resumption."""
-    now = datetime.now().isoformat()
     with get_db() as conn:
         conn.execute(
-            "UPDATE threads SET session_id = ?, updated_at = ? WHERE id = ?",
-            (session_id, now, thread_id),
+            f"UPDATE threads SET session_id = ?, updated_at = {_SQL_NOW} WHERE id = ?",
+            (session_id, thread_id),
+        )
+
+
+def update_thread_worktree(
+    thread_id: str, work_dir: str, git_branch: str | None, worktree_branch: str | None
+) -> None:
+    """Point a thread at the git worktree created for it."""
+    with get_db() as conn:
+        conn.execute(
+            f"""
+            UPDATE threads SET work_dir = ?, git_branch = ?, is_worktree = 1,
+                               worktree_branch = ?, updated_at = {_SQL_NOW}
+            WHERE id = ?
+            """,
+            (work_dir, git_branch, worktree_branch, thread_id),
         )
 
 
@@ -405,9 +709,8 @@ def update_thread_config(
     auto_react: bool | None = None,
 ) -> None:
     """Update a thread's configuration (model, thinking mode, permission mode, auto-react)."""
-    now = datetime.now().isoformat()
-    updates = ["updated_at = ?"]
-    params: list[Any] = [now]
+    updates = [f"updated_at = {_SQL_NOW}"]
+    params: list[Any] = []
 
     if model is not None:
         updates.append("model = ?")
@@ -435,7 +738,7 @@ def update_thread_config(
 
 def get_messages_by_thread(thread_id: str) -> list[dict[str, Any]]:
     """Get all messages for a thread."""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         return get_messages_by_thread_internal(conn, thread_id)
 
 
@@ -459,7 +762,7 @@ def get_messages_paginated(
     limit = max(1, min(limit, 100))
     offset = max(0, offset)
 
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         # Get total count
         cursor = conn.execute(
             "SELECT COUNT(*) FROM messages WHERE thread_id = ?",
@@ -527,6 +830,8 @@ def add_message(
         raise ValueError("Content cannot be empty")
 
     message_id = str(uuid.uuid4())
+    # Keep the Python clock here: messages are ordered by timestamp and
+    # microsecond precision keeps back-to-back inserts in order.
     now = datetime.now().isoformat()
 
     with get_db() as conn:
@@ -583,7 +888,6 @@ def delete_thread(thread_id: str) -> bool:
 
 def clear_thread_messages(thread_id: str) -> bool:
     """Clear all messages from a thread and reset session_id for fresh start."""
-    now = datetime.now().isoformat()
     with get_db() as conn:
         # Delete all messages for this thread
         cursor = conn.execute("DELETE FROM messages WHERE thread_id = ?", (thread_id,))
@@ -591,8 +895,8 @@ def clear_thread_messages(thread_id: str) -> bool:
 
         # Clear session_id to prevent resumption (starts fresh)
         conn.execute(
-            "UPDATE threads SET session_id = NULL, updated_at = ? WHERE id = ?",
-            (now, thread_id),
+            f"UPDATE threads SET session_id = NULL, updated_at = {_SQL_NOW} WHERE id = ?",
+            (thread_id,),
         )
 
         return deleted_count > 0
@@ -600,22 +904,22 @@ def clear_thread_messages(thread_id: str) -> bool:
 
 def archive_thread(thread_id: str) -> bool:
     """Archive a thread by setting archived_at timestamp."""
-    now = datetime.now().isoformat()
     with get_db() as conn:
         cursor = conn.execute(
-            "UPDATE threads SET archived_at = ?, updated_at = ? WHERE id = ? AND archived_at IS NULL",
-            (now, now, thread_id),
+            f"UPDATE threads SET archived_at = {_SQL_NOW}, updated_at = {_SQL_NOW} "
+            "WHERE id = ? AND archived_at IS NULL",
+            (thread_id,),
         )
         return cursor.rowcount > 0
 
 
 def unarchive_thread(thread_id: str) -> bool:
     """Unarchive a thread by clearing archived_at timestamp."""
-    now = datetime.now().isoformat()
     with get_db() as conn:
         cursor = conn.execute(
-            "UPDATE threads SET archived_at = NULL, updated_at = ? WHERE id = ? AND archived_at IS NOT NULL",
-            (now, thread_id),
+            f"UPDATE threads SET archived_at = NULL, updated_at = {_SQL_NOW} "
+            "WHERE id = ? AND archived_at IS NOT NULL",
+            (thread_id,),
         )
         return cursor.rowcount > 0
 
@@ -768,8 +1072,9 @@ def _format_time_ago(iso_timestamp: str) -> str:
         return "unknown"
 
     try:
-        # Parse timestamp - handle both naive and UTC ('Z' suffix) timestamps
-        created = datetime.fromisoformat(iso_timestamp.replace("Z", "+00:00"))
+        # Parse timestamp - fromisoformat accepts both naive and UTC ('Z'
+        # suffix) timestamps on Python 3.11+, so no string rewriting is needed
+        created = datetime.fromisoformat(iso_timestamp)
 
         # Use consistent comparison: if created has timezone, compare in UTC
         now = datetime.now(UTC) if created.tzinfo else datetime.now()
@@ -812,11 +1117,10 @@ def update_thread_title(thread_id: str, title: str) -> bool:
     if not title or len(title) > 255:
         raise ValueError("Title must be between 1 and 255 characters")
 
-    now = datetime.now().isoformat()
     with get_db() as conn:
         cursor = conn.execute(
-            "UPDATE threads SET title = ?, updated_at = ? WHERE id = ?",
-            (title, now, thread_id),
+            f"UPDATE threads SET title = ?, updated_at = {_SQL_NOW} WHERE id = ?",
+            (title, thread_id),
         )
         return cursor.rowcount > 0
 
@@ -840,22 +1144,79 @@ def create_ephemeral_thread(
     Returns:
         The created thread dict.
     """
-    now = datetime.now().isoformat()
-
     with get_db() as conn:
-        conn.execute(
-            """
+        # RETURNING gives back the stored row (with column defaults) without a
+        # second SELECT; fetchall() runs the INSERT to completion before COMMIT
+        (row,) = conn.execute(
+            f"""
             INSERT INTO threads (id, title, parent_id, work_dir, status, is_ephemeral,
                                  created_at, updated_at)
-            VALUES (?, ?, ?, ?, 'pending', 1, ?, ?)
+            VALUES (?, ?, ?, ?, 'pending', 1, {_SQL_NOW}, {_SQL_NOW})
+            RETURNING *
+            """,
+            (thread_id, title, parent_id, work_dir),
+        ).fetchall()
+
+    # A freshly created thread has no messages yet
+    return _format_thread(dict(row), [])
+
+
+def update_ephemeral_thread_status(thread_id: str, status: str) -> bool:
+    """Update a thread's status only if it is an ephemeral Task thread.
+
+    Returns True if a matching ephemeral thread was updated. Doing the check
+    in the WHERE clause avoids loading the thread (and its messages) first.
+    """
+    if status not in VALID_STATUSES:
+        raise ValueError(f"Invalid status: {status}. Must be one of {VALID_STATUSES}")
+
+    with get_db() as conn:
+        cursor = conn.execute(
+            f"""
+            UPDATE threads SET status = ?, updated_at = {_SQL_NOW}
+            WHERE id = ? AND is_ephemeral = 1
             """,
-            (thread_id, title, parent_id, work_dir, now, now),
+            (status, thread_id),
         )
+        return cursor.rowcount > 0
 
-    thread = get_thread(thread_id)
-    if thread is None:
-        raise RuntimeError(f"Failed to create ephemeral thread {thread_id}")
-    return thread
+
+_SQL_UPDATE_THREAD_USAGE = f"""
+    UPDATE threads SET
+        input_tokens = input_tokens + ?,
+        output_tokens = output_tokens + ?,
+        total_cost_usd = total_cost_usd + ?,
+        updated_at = {_SQL_NOW}
+    WHERE id = ?
+"""
+
+# Own and children usage in one statement; child sums use idx_threads_parent
+_SQL_THREAD_USAGE_WITH_CHILDREN = """
+    SELECT
+        t.input_tokens, t.output_tokens, t.total_cost_usd,
+        COALESCE(c.input_tokens, 0),
+        COALESCE(c.output_tokens, 0),
+        COALESCE(c.total_cost_usd, 0.0)
+    FROM threads t,
+        (SELECT
+            SUM(input_tokens) AS input_tokens,
+            SUM(output_tokens) AS output_tokens,
+            SUM(total_cost_usd) AS total_cost_usd
+         FROM threads WHERE parent_id = :id) c
+    WHERE t.id = :id
+"""
+
+
+# Usage deltas are accumulated in memory and written in one batched
+# transaction at most every USAGE_FLUSH_INTERVAL_SECONDS, instead of one
+# write transaction per update_thread_usage() call.
+USAGE_FLUSH_INTERVAL_SECONDS = 0.5
+# A failed write keeps its deltas buffered and retries after this delay
+USAGE_FLUSH_RETRY_SECONDS = 1.0
+
+_pending_usage: dict[str, list[Any]] = {}  # thread_id -> [input, output, cost]
+_pending_usage_lock = threading.Lock()
+_usage_flush_timer: threading.Timer | None = None
 
 
 def update_thread_usage(
@@ -866,25 +1227,79 @@ def update_thread_usage(
 ) -> None:
     """Cumulatively add token usage to a thread's stored values.
 
+    The deltas are buffered and flushed shortly after by a background timer;
+    call flush_usage() when the stored values must be current.
+
     Args:
         thread_id: The thread to update
         input_tokens: Input tokens to add
         output_tokens: Output tokens to add
         total_cost_usd: Cost in USD to add
     """
-    now = datetime.now().isoformat()
-    with get_db() as conn:
-        conn.execute(
-            """
-            UPDATE threads SET
-                input_tokens = COALESCE(input_tokens, 0) + ?,
-                output_tokens = COALESCE(output_tokens, 0) + ?,
-                total_cost_usd = COALESCE(total_cost_usd, 0.0) + ?,
-                updated_at = ?
-            WHERE id = ?
-            """,
-            (input_tokens, output_tokens, total_cost_usd, now, thread_id),
-        )
+    if not (input_tokens or output_tokens or total_cost_usd):
+        return
+
+    with _pending_usage_lock:
+        pending = _pending_usage.setdefault(thread_id, [0, 0, 0.0])
+        pending[0] += input_tokens
+        pending[1] += output_tokens
+        pending[2] += total_cost_usd
+        if _usage_flush_timer is None:
+            _start_usage_flush_timer(USAGE_FLUSH_INTERVAL_SECONDS)
+
+
+def _start_usage_flush_timer(delay: float) -> None:
+    """Start the flush timer. Caller must hold _pending_usage_lock."""
+    global _usage_flush_timer
+    _usage_flush_timer = threading.Timer(delay, _flush_usage_on_timer)
+    _usage_flush_timer.daemon = True
+    _usage_flush_timer.start()
+
+
+def _flush_usage_on_timer() -> None:
+    try:
+        flush_usage()
+    except Exception:
+        logger.exception("Failed to persist buffered token usage, retrying")
+        with _pending_usage_lock:
+            if _usage_flush_timer is None and _pending_usage:
+                _start_usage_flush_timer(USAGE_FLUSH_RETRY_SECONDS)
+
+
+def flush_usage() -> None:
+    """Write all buffered token usage deltas in a single transaction.
+
+    If the write fails the deltas are merged back into the buffer before the
+    error propagates, so the next flush still adds them.
+    """
+    global _usage_flush_timer
+    with _pending_usage_lock:
+        if _usage_flush_timer is not None:
+            _usage_flush_timer.cancel()
+            _usage_flush_timer = None
+        if not _pending_usage:
+            return
+        rows = [
+            (input_tok, output_tok, cost, thread_id)
+            for thread_id, (input_tok, output_tok, cost) in _pending_usage.items()
+        ]
+        _pending_usage.clear()
+
+    try:
+        with get_db() as conn:
+            conn.executemany(_SQL_UPDATE_THREAD_USAGE, rows)
+    except BaseException:
+        with _pending_usage_lock:
+            for input_tok, output_tok, cost, thread_id in rows:
+                pending = _pending_usage.setdefault(thread_id, [0, 0, 0.0])
+                pending[0] += input_tok
+                pending[1] += output_tok
+                pending[2] += cost
+        raise
+
+
+# Registered after close_connections, so it runs first at interpreter exit
+atexit.register(flush_usage)
 
 
 def get_thread_usage_with_children(thread_id: str) -> dict[str, Any]:
@@ -893,12 +1308,9 @@ def get_thread_usage_with_children(thread_id: str) -> dict[str, Any]:
     Returns:
         Dict with own usage, children usage, and total.
     """
-    with get_db() as conn:
-        # Get own usage
-        cursor = conn.execute(
-            "SELECT input_tokens, output_tokens, total_cost_usd FROM threads WHERE id = ?",
-            (thread_id,),
-        )
+    flush_usage()
+    with get_db(readonly=True) as conn:
+        cursor = conn.execute(_SQL_THREAD_USAGE_WITH_CHILDREN, {"id": thread_id})
         row = cursor.fetchone()
         if not row:
             return {
@@ -910,33 +1322,13 @@ def get_thread_usage_with_children(thread_id: str) -> dict[str, Any]:
                 "childrenTotalCostUsd": 0.0,
             }
 
-        own_input = row[0] or 0
-        own_output = row[1] or 0
-        own_cost = row[2] or 0.0
-
-        # Get children usage
-        cursor = conn.execute(
-            """
-            SELECT
-                COALESCE(SUM(input_tokens), 0),
-                COALESCE(SUM(output_tokens), 0),
-                COALESCE(SUM(total_cost_usd), 0.0)
-            FROM threads WHERE parent_id = ?
-            """,
-            (thread_id,),
-        )
-        child_row = cursor.fetchone()
-        child_input = child_row[0] or 0
-        child_output = child_row[1] or 0
-        child_cost = child_row[2] or 0.0
-
         return {
-            "inputTokens": own_input,
-            "outputTokens": own_output,
-            "totalCostUsd": own_cost,
-            "childrenInputTokens": child_input,
-            "childrenOutputTokens": child_output,
-            "childrenTotalCostUsd": child_cost,
+            "inputTokens": row[0] or 0,
+            "outputTokens": row[1] or 0,
+            "totalCostUsd": row[2] or 0.0,
+            "childrenInputTokens": row[3] or 0,
+            "childrenOutputTokens": row[4] or 0,
+            "childrenTotalCostUsd": row[5] or 0.0,
         }
 
 
@@ -949,25 +1341,115 @@ def get_recent_work_dirs(limit: int = 5) -> list[str]:
     Returns:
         List of unique work directory paths, most recent first.
     """
-    with get_db() as conn:
-        cursor = conn.execute(
+    with get_db(readonly=True) as conn:
+        # GROUP BY + MAX orders each directory by its most recent use (DISTINCT
+        # with ORDER BY created_at picked an arbitrary row per directory), and
+        # is served by the covering partial index idx_threads_workdir_created
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(
             """
-            SELECT DISTINCT work_dir FROM threads
+            SELECT work_dir FROM threads
             WHERE work_dir IS NOT NULL AND work_dir != ''
-            ORDER BY created_at DESC
+            GROUP BY work_dir
+            ORDER BY MAX(created_at) DESC
             LIMIT ?
             """,
             (limit,),
         )
-        return [row[0] for row in cursor.fetchall()]
+        return [work_dir for (work_dir,) in cursor]
 
 
 # ---------------------------------------------------------------------------
 # SSE Event persistence (replaces in-memory SSEEventStore)
 # ---------------------------------------------------------------------------
 
+# Rows for threads deleted while their events were buffered are skipped
+# rather than failing the whole batch on the foreign key
+_SQL_ADD_EVENT = """
+    INSERT INTO events (seq_id, thread_id, event_type, data)
+    SELECT ?1, ?2, ?3, ?4 WHERE EXISTS (SELECT 1 FROM threads WHERE id = ?2)
+"""
+
+_SQL_EVENTS_SINCE = """
+    SELECT seq_id, thread_id, event_type, data, created_at
+    FROM events
+    WHERE thread_id = ? AND seq_id > ?
+    ORDER BY seq_id ASC
+    LIMIT ?
+"""
+
+# Rows fetched per read in iter_events_since()
+EVENT_REPLAY_CHUNK_SIZE = 256
+
+_SQL_LATEST_SEQ_ID = "SELECT MAX(seq_id) FROM events WHERE thread_id = ?"
+
+
+# Payloads at least this large are stored as raw-deflate BLOBs; smaller ones
+# (most text_delta events) stay TEXT since framing would eat any saving
+EVENT_COMPRESS_MIN_BYTES = 256
+
+# Preset dictionary of common event JSON fragments so even a few hundred
+# bytes compress well. Changing it makes existing BLOBs unreadable, which is
+# tolerable only because events expire after a day.
+_EVENT_ZDICT = (
+    b'{"status": "running"}{"status": "needs_attention"}{"error": '
+    b'{"tool_use_id": "toolu_{"id": "toolu_", "input": {"command": "'
+    b'"file_path": "/", "old_string": "", "new_string": "", "pattern": "'
+    b'"description": "", "prompt": "", "subagent_type": "'
+    b'{"assistantMessage": {"id": "", "thread_id": "", "role": "assistant", '
+    b'"content": "", "content_blocks": [{"type": "text", "content": "'
+    b'{"type": "thinking", "content": "", "signature": "'
+    b'{"type": "tool_use", "id": "toolu_", "name": "", "input": {'
+    b'"isComplete": true}, "timestamp": "'
+    b'{"usage": {"input_tokens": , "output_tokens": , '
+    b'"cache_creation_input_tokens": , "cache_read_input_tokens": '
+    b'}, "totalCostUsd": }, "status": "done"}'
+)
+
+
+def _encode_event_data(data: str) -> str | bytes:
+    """Compress a large event payload, leaving small ones as text."""
+    raw = data.encode()
+    if len(raw) < EVENT_COMPRESS_MIN_BYTES:
+        return data
+    compressor = zlib.compressobj(zlib.Z_BEST_SPEED, wbits=-15, zdict=_EVENT_ZDICT)
+    blob = compressor.compress(raw) + compressor.flush()
+    return blob if len(blob) < len(raw) else data
+
+
+def _decode_event_data(data: str | bytes) -> str:
+    """Inverse of _encode_event_data(); TEXT rows pass through unchanged."""
+    if isinstance(data, str):
+        return data
+    decompressor = zlib.decompressobj(wbits=-15, zdict=_EVENT_ZDICT)
+    return (decompressor.decompress(data) + decompressor.flush()).decode()
+
+
+# Events are buffered in memory and inserted in one batched transaction at
+# most every EVENT_FLUSH_INTERVAL_SECONDS (or once EVENT_FLUSH_BATCH_SIZE are
+# pending), instead of one write transaction per streamed token. seq_ids are
+# handed out in-process so broadcasts don't wait for the insert; this relies
+# on add_event() being the only writer of events.
+EVENT_FLUSH_INTERVAL_SECONDS = 0.05
+EVENT_FLUSH_BATCH_SIZE = 100
+# A failed insert keeps its rows buffered and retries after this delay
+EVENT_FLUSH_RETRY_SECONDS = 1.0
+
+_pending_events: list[tuple[int, str, str, str]] = []
+_pending_events_lock = threading.Lock()
+# Held across drain + insert so a reader that flushes never overtakes a
+# batch still being written by the timer thread
+_event_flush_lock = threading.Lock()
+_event_flush_timer: threading.Timer | None = None
+_last_event_seq: int | None = None
+
+
 def add_event(thread_id: str, event_type: str, data: str) -> int:
-    """Persist an SSE event and return its sequence ID.
+    """Buffer an SSE event for persistence and return its sequence ID.
+
+    Readers of the events table flush the buffer first, so replay always
+    sees every event whose ID has been handed out.
 
     Args:
         thread_id: The thread this event belongs to
@@ -975,48 +1457,145 @@ def add_event(thread_id: str, event_type: str, data: str) -> int:
         data: JSON-serialized event payload
 
     Returns:
-        The auto-incremented seq_id for this event.
+        The monotonically increasing seq_id for this event.
     """
-    with get_db() as conn:
-        cursor = conn.execute(
-            "INSERT INTO events (thread_id, event_type, data) VALUES (?, ?, ?)",
-            (thread_id, event_type, data),
-        )
-        return cursor.lastrowid  # type: ignore[return-value]
+    global _event_flush_timer, _last_event_seq
+    with _pending_events_lock:
+        if _last_event_seq is None:
+            with get_db(readonly=True) as conn:
+                # sqlite_sequence keeps the highest seq_id ever used, even
+                # after cleanup deleted it, so IDs are never reused
+                row = conn.execute(
+                    "SELECT seq FROM sqlite_sequence WHERE name = 'events'"
+                ).fetchone()
+            _last_event_seq = row[0] if row else 0
+        _last_event_seq += 1
+        seq_id = _last_event_seq
+        _pending_events.append((seq_id, thread_id, event_type, data))
+        # A full batch moves the flush up to now, but still on the timer
+        # thread: callers are on the event loop and must not wait for the insert
+        if len(_pending_events) >= EVENT_FLUSH_BATCH_SIZE:
+            # A pending retry keeps its backoff rather than hammering a failing db
+            if _event_flush_timer is None or (
+                _event_flush_timer.interval == EVENT_FLUSH_INTERVAL_SECONDS
+            ):
+                _schedule_event_flush(0)
+        elif _event_flush_timer is None:
+            _schedule_event_flush(EVENT_FLUSH_INTERVAL_SECONDS)
+    return seq_id
+
+
+def _schedule_event_flush(delay: float) -> None:
+    """(Re)start the flush timer. Caller must hold _pending_events_lock."""
+    global _event_flush_timer
+    if _event_flush_timer is not None:
+        _event_flush_timer.cancel()
+    _event_flush_timer = threading.Timer(delay, _flush_events_on_timer)
+    _event_flush_timer.daemon = True
+    _event_flush_timer.start()
+
+
+def _flush_events_on_timer() -> None:
+    try:
+        flush_events()
+    except Exception:
+        logger.exception("Failed to persist buffered events, retrying")
+        with _pending_events_lock:
+            if _event_flush_timer is None and _pending_events:
+                _schedule_event_flush(EVENT_FLUSH_RETRY_SECONDS)
 
 
-def get_events_since(thread_id: str, last_seq_id: int) -> list[dict[str, Any]]:
-    """Get events after the given sequence ID for replay on reconnect.
+def flush_events() -> None:
+    """Insert all buffered events in a single transaction.
 
-    Returns events ordered by seq_id ascending, each with
+    If the insert fails the events go back to the head of the buffer before
+    the error propagates: their seq_ids have already been broadcast, so
+    dropping them would leave a gap in replay. The next flush retries them.
+    """
+    global _event_flush_timer
+    with _event_flush_lock:
+        with _pending_events_lock:
+            if _event_flush_timer is not None:
+                _event_flush_timer.cancel()
+                _event_flush_timer = None
+            if not _pending_events:
+                return
+            rows = _pending_events.copy()
+            _pending_events.clear()
+
+        try:
+            with get_db() as conn:
+                conn.executemany(
+                    _SQL_ADD_EVENT,
+                    [
+                        (seq_id, thread_id, event_type, _encode_event_data(data))
+                        for seq_id, thread_id, event_type, data in rows
+                    ],
+                )
+        except BaseException:
+            with _pending_events_lock:
+                _pending_events[:0] = rows
+            raise
+
+
+# Registered after close_connections, so it runs first at interpreter exit
+atexit.register(flush_events)
+
+
+def iter_events_since(thread_id: str, last_seq_id: int) -> Iterator[dict[str, Any]]:
+    """Yield events after the given sequence ID for replay on reconnect.
+
+    Events come ordered by seq_id ascending, each with
     seq_id, thread_id, event_type, data (JSON string), created_at.
+
+    Reads EVENT_REPLAY_CHUNK_SIZE rows at a time, resuming after the last
+    seq_id seen, so memory stays bounded however long the replay is and no
+    read transaction is held open while the caller consumes a chunk.
     """
-    with get_db() as conn:
-        cursor = conn.execute(
-            """
-            SELECT seq_id, thread_id, event_type, data, created_at
-            FROM events
-            WHERE thread_id = ? AND seq_id > ?
-            ORDER BY seq_id ASC
-            """,
-            (thread_id, last_seq_id),
-        )
-        return [dict(row) for row in cursor.fetchall()]
+    flush_events()
+    while True:
+        with get_db(readonly=True) as conn:
+            # Plain tuples are ~2x cheaper than sqlite3.Row per row, which
+            # matters when replaying thousands of events after a reconnect
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(
+                _SQL_EVENTS_SINCE, (thread_id, last_seq_id, EVENT_REPLAY_CHUNK_SIZE)
+            )
+            rows = cursor.fetchall()
+        for seq_id, thread, event_type, data, created_at in rows:
+            yield {
+                "seq_id": seq_id,
+                "thread_id": thread,
+                "event_type": event_type,
+                "data": _decode_event_data(data),
+                "created_at": created_at,
+            }
+        if len(rows) < EVENT_REPLAY_CHUNK_SIZE:
+            return
+        last_seq_id = rows[-1][0]
+
+
+def get_events_since(thread_id: str, last_seq_id: int) -> list[dict[str, Any]]:
+    """Get events after the given sequence ID as a list.
+
+    See iter_events_since() for the row format.
+    """
+    return list(iter_events_since(thread_id, last_seq_id))
 
 
 def get_latest_seq_id(thread_id: str) -> int:
     """Get the latest sequence ID for a thread (0 if no events)."""
-    with get_db() as conn:
-        cursor = conn.execute(
-            "SELECT MAX(seq_id) FROM events WHERE thread_id = ?",
-            (thread_id,),
-        )
+    flush_events()
+    with get_db(readonly=True) as conn:
+        cursor = conn.execute(_SQL_LATEST_SEQ_ID, (thread_id,))
         row = cursor.fetchone()
         return row[0] or 0
 
 
 def clear_thread_events(thread_id: str) -> int:
     """Clear all events for a thread. Returns count of deleted events."""
+    flush_events()
     with get_db() as conn:
         cursor = conn.execute(
             "DELETE FROM events WHERE thread_id = ?",
@@ -1025,20 +1604,56 @@ def clear_thread_events(thread_id: str) -> int:
         return cursor.rowcount
 
 
+# Rows deleted per transaction in cleanup_old_events(). Small batches keep each
+# write lock short so concurrent add_event() writers are never starved.
+EVENT_CLEANUP_BATCH_SIZE = 1000
+
+# seq_id is assigned in insertion order under the single writer, so expired
+# events form a prefix of the table's rowid space
+_SQL_EXPIRED_EVENTS_SEQ_RANGE = """
+    SELECT MIN(seq_id), MAX(seq_id) FROM events WHERE created_at < ?
+"""
+
+_SQL_DELETE_OLD_EVENTS_RANGE = """
+    DELETE FROM events WHERE seq_id BETWEEN ? AND ? AND created_at < ?
+"""
+
+
 def cleanup_old_events(max_age_hours: int = 24) -> int:
     """Remove events older than max_age_hours. Returns count deleted.
 
     Called periodically to prevent the events table from growing unbounded.
     Events are only needed for SSE reconnection recovery, so keeping
     24 hours is more than sufficient.
+
+    Deletes contiguous seq_id ranges of EVENT_CLEANUP_BATCH_SIZE, committing
+    between batches so the write lock is released and other writers can
+    interleave. Each range is a straight walk over adjacent B-tree leaves.
+
+    VACUUM is deliberately never run: the events table is an append-heavy
+    log, and the pages freed here are simply reused by the next day's
+    events, whereas VACUUM would rewrite the whole database under a lock.
     """
-    with get_db() as conn:
-        cursor = conn.execute(
-            "DELETE FROM events WHERE created_at < datetime('now', ?)",
-            (f"-{max_age_hours} hours",),
-        )
-        return cursor.rowcount
+    flush_events()
+    with get_db(readonly=True) as conn:
+        cutoff = conn.execute(
+            "SELECT datetime('now', ?)", (f"-{max_age_hours} hours",)
+        ).fetchone()[0]
+        first_seq, last_seq = conn.execute(
+            _SQL_EXPIRED_EVENTS_SEQ_RANGE, (cutoff,)
+        ).fetchone()
+
+    if first_seq is None:
+        return 0
+
+    deleted = 0
+    for low in range(first_seq, last_seq + 1, EVENT_CLEANUP_BATCH_SIZE):
+        high = min(low + EVENT_CLEANUP_BATCH_SIZE - 1, last_seq)
+        with get_db() as conn:
+            cursor = conn.execute(_SQL_DELETE_OLD_EVENTS_RANGE, (low, high, cutoff))
+            deleted += cursor.rowcount
 
+    if deleted > 0:
+        checkpoint_wal()
+    return deleted
 
-# Initialize database on module load
-init_database()
@@ -1,11 +1,16 @@
 """MainThread API - FastAPI backend with Claude Agent SDK and SSE."""
 
 import asyncio
+import fnmatch
+import heapq
 import json
 import logging
 import os
+import re
+import stat
 import subprocess
-from collections import defaultdict
+import time
+from collections import defaultdict, deque
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
@@ -21,16 +26,8 @@ from sse_starlette.sse import EventSourceResponse
 
 from mainthread.agents import (
     clear_pending_question,
-    register_archive_thread_callback,
-    register_broadcast_plan_approval_callback,
-    register_broadcast_question_callback,
-    register_broadcast_status_signal_callback,
-    register_broadcast_subagent_stop_callback,
-    register_create_thread_callback,
-    register_list_threads_callback,
-    register_read_thread_callback,
-    register_run_thread_callback,
-    register_send_to_thread_callback,
+    get_registry,
+    register_agent_callbacks,
     reset_agent_state,
     run_agent,
     set_pending_answer,
@@ -45,29 +42,42 @@ from mainthread.db import (
     add_event,
     add_message,
     archive_thread,
+    bulk_update_thread_status,
+    checkpoint_wal,
     cleanup_old_events,
     clear_thread_events,
     clear_thread_messages,
     create_ephemeral_thread,
     create_thread,
     estimate_thread_tokens,
+    flush_events,
+    flush_usage,
     get_all_threads,
-    get_events_since,
     get_messages_paginated,
     get_recent_work_dirs,
+    get_stuck_running_threads,
     get_thread,
+    get_thread_counts,
     get_thread_messages_formatted,
+    get_thread_summaries,
     get_thread_usage_with_children,
+    iter_events_since,
     reset_all_threads,
     unarchive_thread,
+    update_ephemeral_thread_status,
     update_message,
     update_thread_config,
-    update_thread_session,
     update_thread_status,
     update_thread_title,
     update_thread_usage,
+    update_thread_worktree,
 )
 
+try:
+    import psutil
+except ImportError:  # /api/stats reports psutil as missing
+    psutil = None
+
 load_dotenv()
 
 # Configure logging
@@ -75,7 +85,12 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # SSE event queues for each thread (declared early for lifespan access)
-thread_subscribers: dict[str, list[asyncio.Queue[dict[str, Any]]]] = defaultdict(list)
+thread_subscribers: dict[str, set[asyncio.Queue[dict[str, Any]]]] = defaultdict(set)
+
+# Bound on each subscriber's queue. A client that falls this far behind is
+# disconnected rather than stalling the agent stream; its EventSource
+# reconnects with last_event_id and replays the gap from SQLite.
+SSE_QUEUE_MAX = int(os.environ.get("MAINTHREAD_SSE_QUEUE_MAX", "1000"))
 
 # SSE event persistence is now SQLite-backed (db.events table).
 # Events survive server restarts and support reconnection recovery.
@@ -83,13 +98,72 @@ thread_subscribers: dict[str, list[asyncio.Queue[dict[str, Any]]]] = defaultdict
 _event_cleanup_task: asyncio.Task | None = None
 EVENT_CLEANUP_INTERVAL_SECONDS = 3600  # Run cleanup every hour
 
+# WAL is truncated periodically so a long-running server doesn't let it grow
+# between the automatic (passive) checkpoints
+_wal_checkpoint_task: asyncio.Task | None = None
+WAL_CHECKPOINT_INTERVAL_SECONDS = 300
+
+# System CPU/memory are sampled in the background so cpu_percent always has a
+# recent baseline and /api/stats polls only read the latest snapshot. The
+# snapshot dict is replaced whole, so readers never see a partial update.
+_stats_sampler_task: asyncio.Task | None = None
+STATS_SAMPLE_INTERVAL_SECONDS = 1.0
+_system_snapshot: dict[str, Any] = {}
+
 # Per-parent notification queues to process notifications sequentially without dropping
 _notification_queues: dict[str, asyncio.Queue[str]] = {}
+NOTIFICATION_QUEUE_MAX = 128
 _notification_workers: dict[str, asyncio.Task] = {}
 
+
+class AgentSlots:
+    """Concurrency limit for agent runs that can be resized at runtime.
+
+    asyncio.Semaphore offers no supported way to change its limit, so this
+    keeps an explicit count of running agents guarded by a Condition.
+    Lowering the limit never interrupts running agents; new ones simply
+    wait until the count drops below it.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self._cond = asyncio.Condition()
+        self._active = 0
+        self.limit = limit
+
+    @property
+    def active(self) -> int:
+        """Number of agents currently holding a slot."""
+        return self._active
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+
+    async def release(self) -> None:
+        # Decrement before awaiting the lock so a cancelled release can't leak a slot
+        self._active -= 1
+        await asyncio.shield(self._notify_waiters())
+
+    async def set_limit(self, limit: int) -> None:
+        self.limit = limit
+        await self._notify_waiters()
+
+    async def _notify_waiters(self) -> None:
+        # Wake every waiter to re-check; there are at most a handful queued
+        async with self._cond:
+            self._cond.notify_all()
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.release()
+
+
 # Concurrency control: limit concurrent Claude agent processes
 MAX_CONCURRENT_AGENTS = int(os.environ.get("MAINTHREAD_MAX_AGENTS", "20"))
-_agent_semaphore = asyncio.Semaphore(MAX_CONCURRENT_AGENTS)
+_agent_semaphore = AgentSlots(MAX_CONCURRENT_AGENTS)
 
 # Agent execution timeout (default 30 min - complex tasks like full-stack builds need time)
 AGENT_TIMEOUT_SECONDS = int(os.environ.get("MAINTHREAD_AGENT_TIMEOUT", "1800"))
@@ -105,13 +179,49 @@ async def _periodic_event_cleanup() -> None:
     while True:
         try:
             await asyncio.sleep(EVENT_CLEANUP_INTERVAL_SECONDS)
-            deleted = cleanup_old_events(max_age_hours=24)
+            # Off the event loop: batches commit separately, so SSE writes
+            # interleave with the cleanup instead of waiting for all of it
+            deleted = await asyncio.to_thread(cleanup_old_events, 24)
             if deleted > 0:
-                logger.info(f"[EVENT_CLEANUP] Removed {deleted} events older than 24h")
+                logger.info("[EVENT_CLEANUP] Removed %d events older than 24h", deleted)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.debug("[EVENT_CLEANUP] Error during cleanup: %s", e)
+
+
+async def _periodic_wal_checkpoint() -> None:
+    """Periodically checkpoint and truncate the SQLite WAL file."""
+    while True:
+        try:
+            await asyncio.sleep(WAL_CHECKPOINT_INTERVAL_SECONDS)
+            await asyncio.to_thread(checkpoint_wal)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.debug("[WAL_CHECKPOINT] Error during checkpoint: %s", e)
+
+
+def _sample_system_stats() -> None:
+    """Take a CPU and memory sample for /api/stats."""
+    global _system_snapshot
+    _system_snapshot = {
+        "cpu_percent": psutil.cpu_percent(interval=None),
+        "memory": psutil.virtual_memory(),
+    }
+
+
+async def _periodic_stats_sampler() -> None:
+    """Periodically refresh the system CPU and memory snapshot."""
+    while True:
+        try:
+            await asyncio.to_thread(_sample_system_stats)
+            await asyncio.sleep(STATS_SAMPLE_INTERVAL_SECONDS)
         except asyncio.CancelledError:
             break
         except Exception as e:
-            logger.debug(f"[EVENT_CLEANUP] Error during cleanup: {e}")
+            logger.debug("[STATS] Error sampling system stats: %s", e)
+            await asyncio.sleep(STATS_SAMPLE_INTERVAL_SECONDS)
 
 
 async def _stuck_thread_watchdog() -> None:
@@ -128,53 +238,57 @@ async def _stuck_thread_watchdog() -> None:
     while True:
         try:
             await asyncio.sleep(WATCHDOG_INTERVAL_SECONDS)
-            now = datetime.now(timezone.utc)
-            all_threads = get_all_threads(include_archived=False)
-            for thread in all_threads:
-                status = thread.get("status")
-                if status != "running":
-                    continue
-                updated_at = thread.get("updatedAt") or thread.get("createdAt", "")
-                if not updated_at:
-                    continue
-                try:
-                    updated = datetime.fromisoformat(updated_at.replace("Z", "+00:00"))
-                    if updated.tzinfo is None:
-                        updated = updated.replace(tzinfo=timezone.utc)
-                    elapsed = (now - updated).total_seconds()
-                    if elapsed > WATCHDOG_STUCK_THRESHOLD_SECONDS:
-                        thread_id = thread["id"]
-                        has_subscribers = bool(thread_subscribers.get(thread_id))
-                        logger.warning(
-                            f"[WATCHDOG] Recovering thread {thread_id} ({thread['title']!r}) "
-                            f"stuck in '{status}' for {int(elapsed)}s, "
-                            f"subscribers={has_subscribers}"
-                        )
-
-                        # Actively recover: set to needs_attention
-                        update_thread_status(thread_id, "needs_attention")
-
-                        # Broadcast error to SSE subscribers so UI updates
-                        await broadcast_to_thread(thread_id, {
-                            "type": "error",
-                            "data": {"error": f"Process appears to have died (stuck in '{status}' for {int(elapsed)}s). You can retry by sending a new message."},
-                        })
-                        await broadcast_to_thread(thread_id, {
-                            "type": "status_change",
-                            "data": {"status": "needs_attention"},
-                        })
-
-                        # Notify parent if this is a sub-thread
-                        parent_id = thread.get("parentId")
-                        if parent_id:
-                            await _notify_parent_of_stuck_child(parent_id, thread)
-
-                except (ValueError, TypeError):
-                    pass
+            # DB work runs off the event loop so a concurrent WAL checkpoint
+            # holding the write lock cannot stall SSE streaming
+            recovered = await asyncio.to_thread(_recover_stuck_threads_sync)
+            await asyncio.gather(*(_announce_stuck_thread(t) for t in recovered))
         except asyncio.CancelledError:
             return
         except Exception as e:
-            logger.debug(f"[WATCHDOG] Error during check: {e}")
+            logger.debug("[WATCHDOG] Error during check: %s", e)
+
+
+def _recover_stuck_threads_sync() -> list[dict[str, Any]]:
+    """Mark stuck running threads as needs_attention and return them.
+
+    Select and update run back to back in one thread-pool hop; the update
+    only touches threads still 'running', so one that finished since the
+    select keeps its status and is not returned.
+    """
+    stuck_threads = get_stuck_running_threads(WATCHDOG_STUCK_THRESHOLD_SECONDS)
+    if not stuck_threads:
+        return []
+    recovered = set(bulk_update_thread_status(
+        [t["id"] for t in stuck_threads], "needs_attention", from_status="running"
+    ))
+    return [t for t in stuck_threads if t["id"] in recovered]
+
+
+async def _announce_stuck_thread(thread: dict[str, Any]) -> None:
+    """Tell a recovered thread's subscribers (and its parent) that it died."""
+    thread_id = thread["id"]
+    status = thread["status"]
+    elapsed = thread["stuckSeconds"]
+    has_subscribers = bool(thread_subscribers.get(thread_id))
+    logger.warning(
+        "[WATCHDOG] Recovering thread %s (%r) stuck in '%s' for %ss, subscribers=%s",
+        thread_id, thread["title"], status, elapsed, has_subscribers,
+    )
+
+    # Broadcast error to SSE subscribers so UI updates
+    await broadcast_to_thread(thread_id, {
+        "type": "error",
+        "data": {"error": f"Process appears to have died (stuck in '{status}' for {elapsed}s). You can retry by sending a new message."},
+    })
+    await broadcast_to_thread(thread_id, {
+        "type": "status_change",
+        "data": {"status": "needs_attention"},
+    })
+
+    # Notify parent if this is a sub-thread
+    parent_id = thread.get("parentId")
+    if parent_id:
+        await _notify_parent_of_stuck_child(parent_id, thread)
 
 
 async def _notify_parent_of_stuck_child(parent_id: str, child_thread: dict[str, Any]) -> None:
@@ -186,23 +300,25 @@ async def _notify_parent_of_stuck_child(parent_id: str, child_thread: dict[str,
     child_id = child_thread["id"]
     child_title = child_thread.get("title", "Unknown")
 
-    # Broadcast status event to parent's SSE subscribers
-    await broadcast_to_thread(parent_id, {
-        "type": "subthread_status",
-        "data": {
-            "threadId": child_id,
-            "status": "needs_attention",
-            "title": child_title,
-        },
-    })
-
-    # Inject notification message into parent thread
     notification_content = (
         f'[notification] Sub-thread "{child_title}" appears to have crashed '
         f"or timed out. It has been marked as needing attention. "
         f"You can retry by sending a message to it."
     )
-    user_notification = add_message(parent_id, "user", notification_content)
+
+    # Broadcast status event to parent's SSE subscribers while the
+    # notification message is written off the event loop
+    _, user_notification = await asyncio.gather(
+        broadcast_to_thread(parent_id, {
+            "type": "subthread_status",
+            "data": {
+                "threadId": child_id,
+                "status": "needs_attention",
+                "title": child_title,
+            },
+        }),
+        asyncio.to_thread(add_message, parent_id, "user", notification_content),
+    )
     await broadcast_to_thread(parent_id, {
         "type": "message",
         "data": {"message": user_notification},
@@ -243,6 +359,17 @@ async def lifespan(app: FastAPI):
         _event_cleanup_task.cancel()
     _event_cleanup_task = asyncio.create_task(_periodic_event_cleanup())
 
+    global _wal_checkpoint_task
+    if _wal_checkpoint_task:
+        _wal_checkpoint_task.cancel()
+    _wal_checkpoint_task = asyncio.create_task(_periodic_wal_checkpoint())
+
+    global _stats_sampler_task
+    if _stats_sampler_task:
+        _stats_sampler_task.cancel()
+    if psutil is not None:
+        _stats_sampler_task = asyncio.create_task(_periodic_stats_sampler())
+
     logger.info("MainThread API started - SSE events persisted to SQLite")
     yield
     # Shutdown: cleanup
@@ -258,6 +385,14 @@ async def lifespan(app: FastAPI):
         _event_cleanup_task.cancel()
         tasks_to_cancel.append(_event_cleanup_task)
         _event_cleanup_task = None
+    if _wal_checkpoint_task:
+        _wal_checkpoint_task.cancel()
+        tasks_to_cancel.append(_wal_checkpoint_task)
+        _wal_checkpoint_task = None
+    if _stats_sampler_task:
+        _stats_sampler_task.cancel()
+        tasks_to_cancel.append(_stats_sampler_task)
+        _stats_sampler_task = None
 
     thread_subscribers.clear()
     # Cancel notification workers
@@ -275,6 +410,9 @@ async def lifespan(app: FastAPI):
     if tasks_to_cancel:
         await asyncio.gather(*tasks_to_cancel, return_exceptions=True)
     await clear_all_tasks()
+    # Persist any buffered events and token usage before the process exits
+    flush_events()
+    flush_usage()
     logger.info("MainThread API shutdown complete")
 
 
@@ -307,6 +445,10 @@ app.add_middleware(
 
 # Static file serving setup - routes defined at end of file after API routes
 _static_dir = Path(__file__).parent / "static"
+# The built frontend only changes on reinstall, so stat index.html once
+_INDEX_PATH = _static_dir / "index.html"
+_INDEX_EXISTS = _INDEX_PATH.exists()
+_API_PREFIX = "/api/"
 
 
 def validate_work_dir(work_dir: str | None) -> str:
@@ -362,16 +504,15 @@ async def global_exception_handler(request: Request, exc: Exception):
 async def spa_fallback_handler(request: Request, exc: HTTPException):
     """Serve index.html for 404s on non-API routes (SPA client-side routing)."""
     # Let API 404s return normal JSON error
-    if request.url.path.startswith("/api/"):
+    if request.scope["path"].startswith(_API_PREFIX):
         return JSONResponse(
             status_code=404,
             content={"detail": exc.detail or "Not found"},
         )
 
     # Serve SPA for frontend routes
-    index_path = _static_dir / "index.html"
-    if index_path.exists():
-        return FileResponse(index_path)
+    if _INDEX_EXISTS:
+        return FileResponse(_INDEX_PATH)
 
     return JSONResponse(
         status_code=404,
@@ -381,8 +522,20 @@ async def spa_fallback_handler(request: Request, exc: HTTPException):
 
 # Maximum retries when a Claude process dies mid-execution
 MAX_AGENT_RETRIES = int(os.environ.get("MAINTHREAD_MAX_RETRIES", "2"))
+_MAX_ATTEMPTS = MAX_AGENT_RETRIES + 1
 RETRY_DELAY_SECONDS = 3
 
+# Streaming state is saved to the DB at most this often, or sooner once this
+# many characters of text/thinking have arrived since the last save
+STREAM_SAVE_INTERVAL_SECONDS = 0.25
+STREAM_SAVE_CHARS = 8192
+
+# Consecutive text deltas arriving within this window go out as one SSE event
+TEXT_DELTA_COALESCE_SECONDS = 0.025
+
+# SpawnThread embeds the new thread's ID in its tool result
+_SPAWN_DATA_RE = re.compile(r"<!--SPAWN_DATA:([a-f0-9-]+)-->")
+
 
 # Shared message processing logic to reduce duplication
 class MessageStreamProcessor:
@@ -391,23 +544,45 @@ class MessageStreamProcessor:
     This class extracts the common message processing logic used by
     send_message(), run_thread_for_agent(), and run_parent_thread_notification().
 
-    Messages are saved incrementally to the database after each event,
-    so content is preserved even if the browser is refreshed mid-stream.
+    Messages are saved incrementally to the database as events arrive
+    (coalesced to one write per STREAM_SAVE_INTERVAL_SECONDS), so content is
+    preserved even if the browser is refreshed mid-stream.
+
+    Text deltas are batched into one text_delta broadcast per
+    TEXT_DELTA_COALESCE_SECONDS; pending text is always flushed before any
+    other event is broadcast, so clients see events in stream order.
     """
 
-    def __init__(self, thread_id: str):
+    def __init__(self, thread_id: str, work_dir: str | None = None):
         self.thread_id = thread_id
+        # Inherited by ephemeral Task threads; passed in by the caller, which
+        # already has the thread row, to avoid a lookup per Task invocation
+        self.work_dir = work_dir
         self.collected_content: list[str] = []
         self.collected_blocks: list[dict[str, Any]] = []
+        # Serialized JSON per block, reused by get_content_blocks_json() until
+        # the block changes (None = needs re-serializing)
+        self._block_json: list[str | None] = []
         self.pending_tool_ids: list[str] = []
+        self._tool_names: dict[str, str] = {}
+        # The last block, if it is a text/thinking block that deltas extend;
+        # cleared whenever any other block is appended
+        self._open_text_block: dict[str, Any] | None = None
+        self._open_thinking_block: dict[str, Any] | None = None
         self.final_status = "active"
         self.final_session_id: str | None = None
+        self._last_save = time.monotonic()
+        self._unsaved_chars = 0
+        # Trailing save for state left unsaved by a coalesced (skipped) save
+        self._save_handle: asyncio.TimerHandle | None = None
+        self._pending_text: list[str] = []
+        self._text_flush_handle: asyncio.TimerHandle | None = None
         # Create assistant message immediately so it persists through refresh
         self._message = add_message(thread_id, "assistant", "[streaming...]")
         self.message_id = self._message["id"]
 
     def _save_current_state(self) -> None:
-        """Save current content_blocks to database (called after each event).
+        """Save current content_blocks to database.
 
         IMPORTANT: We keep content as '[streaming...]' during streaming so the
         frontend's shouldSkipContentBlocks guard works correctly. If we updated
@@ -415,26 +590,85 @@ class MessageStreamProcessor:
         would break the guard and cause duplicate rendering (streaming blocks +
         persisted content_blocks shown simultaneously).
         """
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
         content_blocks = self.get_content_blocks_json()
         updated = update_message(self.message_id, "[streaming...]", content_blocks)
         if updated:
             self._message = updated
+        self._last_save = time.monotonic()
+        self._unsaved_chars = 0
+
+    def _maybe_save_state(self) -> None:
+        """Save streaming state if enough time or text has accumulated.
+
+        A skipped save is made up by a timer at the end of the interval, so
+        the last event before an idle stretch (e.g. a tool_use block ahead of
+        a long-running tool) is saved without waiting for the next event.
+        """
+        elapsed = time.monotonic() - self._last_save
+        if self._unsaved_chars >= STREAM_SAVE_CHARS or elapsed >= STREAM_SAVE_INTERVAL_SECONDS:
+            self._save_current_state()
+        elif self._save_handle is None:
+            self._save_handle = asyncio.get_running_loop().call_later(
+                STREAM_SAVE_INTERVAL_SECONDS - elapsed, self._on_save_timer
+            )
+
+    def _on_save_timer(self) -> None:
+        """Timer callback: save state that was left unsaved by coalescing."""
+        self._save_handle = None
+        self._save_current_state()
 
     def finalize_content(self) -> None:
         """Update the message with final content text (called once at end of stream)."""
+        if self._save_handle is not None:
+            # The final write below supersedes any trailing streaming save
+            self._save_handle.cancel()
+            self._save_handle = None
+        if self._text_flush_handle is not None:
+            # Nothing may be broadcast for this message after it is finalized
+            self._text_flush_handle.cancel()
+            self._text_flush_handle = None
         content = self.get_full_content()
         content_blocks = self.get_content_blocks_json()
         updated = update_message(self.message_id, content, content_blocks)
         if updated:
             self._message = updated
 
+    def _on_text_flush_timer(self) -> None:
+        """Timer callback: broadcast text that has waited out the coalescing window."""
+        self._text_flush_handle = None
+        if self._pending_text:
+            get_registry().spawn_background(self.flush_text(), "text_delta flush")
+
+    async def flush_text(self) -> None:
+        """Broadcast any buffered text as a single text_delta event."""
+        if self._text_flush_handle is not None:
+            self._text_flush_handle.cancel()
+            self._text_flush_handle = None
+        if not self._pending_text:
+            return
+        content = "".join(self._pending_text)
+        self._pending_text.clear()
+        await broadcast_to_thread(self.thread_id, {
+            "type": "text_delta",
+            "data": {"content": content},
+        })
+
+    def _block_changed(self, index: int) -> None:
+        """Drop the cached JSON for a block mutated in place."""
+        if index < len(self._block_json):
+            self._block_json[index] = None
+
     async def _complete_pending_tool(self) -> None:
         """Mark first pending tool as complete (FIFO fallback)."""
         if self.pending_tool_ids:
             tool_id = self.pending_tool_ids.pop(0)
-            for block in self.collected_blocks:
+            for i, block in enumerate(self.collected_blocks):
                 if block.get("type") == "tool_use" and block.get("id") == tool_id:
                     block["isComplete"] = True
+                    self._block_changed(i)
                     break
             await broadcast_to_thread(self.thread_id, {
                 "type": "tool_result",
@@ -443,31 +677,42 @@ class MessageStreamProcessor:
 
     async def process_message(self, msg) -> None:
         """Process a single message from the agent stream."""
-        logger.debug(f"[MSG] type={msg.type}, metadata={msg.metadata}")
+        logger.debug("[MSG] type=%s, metadata=%s", msg.type, msg.metadata)
+        if msg.type != "text" and self._pending_text:
+            await self.flush_text()
+
         if msg.type == "text":
             self.collected_content.append(msg.content)
-            if self.collected_blocks and self.collected_blocks[-1].get("type") == "text":
-                self.collected_blocks[-1]["content"] += msg.content
+            self._unsaved_chars += len(msg.content)
+            if self._open_text_block is not None:
+                self._open_text_block["content"] += msg.content
+                self._block_changed(len(self.collected_blocks) - 1)
             else:
-                self.collected_blocks.append({"type": "text", "content": msg.content})
-            await broadcast_to_thread(self.thread_id, {
-                "type": "text_delta",
-                "data": {"content": msg.content},
-            })
+                self._open_text_block = {"type": "text", "content": msg.content}
+                self._open_thinking_block = None
+                self.collected_blocks.append(self._open_text_block)
+            self._pending_text.append(msg.content)
+            if self._text_flush_handle is None:
+                self._text_flush_handle = asyncio.get_running_loop().call_later(
+                    TEXT_DELTA_COALESCE_SECONDS, self._on_text_flush_timer
+                )
 
         elif msg.type == "thinking":
-            if self.collected_blocks and self.collected_blocks[-1].get("type") == "thinking":
-                self.collected_blocks[-1]["content"] = (
-                    self.collected_blocks[-1].get("content") or ""
-                ) + msg.content
+            self._unsaved_chars += len(msg.content or "")
+            block = self._open_thinking_block
+            if block is not None:
+                block["content"] = (block["content"] or "") + msg.content
                 if msg.metadata and msg.metadata.get("signature"):
-                    self.collected_blocks[-1]["signature"] = msg.metadata.get("signature")
+                    block["signature"] = msg.metadata.get("signature")
+                self._block_changed(len(self.collected_blocks) - 1)
             else:
-                self.collected_blocks.append({
+                self._open_thinking_block = {
                     "type": "thinking",
                     "content": msg.content,
                     "signature": msg.metadata.get("signature") if msg.metadata else None,
-                })
+                }
+                self._open_text_block = None
+                self.collected_blocks.append(self._open_thinking_block)
             await broadcast_to_thread(self.thread_id, {
                 "type": "thinking",
                 "data": {
@@ -480,10 +725,13 @@ class MessageStreamProcessor:
             tool_data = msg.metadata or {}
             tool_id = tool_data.get("id")
             tool_name = tool_data.get("tool") or tool_data.get("name")
-            logger.debug(f"[SSE] tool_use: name={tool_name}, id={tool_id}")
+            logger.debug("[SSE] tool_use: name=%s, id=%s", tool_name, tool_id)
 
             if tool_id:
                 self.pending_tool_ids.append(tool_id)
+                self._tool_names[tool_id] = tool_name or ""
+            self._open_text_block = None
+            self._open_thinking_block = None
             self.collected_blocks.append({
                 "type": "tool_use",
                 "name": tool_name,
@@ -507,13 +755,11 @@ class MessageStreamProcessor:
                     ephemeral_title = task_description[:60] + ("..." if len(task_description) > 60 else "")
 
                 try:
-                    parent_thread = get_thread(self.thread_id)
-                    work_dir = parent_thread.get("workDir") if parent_thread else None
                     create_ephemeral_thread(
                         thread_id=tool_id,
                         title=ephemeral_title,
                         parent_id=self.thread_id,
-                        work_dir=work_dir,
+                        work_dir=self.work_dir,
                     )
                     await broadcast_to_thread(self.thread_id, {
                         "type": "subagent_start",
@@ -524,7 +770,7 @@ class MessageStreamProcessor:
                         },
                     })
                 except Exception as e:
-                    logger.warning(f"Failed to create ephemeral thread for Task {tool_id}: {e}")
+                    logger.warning("Failed to create ephemeral thread for Task %s: %s", tool_id, e)
 
             # Note: ExitPlanMode plan_approval broadcast is handled by the permission handler
             # in core.py (create_permission_handler). That handler blocks waiting for user
@@ -535,12 +781,13 @@ class MessageStreamProcessor:
             # Update tool block input when full input arrives from AssistantMessage
             tool_id = msg.metadata.get("id") if msg.metadata else None
             tool_input = msg.metadata.get("input") if msg.metadata else None
-            logger.debug(f"[SSE] tool_input: updating id={tool_id} with full input")
+            logger.debug("[SSE] tool_input: updating id=%s with full input", tool_id)
             if tool_id and tool_input:
                 # Update collected block with full input
-                for block in self.collected_blocks:
+                for i, block in enumerate(self.collected_blocks):
                     if block.get("type") == "tool_use" and block.get("id") == tool_id:
                         block["input"] = tool_input
+                        self._block_changed(i)
                         break
                 # Broadcast input update to frontend
                 await broadcast_to_thread(self.thread_id, {
@@ -551,37 +798,45 @@ class MessageStreamProcessor:
         elif msg.type == "tool_result":
             tool_use_id = msg.metadata.get("tool_use_id") if msg.metadata else None
             is_error = msg.metadata.get("is_error", False) if msg.metadata else False
-            logger.debug(f"[SSE] tool_result: tool_use_id={tool_use_id}, is_error={is_error}, pending={self.pending_tool_ids}")
+            logger.debug(
+                "[SSE] tool_result: tool_use_id=%s, is_error=%s, pending=%s",
+                tool_use_id, is_error, self.pending_tool_ids,
+            )
             # FIFO fallback: if SDK doesn't provide tool_use_id, use first pending
             if not tool_use_id and self.pending_tool_ids:
                 tool_use_id = self.pending_tool_ids.pop(0)
-                logger.debug(f"[SSE] tool_result: used FIFO fallback, got id={tool_use_id}")
+                logger.debug("[SSE] tool_result: used FIFO fallback, got id=%s", tool_use_id)
             elif tool_use_id and tool_use_id in self.pending_tool_ids:
                 self.pending_tool_ids.remove(tool_use_id)
             if tool_use_id:
-                for block in self.collected_blocks:
+                for i, block in enumerate(self.collected_blocks):
                     if block.get("type") == "tool_use" and block.get("id") == tool_use_id:
                         block["isComplete"] = True
                         if is_error:
                             block["isError"] = True
-                        logger.debug(f"[SSE] tool_result: marked block {tool_use_id} as complete (error={is_error})")
+                        self._block_changed(i)
+                        logger.debug(
+                            "[SSE] tool_result: marked block %s as complete (error=%s)",
+                            tool_use_id, is_error,
+                        )
                         break
             # Include result content for tools that return structured data
             result_data: dict[str, Any] = {"tool_use_id": tool_use_id, "is_error": is_error}
             if msg.content:
                 result_data["content"] = msg.content
                 # Extract thread_id from SpawnThread tool result (embedded as <!--SPAWN_DATA:uuid-->)
-                import re
-                spawn_match = re.search(r"<!--SPAWN_DATA:([a-f0-9-]+)-->", str(msg.content))
-                if spawn_match:
-                    result_data["thread_id"] = spawn_match.group(1)
+                # The tool may be namespaced (mcp__mainthread__SpawnThread)
+                if tool_use_id and self._tool_names.get(tool_use_id, "").endswith("SpawnThread"):
+                    spawn_match = _SPAWN_DATA_RE.search(str(msg.content))
+                    if spawn_match:
+                        result_data["thread_id"] = spawn_match.group(1)
             await broadcast_to_thread(self.thread_id, {
                 "type": "tool_result",
                 "data": result_data,
             })
 
         elif msg.type == "error":
-            logger.error(f"Agent error in thread {self.thread_id}: {msg.content}")
+            logger.error("Agent error in thread %s: %s", self.thread_id, msg.content)
             await broadcast_to_thread(self.thread_id, {
                 "type": "error",
                 "data": {"error": msg.content},
@@ -612,11 +867,12 @@ class MessageStreamProcessor:
             if msg.metadata:
                 self.final_session_id = msg.metadata.get("session_id")
 
-        # Save after every event so content survives browser refresh
-        self._save_current_state()
+        # Save periodically so content survives browser refresh
+        self._maybe_save_state()
 
     async def finalize(self) -> None:
         """Complete remaining pending tools and finalize message content."""
+        await self.flush_text()
         while self.pending_tool_ids:
             await self._complete_pending_tool()
         # Now that streaming is done, write the real content text
@@ -627,8 +883,21 @@ class MessageStreamProcessor:
         return "".join(self.collected_content) or "No response generated"
 
     def get_content_blocks_json(self) -> str | None:
-        """Get JSON-serialized content blocks."""
-        return json.dumps(self.collected_blocks) if self.collected_blocks else None
+        """Get JSON-serialized content blocks.
+
+        Equivalent to serializing self.collected_blocks whole, but only blocks
+        that are new or changed since the last call are re-serialized.
+        """
+        if not self.collected_blocks:
+            return None
+        cache = self._block_json
+        cache.extend([None] * (len(self.collected_blocks) - len(cache)))
+        parts: list[str] = []
+        for i, cached in enumerate(cache):
+            if cached is None:
+                cached = cache[i] = json.dumps(self.collected_blocks[i])
+            parts.append(cached)
+        return "[" + ", ".join(parts) + "]"
 
 
 async def run_agent_with_retry(
@@ -646,6 +915,9 @@ async def run_agent_with_retry(
     3. Sends a continuation message to resume the conversation
     4. Retries up to MAX_AGENT_RETRIES times
 
+    All attempts share a single AGENT_TIMEOUT_SECONDS budget, so retries
+    never extend how long the user waits overall.
+
     This gives MainThread the same resilience as `claude --continue` in the CLI.
 
     Args:
@@ -659,16 +931,29 @@ async def run_agent_with_retry(
     """
     last_error: Exception | None = None
 
-    for attempt in range(MAX_AGENT_RETRIES + 1):
-        thread = get_thread(thread_id)
-        if not thread:
-            raise ValueError(f"Thread {thread_id} not found")
+    # A sub-thread must not start in the parent's checkout while its own
+    # worktree is still being created. Shielded: cancelling the run must not
+    # abandon a half-created worktree.
+    pending_worktree = _pending_worktrees.get(thread_id)
+    if pending_worktree is not None:
+        await asyncio.shield(pending_worktree)
+
+    thread = get_thread(thread_id)
+    if not thread:
+        raise ValueError(f"Thread {thread_id} not found")
+
+    deadline = asyncio.get_running_loop().time() + AGENT_TIMEOUT_SECONDS
 
+    for attempt in range(_MAX_ATTEMPTS):
         # On retry, send a continuation message instead of the original
         if attempt > 0:
+            # Re-fetch only after a failure, to pick up the saved session_id
+            thread = get_thread(thread_id)
+            if not thread:
+                raise ValueError(f"Thread {thread_id} not found")
             logger.info(
-                f"[RETRY] Attempt {attempt + 1}/{MAX_AGENT_RETRIES + 1} for thread {thread_id}, "
-                f"session_id={thread.get('sessionId', 'none')}"
+                "[RETRY] Attempt %d/%d for thread %s, session_id=%s",
+                attempt + 1, _MAX_ATTEMPTS, thread_id, thread.get("sessionId", "none"),
             )
             await asyncio.sleep(RETRY_DELAY_SECONDS)
 
@@ -693,7 +978,7 @@ async def run_agent_with_retry(
             effective_message = user_message
             effective_images = images
 
-        processor = MessageStreamProcessor(thread_id)
+        processor = MessageStreamProcessor(thread_id, work_dir=thread.get("workDir"))
 
         try:
             if broadcast_status:
@@ -703,7 +988,7 @@ async def run_agent_with_retry(
                     "data": {"status": "running"},
                 })
 
-            async with asyncio.timeout(AGENT_TIMEOUT_SECONDS):
+            async with asyncio.timeout_at(deadline):
                 async for msg in run_agent(
                     thread,
                     effective_message,
@@ -727,30 +1012,32 @@ async def run_agent_with_retry(
             raise
 
         except TimeoutError:
-            # Timeout - don't retry (already waited long enough)
+            # Timeout - the shared deadline has passed, so no retry
+            await processor.flush_text()
             processor.finalize_content()
             raise
 
         except Exception as e:
             last_error = e
+            await processor.flush_text()
             processor.finalize_content()
 
             if attempt < MAX_AGENT_RETRIES:
                 logger.warning(
-                    f"[RETRY] Agent process died in thread {thread_id} "
-                    f"(attempt {attempt + 1}): {e}. Will retry with session resumption."
+                    "[RETRY] Agent process died in thread %s (attempt %d): %s. "
+                    "Will retry with session resumption.",
+                    thread_id, attempt + 1, e,
                 )
-                # Save session_id if we got one before the crash
-                if processor.final_session_id:
-                    update_thread_session(thread_id, processor.final_session_id)
-                # Touch updatedAt to reset the watchdog timer so it doesn't
-                # fire during retry attempts and send premature parent notifications
-                update_thread_status(thread_id, "running")
+                # Save session_id if we got one before the crash, and touch
+                # updatedAt to reset the watchdog timer so it doesn't fire
+                # during retry attempts and send premature parent notifications
+                update_thread_status(thread_id, "running", processor.final_session_id)
                 continue
             else:
                 # Out of retries
                 logger.error(
-                    f"[RETRY] All {MAX_AGENT_RETRIES + 1} attempts failed for thread {thread_id}: {e}"
+                    "[RETRY] All %d attempts failed for thread %s: %s",
+                    _MAX_ATTEMPTS, thread_id, e,
                 )
                 raise
 
@@ -759,6 +1046,11 @@ async def run_agent_with_retry(
 
 
 # Callback implementations for agents module
+async def _none() -> None:
+    """Placeholder awaitable for an asyncio.gather() slot with nothing to do."""
+    return None
+
+
 async def create_thread_for_agent(
     title: str,
     parent_id: str | None = None,
@@ -785,70 +1077,59 @@ async def create_thread_for_agent(
     """
     # Validate and normalize working directory
     validated_work_dir = validate_work_dir(work_dir)
-    # Detect git info from working directory
-    git_info = await detect_git_info(validated_work_dir)
+    # Detect git info from working directory while the parent is loaded
+    git_info, parent = await asyncio.gather(
+        detect_git_info(validated_work_dir),
+        asyncio.to_thread(get_thread, parent_id) if parent_id else _none(),
+    )
 
     # If parent_id provided and params not explicit, inherit from parent
     parent_allow_nested = False
     parent_max_depth = 1
-    if parent_id:
-        parent = get_thread(parent_id)
-        if parent:
-            if model is None:
-                model = parent.get("model", "claude-opus-4-5")
-            if permission_mode is None:
-                permission_mode = parent.get("permissionMode", "acceptEdits")
-            if extended_thinking is None:
-                extended_thinking = parent.get("extendedThinking", True)
-            parent_allow_nested = parent.get("allowNestedSubthreads", False)
-            parent_max_depth = parent.get("maxThreadDepth", 1)
-
-    # For sub-threads in git repos, create an isolated worktree if requested
-    worktree_info: dict[str, Any] = {"success": False, "worktree_path": None, "branch_name": None, "error": None}
-    final_work_dir = validated_work_dir
-    final_is_worktree = git_info["is_worktree"]
-    worktree_branch: str | None = None
-
-    if use_worktree and parent_id and git_info["git_branch"] and not git_info["is_worktree"]:
-        # Generate a temporary thread_id for worktree naming (will be the actual thread_id)
-        import uuid
-        temp_thread_id = str(uuid.uuid4())
-        worktree_info = await create_git_worktree(validated_work_dir, temp_thread_id, worktree_subdir)
-
-        if worktree_info["success"]:
-            # Use the worktree path as the working directory
-            final_work_dir = worktree_info["worktree_path"]
-            final_is_worktree = True
-            worktree_branch = worktree_info["branch_name"]
-            logger.info(f"Sub-thread will use worktree at {final_work_dir} on branch {worktree_branch}")
-        else:
-            # Fallback to original work_dir, log warning
-            logger.warning(f"Worktree creation failed for sub-thread, using original work_dir: {worktree_info['error']}")
-
-    # If worktree was created, construct git info from what we already know
-    # instead of calling detect_git_info again (avoids ~7 extra subprocess calls)
-    if worktree_info["success"]:
-        git_info = {
-            "git_branch": worktree_branch,
-            "git_repo": git_info["git_repo"],  # repo name unchanged
-            "is_worktree": True,
-        }
+    if parent:
+        if model is None:
+            model = parent.get("model", "claude-opus-4-5")
+        if permission_mode is None:
+            permission_mode = parent.get("permissionMode", "acceptEdits")
+        if extended_thinking is None:
+            extended_thinking = parent.get("extendedThinking", True)
+        parent_allow_nested = parent.get("allowNestedSubthreads", False)
+        parent_max_depth = parent.get("maxThreadDepth", 1)
+
+    # For sub-threads in git repos, create an isolated worktree if requested.
+    # The thread is created in the base work_dir right away and the worktree
+    # (1-5s of `git worktree add`) is created in the background; runs of the
+    # thread wait for it in run_agent_with_retry().
+    worktree_info: dict[str, Any] = {
+        "success": False, "pending": False, "worktree_path": None, "branch_name": None, "error": None,
+    }
+    create_worktree = bool(
+        use_worktree and parent_id and git_info["git_branch"] and not git_info["is_worktree"]
+    )
 
     thread = create_thread(
         title=title,
         parent_id=parent_id,
-        work_dir=final_work_dir,
+        work_dir=validated_work_dir,
         model=model or "claude-opus-4-5",
         extended_thinking=extended_thinking if extended_thinking is not None else True,
         permission_mode=permission_mode or "acceptEdits",
         git_branch=git_info["git_branch"],
         git_repo=git_info["git_repo"],
-        is_worktree=final_is_worktree,
-        worktree_branch=worktree_branch,
+        is_worktree=git_info["is_worktree"],
         allow_nested_subthreads=parent_allow_nested,
         max_thread_depth=parent_max_depth,
     )
 
+    if create_worktree and parent_id:
+        worktree_info["pending"] = True
+        task = get_registry().spawn_background(
+            _finalize_worktree(thread["id"], parent_id, validated_work_dir, worktree_subdir),
+            f"Worktree creation for {thread['id']}",
+        )
+        _pending_worktrees[thread["id"]] = task
+        task.add_done_callback(lambda t: _pending_worktrees.pop(thread["id"], None))
+
     # Store worktree info in thread metadata for response messages
     thread["_worktree_info"] = worktree_info
 
@@ -866,8 +1147,12 @@ async def create_thread_for_agent(
     # (including permissionMode). The frontend filters out duplicate notifications
     # for SpawnThread-created threads, so this won't cause duplicate UI display.
     if parent_id:
-        # Create a clean copy without internal metadata
-        thread_data = {k: v for k, v in thread.items() if not k.startswith("_")}
+        # Create a clean copy without internal metadata (_worktree_info is the
+        # only underscore key set on the thread dict)
+        thread_data = dict(thread)
+        thread_data.pop("_worktree_info", None)
+        # Lets the UI show the worktree as pending until worktree_ready/_failed
+        thread_data["worktreePending"] = worktree_info["pending"]
 
         async def _broadcast_thread_created():
             try:
@@ -879,15 +1164,93 @@ async def create_thread_for_agent(
                 # Broadcast failure is non-critical - frontend will get data on next fetch
                 logger.debug(f"Failed to broadcast thread_created to {parent_id}: {e}")
 
-        task = asyncio.create_task(_broadcast_thread_created())
-        task.add_done_callback(
-            lambda t: logger.error(f"broadcast_thread_created failed: {t.exception()}")
-            if t.exception() else None
-        )
+        get_registry().spawn_background(_broadcast_thread_created(), "broadcast_thread_created")
 
     return thread
 
 
+# Sub-thread ID -> task creating its git worktree, while one is in progress
+_pending_worktrees: dict[str, asyncio.Task[None]] = {}
+
+
+async def _finalize_worktree(
+    thread_id: str, parent_id: str, base_work_dir: str, worktree_subdir: str
+) -> None:
+    """Create a sub-thread's git worktree and switch the thread over to it.
+
+    On failure the thread keeps working in base_work_dir. The parent was told
+    a worktree is being created, so it gets a worktree_failed event and a
+    notification message saying the sub-thread shares its checkout. Never
+    raises: runs of the thread await this task before starting.
+    """
+    try:
+        worktree_info = await create_git_worktree(base_work_dir, thread_id, worktree_subdir)
+        if worktree_info["success"]:
+            await _switch_to_worktree(
+                thread_id, parent_id, worktree_info["worktree_path"], worktree_info["branch_name"]
+            )
+            return
+        error = worktree_info["error"]
+    except Exception as e:
+        error = str(e)
+
+    logger.warning(
+        "Worktree creation failed for sub-thread %s, using original work_dir: %s", thread_id, error
+    )
+    try:
+        await _notify_worktree_failed(thread_id, parent_id, base_work_dir, error)
+    except Exception:
+        logger.exception("Failed to report worktree failure for sub-thread %s", thread_id)
+
+
+async def _switch_to_worktree(
+    thread_id: str, parent_id: str, worktree_path: str, worktree_branch: str
+) -> None:
+    """Point a sub-thread at its newly created worktree and announce it."""
+    if await asyncio.to_thread(get_thread, thread_id, False) is None:
+        # Thread was deleted while the worktree was being created
+        await cleanup_git_worktree(worktree_path, worktree_branch)
+        return
+
+    # The new branch is known, so git info needs no re-detection
+    await asyncio.to_thread(
+        update_thread_worktree, thread_id, worktree_path, worktree_branch, worktree_branch
+    )
+    logger.info("Sub-thread will use worktree at %s on branch %s", worktree_path, worktree_branch)
+
+    # Clients only take the workDir/git fields from the event, so no messages
+    thread = await asyncio.to_thread(get_thread, thread_id, False)
+    if thread:
+        event = {"type": "worktree_ready", "data": {"thread": thread}}
+        await broadcast_to_thread(thread_id, event)
+        await broadcast_to_thread(parent_id, event)
+
+
+async def _notify_worktree_failed(
+    thread_id: str, parent_id: str, base_work_dir: str, error: str | None
+) -> None:
+    """Tell a sub-thread's parent that its worktree could not be created."""
+    thread = await asyncio.to_thread(get_thread, thread_id, False)
+    if thread is None:
+        return
+
+    event = {"type": "worktree_failed", "data": {"threadId": thread_id, "error": error}}
+    await broadcast_to_thread(thread_id, event)
+    await broadcast_to_thread(parent_id, event)
+
+    # Injected into the parent so its agent sees it on next activation
+    notification_content = (
+        f'[notification] Sub-thread "{thread.get("title", "Unknown")}" could not get an '
+        f"isolated worktree ({error}). It is working directly in {base_work_dir}, "
+        "so its edits land in your checkout."
+    )
+    user_notification = await asyncio.to_thread(add_message, parent_id, "user", notification_content)
+    await broadcast_to_thread(parent_id, {
+        "type": "message",
+        "data": {"message": user_notification},
+    })
+
+
 async def broadcast_question_to_thread(thread_id: str, question_data: dict[str, Any]) -> None:
     """Broadcast a question event to a thread's subscribers.
 
@@ -900,7 +1263,7 @@ async def broadcast_question_to_thread(thread_id: str, question_data: dict[str,
     })
 
     # Bubble up to parent thread if this is a sub-thread
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if thread and thread.get("parentId"):
         parent_id = thread["parentId"]
         await broadcast_to_thread(parent_id, {
@@ -927,7 +1290,7 @@ async def broadcast_plan_approval_to_thread(thread_id: str, plan_data: dict[str,
 
 async def list_threads_for_agent() -> list[dict[str, Any]]:
     """List all threads - async wrapper for the agent's ListThreads tool."""
-    return await asyncio.to_thread(get_all_threads)
+    return await asyncio.to_thread(get_thread_summaries)
 
 
 async def archive_thread_for_agent(thread_id: str) -> bool:
@@ -936,12 +1299,10 @@ async def archive_thread_for_agent(thread_id: str) -> bool:
 
     if success:
         # Notify all subscribers about the archive
-        for queues in thread_subscribers.values():
-            for queue in queues:
-                await queue.put({
-                    "type": "thread_archived",
-                    "data": {"threadId": thread_id},
-                })
+        _broadcast_to_all_subscribers({
+            "type": "thread_archived",
+            "data": {"threadId": thread_id},
+        })
 
     return success
 
@@ -951,6 +1312,10 @@ async def read_thread_for_agent(thread_id: str, limit: int = 50) -> dict[str, An
     return await asyncio.to_thread(get_thread_messages_formatted, thread_id, limit)
 
 
+# How a sub-thread's final status reads in the parent's notification message
+_SUBTHREAD_STATUS_TEXT = {"done": "completed", "needs_attention": "needs attention"}
+
+
 async def notify_parent_of_subthread_completion(
     thread: dict[str, Any],
     thread_id: str,
@@ -970,7 +1335,8 @@ async def notify_parent_of_subthread_completion(
     if not parent_id:
         return
 
-    parent_thread = get_thread(parent_id)
+    # Only autoReact is read from the parent, so skip loading its messages
+    parent_thread = await asyncio.to_thread(get_thread, parent_id, False)
 
     # Determine effective status for notification
     # "active" means agent finished without explicit SignalStatus - treat as "done"
@@ -995,9 +1361,9 @@ async def notify_parent_of_subthread_completion(
         })
 
     # Inject user message into parent thread for agent visibility (user role so agent responds)
-    status_msg = "completed" if effective_status == "done" else "needs attention"
+    status_msg = _SUBTHREAD_STATUS_TEXT.get(effective_status, "needs attention")
     notification_content = f'[notification] Sub-thread "{thread["title"]}" {status_msg}.'
-    user_notification = add_message(parent_id, "user", notification_content)
+    user_notification = await asyncio.to_thread(add_message, parent_id, "user", notification_content)
 
     # Broadcast the notification to parent thread subscribers
     await broadcast_to_thread(parent_id, {
@@ -1007,10 +1373,9 @@ async def notify_parent_of_subthread_completion(
 
     # Only trigger parent thread agent if auto-react is enabled
     if parent_thread and parent_thread.get("autoReact", True):
-        task = asyncio.create_task(run_parent_thread_notification(parent_id, notification_content))
-        task.add_done_callback(
-            lambda t: logger.error(f"Parent notification task failed for {parent_id}: {t.exception()}")
-            if t.exception() else None
+        get_registry().spawn_background(
+            run_parent_thread_notification(parent_id, notification_content),
+            f"Parent notification task for {parent_id}",
         )
     else:
         logger.info(f"Skipping auto-react for parent thread {parent_id} (disabled)")
@@ -1021,18 +1386,25 @@ async def run_parent_thread_notification(thread_id: str, notification_content: s
 
     Uses a per-parent asyncio.Queue so notifications are processed one at a time
     but none are dropped. A background worker drains the queue sequentially.
+    The queue is bounded; when it is full, everything still pending is merged
+    into a single notification so memory stays bounded without losing any.
     """
     # Ensure queue and worker exist for this parent thread
     if thread_id not in _notification_queues:
-        _notification_queues[thread_id] = asyncio.Queue()
-        worker = asyncio.create_task(_notification_worker(thread_id))
-        def _on_worker_done(t):
-            if t.exception():
-                logger.error(f"Notification worker for {thread_id} failed: {t.exception()}")
-        worker.add_done_callback(_on_worker_done)
-        _notification_workers[thread_id] = worker
-
-    await _notification_queues[thread_id].put(notification_content)
+        _notification_queues[thread_id] = asyncio.Queue(maxsize=NOTIFICATION_QUEUE_MAX)
+        _notification_workers[thread_id] = get_registry().spawn_background(
+            _notification_worker(thread_id), f"Notification worker for {thread_id}"
+        )
+
+    queue = _notification_queues[thread_id]
+    if queue.full():
+        pending = [queue.get_nowait() for _ in range(queue.qsize())]
+        notification_content = "\n".join([*pending, notification_content])
+        logger.warning(
+            "Notification queue full for parent thread %s; merged %d pending notifications",
+            thread_id, len(pending),
+        )
+    queue.put_nowait(notification_content)
     logger.info(f"Enqueued notification for parent thread {thread_id}")
 
 
@@ -1064,9 +1436,7 @@ async def _notification_worker(thread_id: str) -> None:
             assistant_message = processor._message
 
             # Update thread status and session
-            update_thread_status(thread_id, processor.final_status)
-            if processor.final_session_id:
-                update_thread_session(thread_id, processor.final_session_id)
+            update_thread_status(thread_id, processor.final_status, processor.final_session_id)
 
             # Notify subscribers of completion
             await broadcast_to_thread(thread_id, {
@@ -1141,14 +1511,14 @@ async def run_thread_for_agent(thread_id: str, message: str, skip_add_message: b
         assistant_message = processor._message
 
         # Update thread status and session
-        update_thread_status(thread_id, processor.final_status)
-        if processor.final_session_id:
-            update_thread_session(thread_id, processor.final_session_id)
+        update_thread_status(thread_id, processor.final_status, processor.final_session_id)
 
-        # Handle sub-thread completion signals (auto-signal if agent didn't call SignalStatus)
-        thread = get_thread(thread_id)  # Re-fetch for latest state
-        if thread:
-            await notify_parent_of_subthread_completion(thread, thread_id, processor.final_status)
+        # Handle sub-thread completion signals (auto-signal if agent didn't call SignalStatus).
+        # Only status and session changed since the thread was loaded, so no re-fetch.
+        thread["status"] = processor.final_status
+        if processor.final_session_id:
+            thread["sessionId"] = processor.final_session_id
+        await notify_parent_of_subthread_completion(thread, thread_id, processor.final_status)
 
         # Notify subscribers of completion
         await broadcast_to_thread(thread_id, {
@@ -1171,10 +1541,9 @@ async def run_thread_for_agent(thread_id: str, message: str, skip_add_message: b
             "type": "error",
             "data": {"error": f"Request timed out after {AGENT_TIMEOUT_SECONDS // 60} minutes"},
         })
-        # Notify parent so it knows the sub-thread failed (re-fetch for fresh state)
-        err_thread = get_thread(thread_id)
-        if err_thread:
-            await _notify_parent_on_subthread_error(err_thread, thread_id, f"timed out after {AGENT_TIMEOUT_SECONDS // 60} minutes")
+        # Notify parent so it knows the sub-thread failed
+        thread["status"] = "needs_attention"
+        await _notify_parent_on_subthread_error(thread, thread_id, f"timed out after {AGENT_TIMEOUT_SECONDS // 60} minutes")
 
     except Exception as e:
         error_msg = str(e) or type(e).__name__
@@ -1184,10 +1553,9 @@ async def run_thread_for_agent(thread_id: str, message: str, skip_add_message: b
             "type": "error",
             "data": {"error": error_msg},
         })
-        # Notify parent so it knows the sub-thread failed (re-fetch for fresh state)
-        err_thread = get_thread(thread_id)
-        if err_thread:
-            await _notify_parent_on_subthread_error(err_thread, thread_id, error_msg)
+        # Notify parent so it knows the sub-thread failed
+        thread["status"] = "needs_attention"
+        await _notify_parent_on_subthread_error(thread, thread_id, error_msg)
 
     finally:
         unregister_task(thread_id)
@@ -1207,34 +1575,36 @@ async def _notify_parent_on_subthread_error(
     if not parent_id:
         return
 
-    # Broadcast subthread_status event to parent's SSE subscribers
-    await broadcast_to_thread(parent_id, {
-        "type": "subthread_status",
-        "data": {
-            "threadId": thread_id,
-            "status": "needs_attention",
-            "title": thread.get("title", "Unknown"),
-        },
-    })
-
-    # Inject notification message into parent so agent sees it on next activation
+    # Notification message injected into parent so agent sees it on next activation
     notification_content = (
         f'[notification] Sub-thread "{thread.get("title", "Unknown")}" encountered an error: '
         f"{error_msg}. You may need to retry or handle this manually."
     )
-    user_notification = add_message(parent_id, "user", notification_content)
+
+    # Broadcast subthread_status event to parent's SSE subscribers while the
+    # notification message is written off the event loop
+    _, user_notification = await asyncio.gather(
+        broadcast_to_thread(parent_id, {
+            "type": "subthread_status",
+            "data": {
+                "threadId": thread_id,
+                "status": "needs_attention",
+                "title": thread.get("title", "Unknown"),
+            },
+        }),
+        asyncio.to_thread(add_message, parent_id, "user", notification_content),
+    )
     await broadcast_to_thread(parent_id, {
         "type": "message",
         "data": {"message": user_notification},
     })
 
     # Trigger parent auto-react if enabled
-    parent_thread = get_thread(parent_id)
+    parent_thread = await asyncio.to_thread(get_thread, parent_id, False)
     if parent_thread and parent_thread.get("autoReact", True):
-        task = asyncio.create_task(run_parent_thread_notification(parent_id, notification_content))
-        task.add_done_callback(
-            lambda t: logger.error(f"Parent error notification task failed for {parent_id}: {t.exception()}")
-            if t.exception() else None
+        get_registry().spawn_background(
+            run_parent_thread_notification(parent_id, notification_content),
+            f"Parent error notification task for {parent_id}",
         )
 
 
@@ -1248,11 +1618,9 @@ async def broadcast_subagent_stop_to_thread(thread_id: str, event_data: dict[str
     # Update ephemeral thread status if it exists
     tool_use_id = event_data.get("toolUseId")
     if tool_use_id:
+        new_status = "done" if not event_data.get("error") else "needs_attention"
         try:
-            ephemeral = get_thread(tool_use_id)
-            if ephemeral and ephemeral.get("isEphemeral"):
-                new_status = "done" if not event_data.get("error") else "needs_attention"
-                update_thread_status(tool_use_id, new_status)
+            update_ephemeral_thread_status(tool_use_id, new_status)
         except Exception as e:
             logger.debug(f"Could not update ephemeral thread {tool_use_id}: {e}")
 
@@ -1274,7 +1642,7 @@ async def broadcast_status_signal_to_parent(
     its parent that it's done or needs attention.
     """
     # Get child thread info for the notification
-    child_thread = get_thread(child_thread_id)
+    child_thread = get_thread(child_thread_id, include_messages=False)
     child_title = child_thread.get("title", "Unknown") if child_thread else "Unknown"
 
     # Update the child thread's status
@@ -1327,10 +1695,9 @@ async def send_to_thread_for_agent(
         return None
 
     # Fire-and-forget: start processing the message in background
-    task = asyncio.create_task(run_thread_for_agent(target_thread_id, message))
-    task.add_done_callback(
-        lambda t: logger.error(f"SendToThread background task failed for {target_thread_id}: {t.exception()}")
-        if t.exception() else None
+    get_registry().spawn_background(
+        run_thread_for_agent(target_thread_id, message),
+        f"SendToThread background task for {target_thread_id}",
     )
 
     return {
@@ -1341,16 +1708,18 @@ async def send_to_thread_for_agent(
 
 
 # Register agent callbacks at module load time
-register_create_thread_callback(create_thread_for_agent)
-register_broadcast_question_callback(broadcast_question_to_thread)
-register_broadcast_plan_approval_callback(broadcast_plan_approval_to_thread)
-register_list_threads_callback(list_threads_for_agent)
-register_archive_thread_callback(archive_thread_for_agent)
-register_run_thread_callback(run_thread_for_agent)
-register_read_thread_callback(read_thread_for_agent)
-register_broadcast_subagent_stop_callback(broadcast_subagent_stop_to_thread)
-register_broadcast_status_signal_callback(broadcast_status_signal_to_parent)
-register_send_to_thread_callback(send_to_thread_for_agent)
+register_agent_callbacks(
+    create_thread=create_thread_for_agent,
+    broadcast_question=broadcast_question_to_thread,
+    broadcast_plan_approval=broadcast_plan_approval_to_thread,
+    list_threads=list_threads_for_agent,
+    archive_thread=archive_thread_for_agent,
+    run_thread=run_thread_for_agent,
+    read_thread=read_thread_for_agent,
+    broadcast_subagent_stop=broadcast_subagent_stop_to_thread,
+    broadcast_status_signal=broadcast_status_signal_to_parent,
+    send_to_thread=send_to_thread_for_agent,
+)
 
 
 # Pydantic models with validation
@@ -1412,11 +1781,27 @@ class CreateDirectoryRequest(BaseModel):
     path: str = Field(..., min_length=1)
 
 
+class BrowseBatchRequest(BaseModel):
+    """Request body for browsing several paths at once."""
+    paths: list[str] = Field(..., max_length=100)
+    type: str = "directory"
+
+
+class GitInfoBatchRequest(BaseModel):
+    """Request body for git info on several paths at once."""
+    paths: list[str] = Field(..., max_length=100)
+
+
 class UpdateTitleRequest(BaseModel):
     """Request body for updating thread title."""
     title: str = Field(..., min_length=1, max_length=255)
 
 
+class UpdateMaxAgentsRequest(BaseModel):
+    """Request body for resizing the concurrent agent limit."""
+    maxAgents: int = Field(..., ge=1, le=200)
+
+
 class MessageResponse(BaseModel):
     id: str
     thread_id: str
@@ -1447,156 +1832,409 @@ class ThreadResponse(BaseModel):
     messages: list[MessageResponse]
 
 
-def _run_git_command(args: list[str], cwd: str, timeout: int = 5) -> tuple[bool, str]:
-    """Run a git command and return (success, stdout)."""
+# The C locale spares git its locale setup and keeps its output stable.
+# Optional locks are off so read-only commands never take index.lock, and
+# prompts are off so a command needing credentials fails instead of hanging.
+_GIT_ENV = {
+    **os.environ,
+    "LC_ALL": "C",
+    "GIT_OPTIONAL_LOCKS": "0",
+    "GIT_TERMINAL_PROMPT": "0",
+}
+
+
+def _run_git(args: list[str], cwd: str, timeout: int = 5) -> tuple[bool, str, str]:
+    """Run a git command and return (success, stdout, stderr)."""
     try:
         result = subprocess.run(
             args,
             cwd=cwd,
             capture_output=True,
-            text=True,
             timeout=timeout,
+            env=_GIT_ENV,
         )
-        return result.returncode == 0, result.stdout.strip()
     except (subprocess.TimeoutExpired, FileNotFoundError, OSError) as e:
         logger.debug(f"Git command failed: {args} - {e}")
-        return False, ""
+        return False, "", str(e)
+    return (
+        result.returncode == 0,
+        result.stdout.decode("utf-8", "replace").strip(),
+        result.stderr.decode("utf-8", "replace").strip(),
+    )
 
 
-def _detect_git_info_sync(work_dir: str | None) -> dict[str, Any]:
-    """Synchronous helper for git detection (runs in thread pool).
+def _run_git_command(args: list[str], cwd: str, timeout: int = 5) -> tuple[bool, str]:
+    """Run a git command and return (success, stdout)."""
+    success, stdout, _ = _run_git(args, cwd, timeout)
+    return success, stdout
 
-    Detects git branch, repository name, and worktree status.
-    Handles edge cases like detached HEAD and symlinked paths.
-    """
-    if not work_dir:
-        return {"git_branch": None, "git_repo": None, "is_worktree": False}
 
-    path = Path(work_dir)
-    if not path.exists():
-        return {"git_branch": None, "git_repo": None, "is_worktree": False}
+_NO_GIT_INFO: dict[str, Any] = {"git_branch": None, "git_repo": None, "is_worktree": False}
 
-    try:
-        # Check if it's a git repo
-        success, _ = _run_git_command(
-            ["git", "rev-parse", "--is-inside-work-tree"],
-            work_dir,
-        )
-        if not success:
-            return {"git_branch": None, "git_repo": None, "is_worktree": False}
+# Section headers and url lines of a .git/config file
+_GIT_CONFIG_SECTION_RE = re.compile(r'^\s*\[\s*([^\s\]"]+)(?:\s+"([^"]*)")?\s*\]')
+_GIT_CONFIG_URL_RE = re.compile(r"^\s*url\s*=\s*(.*?)\s*$", re.IGNORECASE)
 
-        # Get branch name
-        success, branch = _run_git_command(
-            ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-            work_dir,
-        )
-        if not success:
-            branch = None
-        elif branch == "HEAD":
-            # Detached HEAD state - get short commit hash instead
-            success, short_hash = _run_git_command(
-                ["git", "rev-parse", "--short", "HEAD"],
-                work_dir,
-            )
-            branch = f"({short_hash})" if success else "(detached)"
+# Branch name reftable repositories leave in HEAD; the real one is only
+# known to git itself
+_REFTABLE_HEAD = "refs/heads/.invalid"
 
-        # Get repo name from remote or directory name
-        success, url = _run_git_command(
-            ["git", "remote", "get-url", "origin"],
-            work_dir,
-        )
-        if success and url:
-            # Extract repo name from URL (handles SSH, HTTPS, and various formats)
-            # Examples:
-            #   git@github.com:user/repo.git -> repo
-            #   https://github.com/user/repo.git -> repo
-            #   ssh://git@github.com/user/repo -> repo
-            repo_part = url.rstrip("/").split("/")[-1]
-            repo = repo_part.removesuffix(".git")
-        else:
-            repo = path.name
+# Branch lines of a packed-refs file (SHA-1 or SHA-256 object ids)
+_PACKED_BRANCH_RE = re.compile(r"^[0-9a-f]{40,64} refs/heads/(.+)$", re.MULTILINE)
 
-        # Check if it's a worktree by comparing git directories
-        # Use realpath to resolve symlinks for accurate comparison
-        success1, common_dir = _run_git_command(
-            ["git", "rev-parse", "--git-common-dir"],
-            work_dir,
-        )
-        success2, git_dir = _run_git_command(
-            ["git", "rev-parse", "--git-dir"],
-            work_dir,
-        )
 
-        is_worktree = False
-        if success1 and success2:
-            # Normalize paths: resolve to absolute and resolve symlinks
-            common_path = os.path.realpath(os.path.join(work_dir, common_dir))
-            git_path = os.path.realpath(os.path.join(work_dir, git_dir))
-            is_worktree = common_path != git_path
+def _repo_name_from_url(url: str) -> str:
+    """Extract the repository name from a remote URL.
 
-        logger.debug(
-            f"Git info detected for {work_dir}: branch={branch}, repo={repo}, worktree={is_worktree}"
-        )
-        return {"git_branch": branch, "git_repo": repo, "is_worktree": is_worktree}
+    Handles SSH, HTTPS, and various formats:
+      git@github.com:user/repo.git -> repo
+      https://github.com/user/repo.git -> repo
+      ssh://git@github.com/user/repo -> repo
+      git@host:repo.git -> repo
+    """
+    tail = url.rstrip("/").rpartition("/")[2].rpartition(":")[2]
+    return tail.removesuffix(".git")
 
-    except Exception as e:
-        logger.warning(f"Git detection failed for {work_dir}: {e}")
-        return {"git_branch": None, "git_repo": None, "is_worktree": False}
 
+def _find_git_dirs(path: Path) -> tuple[Path, Path, Path] | None:
+    """Locate (work_tree, git_dir, common_dir) for a path by walking up to its .git entry.
 
-async def detect_git_info(work_dir: str | None) -> dict[str, Any]:
-    """Detect git information from a working directory (non-blocking)."""
-    return await asyncio.to_thread(_detect_git_info_sync, work_dir)
+    A linked worktree has a .git file pointing at its private git dir, whose
+    commondir file points back at the main repository's git dir.
 
+    The path must already be resolved. Symlinks are then only resolved where
+    a .git file or an absolute commondir could introduce one; a relative
+    commondir is joined lexically, since the parents of a real path are real.
+    """
+    for directory in (path, *path.parents):
+        dot_git = directory / ".git"
+        if dot_git.is_dir():
+            git_dir = dot_git
+        elif dot_git.is_file():
+            content = dot_git.read_text().strip()
+            if not content.startswith("gitdir:"):
+                return None
+            git_dir = Path(os.path.realpath(directory / content.removeprefix("gitdir:").strip()))
+        else:
+            continue
+        try:
+            common = (git_dir / "commondir").read_text().strip()
+        except FileNotFoundError:
+            return directory, git_dir, git_dir
+        if os.path.isabs(common):
+            return directory, git_dir, Path(os.path.realpath(common))
+        return directory, git_dir, Path(os.path.normpath(git_dir / common))
+    return None
 
-def _browse_directory_sync(path: str, type_filter: str) -> list[dict[str, str]]:
-    """Synchronous helper for directory browsing (runs in thread pool)."""
-    # Expand ~ to home directory
-    base = Path(path).expanduser() if path else Path.home()
 
-    # If path is partial (doesn't exist), get parent and filter by prefix
-    if not base.exists():
-        parent = base.parent
-        prefix = base.name.lower()
-        if not parent.exists():
-            return []
-        entries = [e for e in parent.iterdir() if e.name.lower().startswith(prefix)]
-    else:
-        # If path exists, list its contents
-        if base.is_file():
-            # If it's a file, list parent directory filtered by file prefix
-            parent = base.parent
-            prefix = base.name.lower()
-            entries = [e for e in parent.iterdir() if e.name.lower().startswith(prefix)]
-        else:
-            entries = list(base.iterdir())
-            prefix = ""
+def _read_origin_url(common_dir: Path) -> str | None:
+    """Return remote.origin.url from a repository's config file, if set."""
+    try:
+        lines = (common_dir / "config").read_text().splitlines()
+    except FileNotFoundError:
+        return None
+    in_origin = False
+    for line in lines:
+        section = _GIT_CONFIG_SECTION_RE.match(line)
+        if section:
+            in_origin = section.group(1).lower() == "remote" and section.group(2) == "origin"
+        elif in_origin:
+            url = _GIT_CONFIG_URL_RE.match(line)
+            if url:
+                return url.group(1).strip('"')
+    return None
+
+
+# Git info per resolved work dir: (cached_at, HEAD path, HEAD mtime_ns, info).
+# Entries are reused until HEAD changes (checkout) or GIT_INFO_CACHE_TTL_SECONDS
+# passes, which bounds staleness for the remote URL and worktree layout.
+GIT_INFO_CACHE_TTL_SECONDS = 30.0
+_GIT_INFO_CACHE_MAX = 256
+_git_info_cache: dict[str, tuple[float, Path | None, int | None, dict[str, Any]]] = {}
+
+# Local branches per common git dir: (cached_at, refs stamp, branches). All
+# linked worktrees of a repository share its refs, so they share one entry.
+# The stamp is the mtime of packed-refs and refs/heads, which change when
+# branches are packed, created or deleted at the top level; the TTL covers
+# nested names like feature/x that only touch a subdirectory.
+_git_branches_cache: dict[str, tuple[float, tuple[int | None, int | None], list[str]]] = {}
+
+# Work tree root per resolved work dir. A repo's root does not move while the
+# server runs, so entries live until the repo is mutated through us.
+_repo_toplevel_cache: dict[str, str] = {}
+
+
+def _mtime_ns(path: Path | None) -> int | None:
+    """Return a file's mtime, or None if there is no file to watch."""
+    if path is None:
+        return None
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
 
-    # Filter by type
-    if type_filter == "directory":
-        entries = [e for e in entries if e.is_dir()]
 
-    # Sort and limit results
-    entries = sorted(entries, key=lambda e: e.name.lower())[:20]
+def _invalidate_git_cache(work_dir: str) -> None:
+    """Drop cached git info and branches for a work dir after mutating its repo."""
+    key = os.path.realpath(work_dir)
+    _git_info_cache.pop(key, None)
+    _repo_toplevel_cache.pop(key, None)
+    dirs = _find_git_dirs(Path(key))
+    if dirs is not None:
+        _git_branches_cache.pop(str(dirs[2]), None)
 
-    return [{"path": str(e), "name": e.name, "isDir": e.is_dir()} for e in entries]
 
+def _detect_git_info_from_files(path: Path) -> dict[str, Any] | None:
+    """Detect git info by reading .git files directly, without spawning git.
 
-def _get_git_branches_sync(repo_path: str) -> list[str]:
-    """Get list of local branches for a git repo."""
-    try:
-        result = subprocess.run(
-            ["git", "branch", "--format=%(refname:short)"],
-            cwd=repo_path,
-            capture_output=True,
-            text=True,
-            timeout=5,
-        )
-        if result.returncode == 0:
-            return [b.strip() for b in result.stdout.strip().split("\n") if b.strip()]
-        return []
-    except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
-        return []
+    Returns None when the layout is one this reader does not understand
+    (e.g. reftable refs), so the caller can fall back to the git CLI.
+    """
+    dirs = _find_git_dirs(path.resolve())
+    if dirs is None:
+        return dict(_NO_GIT_INFO)
+    _, git_dir, common_dir = dirs
+
+    head = (git_dir / "HEAD").read_text().strip()
+    if head.startswith("ref: "):
+        ref = head.removeprefix("ref: ")
+        if ref == _REFTABLE_HEAD or not ref.startswith("refs/heads/"):
+            return None
+        branch = ref.removeprefix("refs/heads/")
+    else:
+        # Detached HEAD state - show the short commit hash instead
+        branch = f"({head[:7]})" if head else "(detached)"
+
+    url = _read_origin_url(common_dir)
+    repo = _repo_name_from_url(url) if url else path.name
+
+    return {"git_branch": branch, "git_repo": repo, "is_worktree": common_dir != git_dir}
+
+
+def _detect_git_info_with_git(work_dir: str) -> dict[str, Any]:
+    """Detect git info using the git CLI (fallback for unusual repo layouts).
+
+    Repo membership, branch and both git dirs come from one rev-parse call.
+    """
+    success, output = _run_git_command(
+        ["git", "rev-parse", "--is-inside-work-tree", "--git-common-dir", "--git-dir",
+         "--abbrev-ref", "HEAD"],
+        work_dir,
+    )
+    if success:
+        inside, common_dir, git_dir, branch = output.split("\n")
+    else:
+        # HEAD does not resolve on an unborn branch; retry without it
+        success, output = _run_git_command(
+            ["git", "rev-parse", "--is-inside-work-tree", "--git-common-dir", "--git-dir"],
+            work_dir,
+        )
+        if not success:
+            return dict(_NO_GIT_INFO)
+        inside, common_dir, git_dir = output.split("\n")
+        branch = None
+    if inside != "true":
+        return dict(_NO_GIT_INFO)
+
+    if branch == "HEAD":
+        # Detached HEAD state - get short commit hash instead
+        success, short_hash = _run_git_command(
+            ["git", "rev-parse", "--short", "HEAD"],
+            work_dir,
+        )
+        branch = f"({short_hash})" if success else "(detached)"
+
+    # Get repo name from remote or directory name
+    success, url = _run_git_command(
+        ["git", "remote", "get-url", "origin"],
+        work_dir,
+    )
+    repo = _repo_name_from_url(url) if success and url else Path(work_dir).name
+
+    # Check if it's a worktree by comparing git directories. git prints
+    # both as absolute paths in most cases, which compare as plain strings;
+    # relative ones are resolved against work_dir, following symlinks.
+    if os.path.isabs(common_dir) and os.path.isabs(git_dir):
+        is_worktree = os.path.normpath(common_dir) != os.path.normpath(git_dir)
+    else:
+        common_path = os.path.realpath(os.path.join(work_dir, common_dir))
+        git_path = os.path.realpath(os.path.join(work_dir, git_dir))
+        is_worktree = common_path != git_path
+
+    return {"git_branch": branch, "git_repo": repo, "is_worktree": is_worktree}
+
+
+def _detect_git_info_sync(work_dir: str | None) -> dict[str, Any]:
+    """Synchronous helper for git detection (runs in thread pool).
+
+    Detects git branch, repository name, and worktree status.
+    Handles edge cases like detached HEAD and symlinked paths.
+
+    Reads HEAD, commondir and config straight from the git directory, which
+    costs a few small file reads instead of five git subprocesses. The git
+    CLI is only used for layouts the file reader does not handle.
+    """
+    if not work_dir:
+        return dict(_NO_GIT_INFO)
+
+    path = Path(work_dir)
+    if not path.exists():
+        return dict(_NO_GIT_INFO)
+
+    key = os.path.realpath(work_dir)
+    cached = _git_info_cache.get(key)
+    if cached is not None:
+        cached_at, head_path, head_mtime, info = cached
+        if (
+            time.monotonic() - cached_at < GIT_INFO_CACHE_TTL_SECONDS
+            and _mtime_ns(head_path) == head_mtime
+        ):
+            return dict(info)
+
+    try:
+        file_info = _detect_git_info_from_files(path)
+        info = file_info if file_info is not None else _detect_git_info_with_git(work_dir)
+        logger.debug(
+            "Git info detected for %s: branch=%s, repo=%s, worktree=%s",
+            work_dir, info["git_branch"], info["git_repo"], info["is_worktree"],
+        )
+        dirs = _find_git_dirs(Path(key))
+    except Exception as e:
+        logger.warning(f"Git detection failed for {work_dir}: {e}")
+        return dict(_NO_GIT_INFO)
+
+    head_path = dirs[1] / "HEAD" if dirs else None
+    if len(_git_info_cache) >= _GIT_INFO_CACHE_MAX:
+        _git_info_cache.pop(next(iter(_git_info_cache)), None)
+    _git_info_cache[key] = (time.monotonic(), head_path, _mtime_ns(head_path), info)
+    return dict(info)
+
+
+async def detect_git_info(work_dir: str | None) -> dict[str, Any]:
+    """Detect git information from a working directory (non-blocking)."""
+    return await asyncio.to_thread(_detect_git_info_sync, work_dir)
+
+
+def _browse_directory_sync(path: str, type_filter: str) -> list[dict[str, str]]:
+    """Synchronous helper for directory browsing (runs in thread pool)."""
+    # Expand ~ to home directory
+    base = Path(path).expanduser() if path else Path.home()
+
+    # If path is partial (doesn't exist), list its parent filtered by prefix
+    if not base.exists():
+        directory = base.parent
+        prefix = base.name.lower()
+        if not directory.exists():
+            return []
+    elif base.is_file():
+        # If it's a file, list parent directory filtered by file prefix
+        directory = base.parent
+        prefix = base.name.lower()
+    else:
+        # If path is a directory, list its contents
+        directory = base
+        prefix = ""
+
+    # scandir entries carry their file type, so filtering and isDir need
+    # no extra stat calls (except through symlinks)
+    with os.scandir(directory) as it:
+        entries = [e for e in it if e.name.lower().startswith(prefix)] if prefix else list(it)
+
+    # Filter by type
+    if type_filter == "directory":
+        entries = [e for e in entries if e.is_dir()]
+
+    # Sort and limit results; only the first 20 need to be ordered
+    entries = heapq.nsmallest(20, entries, key=lambda e: e.name.lower())
+
+    return [{"path": e.path, "name": e.name, "isDir": e.is_dir()} for e in entries]
+
+
+def _list_git_branches(repo_path: str) -> list[str]:
+    """List local branches for a git repo using the git CLI."""
+    success, output = _run_git_command(["git", "branch", "--format=%(refname:short)"], repo_path)
+    if not success:
+        return []
+    return [b.strip() for b in output.split("\n") if b.strip()]
+
+
+def _read_git_branches(common_dir: Path) -> list[str] | None:
+    """List local branches from loose refs and packed-refs, without spawning git.
+
+    Returns None for reftable repositories, which only git itself can read.
+    """
+    if (common_dir / "reftable").is_dir():
+        return None
+    branches: set[str] = set()
+    heads = common_dir / "refs" / "heads"
+
+    def scan(directory: str, prefix: str) -> None:
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        scan(entry.path, f"{prefix}{entry.name}/")
+                    elif not entry.name.endswith(".lock"):
+                        branches.add(prefix + entry.name)
+        except FileNotFoundError:
+            pass
+
+    scan(str(heads), "")
+    try:
+        packed = (common_dir / "packed-refs").read_text()
+    except FileNotFoundError:
+        packed = ""
+    branches.update(_PACKED_BRANCH_RE.findall(packed))
+    return sorted(branches)
+
+
+def _get_git_branches_sync(repo_path: str) -> list[str]:
+    """Get list of local branches for a git repo, cached until its refs change."""
+    dirs = _find_git_dirs(Path(os.path.realpath(repo_path)))
+    if dirs is None:
+        return _list_git_branches(repo_path)
+    common_dir = dirs[2]
+    key = str(common_dir)
+    stamp = (_mtime_ns(common_dir / "packed-refs"), _mtime_ns(common_dir / "refs" / "heads"))
+
+    cached = _git_branches_cache.get(key)
+    if cached is not None:
+        cached_at, cached_stamp, branches = cached
+        if time.monotonic() - cached_at < GIT_INFO_CACHE_TTL_SECONDS and cached_stamp == stamp:
+            return list(branches)
+
+    read_branches = _read_git_branches(common_dir)
+    branches = read_branches if read_branches is not None else _list_git_branches(repo_path)
+    if len(_git_branches_cache) >= _GIT_INFO_CACHE_MAX:
+        _git_branches_cache.pop(next(iter(_git_branches_cache)), None)
+    _git_branches_cache[key] = (time.monotonic(), stamp, branches)
+    return list(branches)
+
+
+def _repo_toplevel(work_dir: str) -> str | None:
+    """Return the root of the work tree containing work_dir, if any.
+
+    This is the directory holding the .git entry, or git's answer when the
+    layout is one _find_git_dirs does not understand.
+    """
+    key = os.path.realpath(work_dir)
+    toplevel = _repo_toplevel_cache.get(key)
+    if toplevel is not None:
+        return toplevel
+
+    dirs = _find_git_dirs(Path(key))
+    if dirs is not None:
+        toplevel = str(dirs[0])
+    else:
+        success, output = _run_git_command(["git", "rev-parse", "--show-toplevel"], work_dir)
+        if not success:
+            return None
+        toplevel = output
+
+    if len(_repo_toplevel_cache) >= _GIT_INFO_CACHE_MAX:
+        _repo_toplevel_cache.pop(next(iter(_repo_toplevel_cache)), None)
+    _repo_toplevel_cache[key] = toplevel
+    return toplevel
 
 
 def _get_git_info_detailed_sync(work_dir: str) -> dict[str, Any]:
@@ -1614,12 +2252,7 @@ def _get_git_info_detailed_sync(work_dir: str) -> dict[str, Any]:
             "worktreeBranch": None,
         }
 
-    # Get repo root
-    success, repo_root = _run_git_command(
-        ["git", "rev-parse", "--show-toplevel"],
-        work_dir,
-    )
-    repo_root = repo_root if success else work_dir
+    repo_root = _repo_toplevel(work_dir) or work_dir
 
     # Get list of branches
     branches = _get_git_branches_sync(work_dir)
@@ -1641,18 +2274,37 @@ def _get_git_info_detailed_sync(work_dir: str) -> dict[str, Any]:
     }
 
 
-def _get_directory_suggestions_sync() -> list[dict[str, Any]]:
-    """Get smart directory suggestions based on common patterns.
+# Project folder scans per home directory: (scanned_at, suggestions). The
+# folder layout rarely changes within a session, so scans are reused for
+# SUGGESTIONS_CACHE_TTL_SECONDS; recent dirs always come fresh from the db.
+SUGGESTIONS_CACHE_TTL_SECONDS = 30.0
+_project_folder_cache: dict[str, tuple[float, list[dict[str, Any]]]] = {}
 
-    Returns suggestions from:
-    1. Common project folder locations (~/Projects, ~/Code, etc.)
-    2. Git repositories within common locations (1 level deep)
-    3. Recently used working directories from thread history
-    """
-    suggestions = []
-    home = os.path.expanduser("~")
 
-    # 1. Common project locations
+def _scan_project_folder(base: str) -> list[dict[str, Any]]:
+    """Suggest a project folder and the git repos directly inside it."""
+    if not os.path.isdir(base):
+        return []
+    suggestions = [{"path": base, "type": "folder", "reason": "project folder"}]
+    # Look for git repos 1 level deep (limit scan to 20 items).
+    # scandir entries carry the file type, so only .git is stat'ed.
+    try:
+        with os.scandir(base) as it:
+            entries = heapq.nsmallest(20, it, key=lambda e: e.name)
+        for entry in entries:
+            if entry.is_dir() and os.path.exists(os.path.join(entry.path, ".git")):
+                suggestions.append({"path": entry.path, "type": "git", "reason": "git repo"})
+    except PermissionError:
+        pass
+    return suggestions
+
+
+async def _get_project_folders(home: str) -> list[dict[str, Any]]:
+    """Scan common project folders in parallel, reusing a recent scan."""
+    cached = _project_folder_cache.get(home)
+    if cached is not None and time.monotonic() - cached[0] < SUGGESTIONS_CACHE_TTL_SECONDS:
+        return cached[1]
+
     common_paths = [
         os.path.join(home, "Projects"),
         os.path.join(home, "Code"),
@@ -1661,32 +2313,44 @@ def _get_directory_suggestions_sync() -> list[dict[str, Any]]:
         os.path.join(home, "workspace"),
         os.path.join(home, "src"),
     ]
+    # The folders are independent, so slow disks are stat'ed concurrently
+    scans = await asyncio.gather(
+        *(asyncio.to_thread(_scan_project_folder, base) for base in common_paths)
+    )
+    folders = [suggestion for scan in scans for suggestion in scan]
+    _project_folder_cache[home] = (time.monotonic(), folders)
+    return folders
 
-    # Check which common paths exist and find git repos within them
-    for base in common_paths:
-        if os.path.isdir(base):
-            suggestions.append({"path": base, "type": "folder", "reason": "project folder"})
-            # Look for git repos 1 level deep (limit scan to 20 items)
-            try:
-                for item in sorted(os.listdir(base))[:20]:
-                    item_path = os.path.join(base, item)
-                    if os.path.isdir(item_path):
-                        if os.path.exists(os.path.join(item_path, ".git")):
-                            suggestions.append({"path": item_path, "type": "git", "reason": "git repo"})
-            except PermissionError:
-                pass
 
-    # 2. Recent directories from thread history
+def _get_recent_dir_suggestions() -> list[dict[str, Any]]:
+    """Suggest recently used working directories from thread history."""
     try:
         recent = get_recent_work_dirs(limit=5)
-        for path in recent:
-            # Avoid duplicates
-            if not any(s["path"] == path for s in suggestions):
-                suggestions.append({"path": path, "type": "recent", "reason": "recently used"})
     except Exception:
-        pass
+        return []
+    return [{"path": path, "type": "recent", "reason": "recently used"} for path in recent]
+
+
+async def _get_directory_suggestions() -> list[dict[str, Any]]:
+    """Get smart directory suggestions based on common patterns.
+
+    Returns suggestions from:
+    1. Common project folder locations (~/Projects, ~/Code, etc.)
+    2. Git repositories within common locations (1 level deep)
+    3. Recently used working directories from thread history
+
+    The folder scans and the recent dirs query run concurrently.
+    """
+    folders, recent = await asyncio.gather(
+        _get_project_folders(os.path.expanduser("~")),
+        asyncio.to_thread(_get_recent_dir_suggestions),
+    )
+    suggestions = [dict(s) for s in folders]
+    seen = {s["path"] for s in suggestions}
+    # Avoid duplicates
+    suggestions.extend(s for s in recent if s["path"] not in seen)
 
-    logger.debug(f"Directory suggestions: found {len(suggestions)} suggestions")
+    logger.debug("Directory suggestions: found %d suggestions", len(suggestions))
     return suggestions
 
 
@@ -1715,20 +2379,19 @@ def _create_git_worktree_sync(
     }
 
     try:
-        # 1. Verify base_work_dir is a git repo
-        success, _ = _run_git_command(
-            ["git", "rev-parse", "--is-inside-work-tree"],
-            base_work_dir,
-        )
-        if not success:
-            result["error"] = "Not a git repository"
-            return result
+        # 1. Verify base_work_dir is a git repo (git is only asked when the
+        #    .git layout isn't one _find_git_dirs understands)
+        if _find_git_dirs(Path(os.path.realpath(base_work_dir))) is None:
+            success, _ = _run_git_command(
+                ["git", "rev-parse", "--is-inside-work-tree"],
+                base_work_dir,
+            )
+            if not success:
+                result["error"] = "Not a git repository"
+                return result
 
-        # 2. Create worktree directory path with path traversal protection
+        # 2. Validate worktree_subdir to prevent path traversal
         id_prefix = thread_id[:8]
-        branch_name = f"mainthread/{id_prefix}"
-
-        # Validate worktree_subdir to prevent path traversal
         clean_subdir = worktree_subdir.strip().strip("/\\")
         if not clean_subdir:
             clean_subdir = ".mainthread/worktrees"
@@ -1738,70 +2401,57 @@ def _create_git_worktree_sync(
             result["error"] = "Worktree directory must be a relative path"
             return result
 
-        # Resolve paths and verify target is within base_work_dir
-        base_path = Path(base_work_dir).resolve()
+        # Resolve the base once; worktree paths below it are built lexically
+        # and checked component by component, so they need no resolving
+        base_path = os.path.realpath(base_work_dir)
 
-        def _validate_worktree_path(wt_path: Path) -> str | None:
+        def _validate_worktree_path(wt_path: str) -> str | None:
             """Validate worktree path is within base_path and doesn't traverse symlinks.
             Returns error message or None if valid."""
-            try:
-                wt_path.relative_to(base_path)
-            except ValueError:
+            if os.path.commonpath([base_path, wt_path]) != base_path:
                 return "Worktree directory must be within the working directory"
             # Reject paths that traverse symlinks (defense against symlink attacks)
-            for parent in wt_path.relative_to(base_path).parents:
-                candidate = base_path / parent
-                if candidate.is_symlink():
+            candidate = base_path
+            for part in os.path.relpath(wt_path, base_path).split(os.sep):
+                candidate = os.path.join(candidate, part)
+                if os.path.islink(candidate):
                     return "Worktree path cannot traverse symlinks"
             return None
 
-        worktree_dir = (base_path / clean_subdir / id_prefix).resolve()
-        validation_error = _validate_worktree_path(worktree_dir)
-        if validation_error:
-            result["error"] = validation_error
-            return result
+        # 3. Create the worktree with a new branch from HEAD. The branch name
+        #    is tried directly; a suffix is only added when git reports that
+        #    the branch or directory already exists.
+        for attempt in range(1, 10):
+            suffix = f"-{attempt}" if attempt > 1 else ""
+            branch_name = f"mainthread/{id_prefix}{suffix}"
+            worktree_dir = os.path.normpath(
+                os.path.join(base_path, clean_subdir, f"{id_prefix}{suffix}")
+            )
+            validation_error = _validate_worktree_path(worktree_dir)
+            if validation_error:
+                result["error"] = validation_error
+                return result
 
-        # Ensure parent directory exists
-        worktree_dir.parent.mkdir(parents=True, exist_ok=True)
+            # Ensure parent directory exists
+            os.makedirs(os.path.dirname(worktree_dir), exist_ok=True)
 
-        # 3. Check if branch already exists and try alternative names
-        success, _ = _run_git_command(
-            ["git", "rev-parse", "--verify", f"refs/heads/{branch_name}"],
-            base_work_dir,
-        )
-        if success:
-            # Branch exists, try with a suffix
-            for i in range(2, 10):
-                alt_branch = f"{branch_name}-{i}"
-                success, _ = _run_git_command(
-                    ["git", "rev-parse", "--verify", f"refs/heads/{alt_branch}"],
-                    base_work_dir,
-                )
-                if not success:
-                    branch_name = alt_branch
-                    worktree_dir = (base_path / clean_subdir / f"{id_prefix}-{i}").resolve()
-                    # Re-verify path after collision retry
-                    validation_error = _validate_worktree_path(worktree_dir)
-                    if validation_error:
-                        result["error"] = validation_error
-                        return result
-                    break
-            else:
-                result["error"] = "Could not find available branch name"
+            success, _, error = _run_git(
+                ["git", "worktree", "add", "-b", branch_name, worktree_dir],
+                base_work_dir,
+                timeout=30,
+            )
+            if success:
+                break
+            if "already exists" not in error:
+                result["error"] = f"Failed to create worktree: {error}"
                 return result
-
-        # 4. Create the worktree with a new branch from HEAD
-        success, output = _run_git_command(
-            ["git", "worktree", "add", "-b", branch_name, str(worktree_dir)],
-            base_work_dir,
-            timeout=30,
-        )
-        if not success:
-            result["error"] = f"Failed to create worktree: {output}"
+        else:
+            result["error"] = "Could not find available branch name"
             return result
 
+        _invalidate_git_cache(base_work_dir)
         result["success"] = True
-        result["worktree_path"] = str(worktree_dir)
+        result["worktree_path"] = worktree_dir
         result["branch_name"] = branch_name
         logger.debug(f"Created git worktree at {worktree_dir} on branch {branch_name}")
         return result
@@ -1832,79 +2482,82 @@ async def create_git_worktree(
     )
 
 
-def _cleanup_git_worktree_sync(worktree_path: str, branch_name: str | None) -> bool:
-    """Synchronous helper for git worktree cleanup (runs in thread pool).
-
-    Removes a git worktree and optionally its branch.
+def _remove_git_worktree_sync(worktree_path: str) -> tuple[bool, Path | None]:
+    """Synchronous helper for git worktree removal (runs in thread pool).
 
     Args:
         worktree_path: Path to the worktree directory
-        branch_name: Optional branch name to delete after removing worktree
 
     Returns:
-        True if cleanup succeeded, False otherwise
+        (success, repo_root), where repo_root is the repository whose refs
+        still need pruning, or None if there is nothing more to clean up
     """
-    try:
-        worktree_dir = Path(worktree_path)
-        if not worktree_dir.exists():
-            logger.debug(f"Worktree path does not exist, skipping cleanup: {worktree_path}")
-            return True
-
-        # Find the git repo root by looking at parent directories
-        # The worktree is in .mainthread/worktrees/{id}/, so repo root is 3 levels up
-        repo_root = worktree_dir.parent.parent.parent
-        if not (repo_root / ".git").exists() and not (repo_root / ".git").is_file():
-            # .git might be a file for worktrees, check if it's a valid repo
-            success, _ = _run_git_command(
-                ["git", "rev-parse", "--is-inside-work-tree"],
-                str(repo_root),
-            )
-            if not success:
-                logger.warning(f"Could not find git repo root for worktree cleanup: {worktree_path}")
-                return False
-
-        # 1. Remove the worktree
-        success, output = _run_git_command(
-            ["git", "worktree", "remove", str(worktree_dir), "--force"],
+    worktree_dir = Path(worktree_path)
+    if not worktree_dir.exists():
+        logger.debug("Worktree path does not exist, skipping cleanup: %s", worktree_path)
+        return True, None
+
+    # Find the git repo root by looking at parent directories
+    # The worktree is in .mainthread/worktrees/{id}/, so repo root is 3 levels up
+    repo_root = worktree_dir.parent.parent.parent
+    if not os.path.lexists(repo_root / ".git"):
+        # No .git entry there (custom worktree dir); check if it's a valid repo
+        success, _ = _run_git_command(
+            ["git", "rev-parse", "--is-inside-work-tree"],
             str(repo_root),
-            timeout=30,
         )
         if not success:
-            logger.warning(f"Failed to remove worktree {worktree_path}: {output}")
-            # Try to remove directory manually if git command fails
-            import shutil
-            try:
-                shutil.rmtree(worktree_dir)
-            except OSError as e:
-                logger.warning(f"Failed to manually remove worktree directory: {e}")
+            logger.warning(f"Could not find git repo root for worktree cleanup: {worktree_path}")
+            return False, None
 
-        # 2. Prune any orphaned worktree references
-        _run_git_command(["git", "worktree", "prune"], str(repo_root))
+    success, output = _run_git_command(
+        ["git", "worktree", "remove", str(worktree_dir), "--force"],
+        str(repo_root),
+        timeout=30,
+    )
+    if not success:
+        logger.warning(f"Failed to remove worktree {worktree_path}: {output}")
+        # Try to remove directory manually if git command fails
+        import shutil
+        try:
+            shutil.rmtree(worktree_dir)
+        except OSError as e:
+            logger.warning(f"Failed to manually remove worktree directory: {e}")
 
-        # 3. Optionally delete the branch (non-critical, don't fail if this fails)
-        if branch_name:
-            success, _ = _run_git_command(
-                ["git", "branch", "-d", branch_name],
-                str(repo_root),
-            )
-            if not success:
-                # Try force delete if normal delete fails
-                _run_git_command(
-                    ["git", "branch", "-D", branch_name],
-                    str(repo_root),
-                )
+    _invalidate_git_cache(str(repo_root))
+    _invalidate_git_cache(worktree_path)
+    return True, repo_root
 
-        logger.info(f"Cleaned up git worktree: {worktree_path}")
-        return True
 
-    except Exception as e:
-        logger.error(f"Error cleaning up git worktree {worktree_path}: {e}")
-        return False
+def _prune_worktree_refs_sync(repo_root: Path, branch_name: str | None) -> None:
+    """Prune worktree references and delete the worktree's branch (runs in thread pool).
+
+    Neither step is needed for the worktree to be gone, so failures are ignored.
+    """
+    # Prune any orphaned worktree references
+    _run_git_command(["git", "worktree", "prune"], str(repo_root))
+
+    # Optionally delete the branch
+    if branch_name:
+        success, _ = _run_git_command(
+            ["git", "branch", "-d", branch_name],
+            str(repo_root),
+        )
+        if not success:
+            # Try force delete if normal delete fails
+            _run_git_command(
+                ["git", "branch", "-D", branch_name],
+                str(repo_root),
+            )
+    _invalidate_git_cache(str(repo_root))
 
 
 async def cleanup_git_worktree(worktree_path: str, branch_name: str | None) -> bool:
     """Clean up a thread's git worktree on archive (non-blocking).
 
+    Only the worktree removal is awaited; pruning and branch deletion
+    run in the background afterwards.
+
     Args:
         worktree_path: Path to the worktree directory
         branch_name: Optional branch name to delete
@@ -1912,7 +2565,18 @@ async def cleanup_git_worktree(worktree_path: str, branch_name: str | None) -> b
     Returns:
         True if cleanup succeeded, False otherwise
     """
-    return await asyncio.to_thread(_cleanup_git_worktree_sync, worktree_path, branch_name)
+    try:
+        success, repo_root = await asyncio.to_thread(_remove_git_worktree_sync, worktree_path)
+    except Exception as e:
+        logger.error(f"Error cleaning up git worktree {worktree_path}: {e}")
+        return False
+    if repo_root is not None:
+        get_registry().spawn_background(
+            asyncio.to_thread(_prune_worktree_refs_sync, repo_root, branch_name),
+            f"Worktree ref cleanup for {worktree_path}",
+        )
+        logger.info(f"Cleaned up git worktree: {worktree_path}")
+    return success
 
 
 # Health check
@@ -1925,35 +2589,36 @@ async def health_check() -> dict[str, str]:
 @app.get("/api/metrics")
 async def get_metrics() -> dict[str, Any]:
     """Get basic thread and SSE counts."""
-    all_threads = await asyncio.to_thread(get_all_threads, True)
+    thread_counts = await asyncio.to_thread(get_thread_counts)
 
     return {
-        "threads": {
-            "total": len(all_threads),
-            "active": sum(1 for t in all_threads if not t.get("archivedAt")),
-            "archived": sum(1 for t in all_threads if t.get("archivedAt")),
-        },
+        "threads": thread_counts,
         "sse": {
             "subscribers": sum(len(q) for q in thread_subscribers.values()),
         },
     }
 
 
-def _collect_system_stats_sync() -> dict[str, Any]:
-    """Collect system stats synchronously (runs in thread pool to avoid blocking)."""
-    import psutil
+# Claude processes found by the last full process scan: pid -> (Process, name).
+# Identifying them means reading every process's cmdline, so the full scan
+# only reruns every CLAUDE_PROCESS_RESCAN_SECONDS; polls in between only
+# sample the cached processes, evicting any that have exited.
+CLAUDE_PROCESS_RESCAN_SECONDS = 5.0
+_claude_processes: dict[int, tuple[Any, str]] = {}
+_claude_process_scan_at = float("-inf")
 
-    # CPU (interval=None uses cached value from background thread)
-    cpu_percent = psutil.cpu_percent(interval=None)
+# The Claude CLI run directly ("claude", ".../claude"), a claude script in a
+# bin dir as either of the first two args (e.g. "node .../bin/claude"), and
+# Chrome extension hosts that merely mention it
+_CLAUDE_BINARY_RE = re.compile(r"(?:^|/)claude$")
+_CLAUDE_SCRIPT_RE = re.compile(r"bin/claude|^/claude$")
+_CHROME_ARG_RE = re.compile(r"chrome|native-host", re.IGNORECASE)
 
-    # Memory
-    mem = psutil.virtual_memory()
 
-    # Claude processes (subprocess count)
-    # Claude Agent SDK spawns "claude" CLI processes
-    # We look for processes where the binary/first arg is "claude" or process name is "claude"
-    claude_processes: list[dict[str, Any]] = []
-    for proc in psutil.process_iter(["pid", "name", "cmdline", "memory_percent", "cpu_percent"]):
+def _scan_claude_processes() -> dict[int, tuple[Any, str]]:
+    """Find Claude CLI processes by scanning the whole process table."""
+    found: dict[int, tuple[Any, str]] = {}
+    for proc in psutil.process_iter(["pid", "name", "cmdline"]):
         try:
             cmdline = proc.info.get("cmdline") or []
             proc_name = (proc.info.get("name") or "").lower()
@@ -1961,27 +2626,54 @@ def _collect_system_stats_sync() -> dict[str, Any]:
             # Check multiple ways a Claude process might appear:
             # 1. Process name is "claude"
             # 2. First cmdline arg is "claude" or ends with "/claude"
-            # 3. Any cmdline arg contains "claude" binary path (for spawned subprocesses)
-            first_arg = cmdline[0] if cmdline else ""
+            # 3. First or second arg is a claude binary path (for spawned subprocesses)
             is_claude_binary = (
                 proc_name == "claude"
-                or first_arg == "claude"
-                or first_arg.endswith("/claude")
-                or any("bin/claude" in arg or "/claude" == arg for arg in cmdline[:2])
+                or bool(cmdline and _CLAUDE_BINARY_RE.search(cmdline[0]))
+                or any(_CLAUDE_SCRIPT_RE.search(arg) for arg in cmdline[:2])
             )
+            if not is_claude_binary:
+                continue
 
             # Exclude Chrome extension processes
-            cmdline_str = " ".join(cmdline).lower()
-            is_chrome_extension = "chrome" in cmdline_str or "native-host" in cmdline_str
+            if not any(_CHROME_ARG_RE.search(arg) for arg in cmdline):
+                found[proc.info["pid"]] = (proc, proc.info.get("name", "unknown"))
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return found
+
+
+def _collect_system_stats_sync() -> dict[str, Any]:
+    """Collect system stats synchronously (runs in thread pool to avoid blocking)."""
+    global _claude_processes, _claude_process_scan_at
+    # CPU and memory from the background sampler (sampled here if it isn't running)
+    snapshot = _system_snapshot
+    if not snapshot:
+        _sample_system_stats()
+        snapshot = _system_snapshot
+    cpu_percent = snapshot["cpu_percent"]
+    mem = snapshot["memory"]
 
-            if is_claude_binary and not is_chrome_extension:
+    # Claude processes (subprocess count)
+    # Claude Agent SDK spawns "claude" CLI processes
+    now = time.monotonic()
+    if now - _claude_process_scan_at >= CLAUDE_PROCESS_RESCAN_SECONDS:
+        _claude_processes = _scan_claude_processes()
+        _claude_process_scan_at = now
+
+    claude_processes: list[dict[str, Any]] = []
+    for pid, (proc, name) in list(_claude_processes.items()):
+        try:
+            with proc.oneshot():
                 claude_processes.append({
-                    "pid": proc.info["pid"],
-                    "name": proc.info.get("name", "unknown"),
-                    "memory_percent": proc.info["memory_percent"],
-                    "cpu_percent": proc.info["cpu_percent"],
+                    "pid": pid,
+                    "name": name,
+                    "memory_percent": proc.memory_percent(),
+                    "cpu_percent": proc.cpu_percent(),
                 })
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
+        except psutil.NoSuchProcess:
+            _claude_processes.pop(pid, None)
+        except psutil.AccessDenied:
             pass
 
     return {
@@ -1994,6 +2686,14 @@ def _collect_system_stats_sync() -> dict[str, Any]:
     }
 
 
+@app.patch("/api/config/max-agents")
+async def update_max_agents(request: UpdateMaxAgentsRequest) -> dict[str, int]:
+    """Change how many agents may run concurrently, effective immediately."""
+    await _agent_semaphore.set_limit(request.maxAgents)
+    logger.info(f"[CONFIG] Max concurrent agents set to {request.maxAgents}")
+    return {"maxAgents": _agent_semaphore.limit, "activeAgents": _agent_semaphore.active}
+
+
 @app.get("/api/stats")
 async def get_system_stats() -> dict[str, Any]:
     """Get system resource usage stats.
@@ -2001,9 +2701,7 @@ async def get_system_stats() -> dict[str, Any]:
     Returns CPU/memory usage and Claude process count.
     Useful for monitoring system health during agent execution.
     """
-    try:
-        import psutil  # noqa: F401 - check if available
-    except ImportError:
+    if psutil is None:
         return {"error": "psutil not installed"}
 
     # Run process iteration in thread pool to avoid blocking event loop
@@ -2018,11 +2716,12 @@ async def get_current_time() -> dict[str, Any]:
     Returns ISO 8601 timestamp, Unix timestamp, and timezone info.
     Useful for time synchronization and debugging.
     """
-    now = datetime.now(timezone.utc)
+    # Read the clock once; both fields describe the same instant
+    unix_timestamp = time.time()
 
     return {
-        "timestamp": now.isoformat(),
-        "unix_timestamp": now.timestamp(),
+        "timestamp": datetime.fromtimestamp(unix_timestamp, timezone.utc).isoformat(),
+        "unix_timestamp": unix_timestamp,
         "timezone": "UTC",
     }
 
@@ -2105,7 +2804,7 @@ async def get_directory_suggestions() -> list[dict[str, Any]]:
     - Recently used working directories from thread history
     """
     try:
-        return await asyncio.to_thread(_get_directory_suggestions_sync)
+        return await _get_directory_suggestions()
     except Exception as e:
         logger.warning(f"Directory suggestions error: {e}")
         return []
@@ -2153,6 +2852,39 @@ async def get_git_info(path: str) -> dict[str, Any]:
         }
 
 
+@app.post("/api/browse:batch")
+async def browse_directories_batch(request: BrowseBatchRequest) -> dict[str, Any]:
+    """List several directories in one request.
+
+    Each path is browsed concurrently as by /api/browse; results keep the
+    order of the paths, and a path that can't be read yields an empty list.
+    """
+    results = await asyncio.gather(
+        *(browse_directory(path, request.type) for path in request.paths)
+    )
+    return {
+        "results": [
+            {"path": path, "entries": entries}
+            for path, entries in zip(request.paths, results, strict=True)
+        ]
+    }
+
+
+@app.post("/api/git/info:batch")
+async def get_git_info_batch(request: GitInfoBatchRequest) -> dict[str, Any]:
+    """Get detailed git information for several directories in one request.
+
+    Each path is checked concurrently as by /api/git/info; results keep the
+    order of the paths, and a path that can't be read reports isGitRepo false.
+    """
+    results = await asyncio.gather(*(get_git_info(path) for path in request.paths))
+    return {
+        "results": [
+            {"path": path, **info} for path, info in zip(request.paths, results, strict=True)
+        ]
+    }
+
+
 # Thread routes
 @app.get("/api/threads", response_model=list[ThreadResponse])
 async def list_threads(include_archived: bool = False) -> list[dict[str, Any]]:
@@ -2211,6 +2943,11 @@ async def create_new_thread(request: CreateThreadRequest) -> dict[str, Any]:
             allow_nested_subthreads=request.allowNestedSubthreads,
             max_thread_depth=request.maxThreadDepth,
         )
+        # Pre-warm the file listing so the first @-mention is served from cache
+        get_registry().spawn_background(
+            asyncio.to_thread(_list_files_sync, final_work_dir, None, 1),
+            f"File list pre-warm for {thread['id']}",
+        )
         return thread
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -2232,7 +2969,7 @@ async def get_thread_messages(
     Returns messages in chronological order (oldest first), with pagination info.
     Use offset to load older messages (e.g., offset=50 loads the 50 messages before the most recent 50).
     """
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
 
@@ -2243,7 +2980,7 @@ async def get_thread_messages(
 @app.post("/api/threads/{thread_id}/messages")
 async def send_message(thread_id: str, request: SendMessageRequest) -> dict[str, Any]:
     """Send a message to a thread and get Claude's response."""
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
 
@@ -2252,11 +2989,7 @@ async def send_message(thread_id: str, request: SendMessageRequest) -> dict[str,
     file_context = ""
 
     if request.file_references and thread.get("workDir"):
-        file_context = await asyncio.to_thread(
-            _read_file_contents,
-            thread["workDir"],
-            request.file_references,
-        )
+        file_context = await _read_file_contents(thread["workDir"], request.file_references)
         if file_context:
             message_content = f"{file_context}\n\n{request.content}"
 
@@ -2303,14 +3036,14 @@ async def send_message(thread_id: str, request: SendMessageRequest) -> dict[str,
         assistant_message = processor._message
 
         # Update thread status and session
-        update_thread_status(thread_id, processor.final_status)
-        if processor.final_session_id:
-            update_thread_session(thread_id, processor.final_session_id)
+        update_thread_status(thread_id, processor.final_status, processor.final_session_id)
 
-        # Handle sub-thread completion signals (auto-signal if agent didn't call SignalStatus)
-        thread = get_thread(thread_id)  # Re-fetch for latest state
-        if thread:
-            await notify_parent_of_subthread_completion(thread, thread_id, processor.final_status)
+        # Handle sub-thread completion signals (auto-signal if agent didn't call SignalStatus).
+        # Only status and session changed since the thread was loaded, so no re-fetch.
+        thread["status"] = processor.final_status
+        if processor.final_session_id:
+            thread["sessionId"] = processor.final_session_id
+        await notify_parent_of_subthread_completion(thread, thread_id, processor.final_status)
 
         # Notify subscribers of completion (single source of truth for messages)
         await broadcast_to_thread(thread_id, {
@@ -2341,8 +3074,8 @@ async def send_message(thread_id: str, request: SendMessageRequest) -> dict[str,
             "data": {"error": f"Request timed out after {AGENT_TIMEOUT_SECONDS // 60} minutes"},
         })
         # Notify parent if this is a sub-thread (consistent with run_thread_for_agent)
-        thread = get_thread(thread_id)
-        if thread and thread.get("parentId"):
+        thread["status"] = "needs_attention"
+        if thread.get("parentId"):
             await _notify_parent_on_subthread_error(thread, thread_id, f"timed out after {AGENT_TIMEOUT_SECONDS // 60} minutes")
         raise HTTPException(status_code=504, detail="Agent execution timed out")
 
@@ -2355,8 +3088,8 @@ async def send_message(thread_id: str, request: SendMessageRequest) -> dict[str,
             "data": {"error": error_msg},
         })
         # Notify parent if this is a sub-thread (consistent with run_thread_for_agent)
-        thread = get_thread(thread_id)
-        if thread and thread.get("parentId"):
+        thread["status"] = "needs_attention"
+        if thread.get("parentId"):
             await _notify_parent_on_subthread_error(thread, thread_id, error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
@@ -2367,7 +3100,7 @@ async def send_message(thread_id: str, request: SendMessageRequest) -> dict[str,
 @app.patch("/api/threads/{thread_id}/status")
 async def update_status(thread_id: str, request: UpdateStatusRequest) -> dict[str, bool]:
     """Update a thread's status."""
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
 
@@ -2388,7 +3121,7 @@ async def update_status(thread_id: str, request: UpdateStatusRequest) -> dict[st
 @app.patch("/api/threads/{thread_id}/config")
 async def update_config(thread_id: str, request: UpdateConfigRequest) -> dict[str, bool]:
     """Update a thread's configuration (model, thinking mode, auto-react)."""
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
 
@@ -2422,7 +3155,7 @@ async def update_config(thread_id: str, request: UpdateConfigRequest) -> dict[st
 @app.patch("/api/threads/{thread_id}/title")
 async def update_title(thread_id: str, request: UpdateTitleRequest) -> dict[str, bool]:
     """Update a thread's title."""
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
 
@@ -2446,7 +3179,7 @@ async def update_title(thread_id: str, request: UpdateTitleRequest) -> dict[str,
 @app.delete("/api/threads/{thread_id}/messages")
 async def clear_messages(thread_id: str) -> dict[str, bool]:
     """Clear all messages from a thread and reset session for fresh start."""
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
 
@@ -2467,9 +3200,9 @@ async def close_thread_subscribers(thread_id: str) -> None:
     This is called when a thread is archived to clean up resources.
     """
     # Atomic removal to avoid race conditions
-    queues = thread_subscribers.pop(thread_id, [])
+    queues = thread_subscribers.pop(thread_id, set())
     for queue in queues:
-        await queue.put({"type": "shutdown", "data": {}})
+        _signal_subscriber_shutdown(queue)
     if queues:
         logger.info(f"Closed {len(queues)} SSE subscribers for thread {thread_id}")
 
@@ -2504,7 +3237,7 @@ async def cleanup_thread_resources(thread_id: str) -> None:
 @app.post("/api/threads/{thread_id}/archive")
 async def archive_thread_endpoint(thread_id: str) -> dict[str, bool]:
     """Archive a thread and clean up associated resources."""
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
 
@@ -2526,12 +3259,10 @@ async def archive_thread_endpoint(thread_id: str) -> dict[str, bool]:
     archive_thread(thread_id)
 
     # Notify all subscribers about the archive
-    for queues in thread_subscribers.values():
-        for queue in queues:
-            await queue.put({
-                "type": "thread_archived",
-                "data": {"threadId": thread_id},
-            })
+    _broadcast_to_all_subscribers({
+        "type": "thread_archived",
+        "data": {"threadId": thread_id},
+    })
 
     return {"success": True}
 
@@ -2539,7 +3270,7 @@ async def archive_thread_endpoint(thread_id: str) -> dict[str, bool]:
 @app.post("/api/threads/{thread_id}/unarchive")
 async def unarchive_thread_endpoint(thread_id: str) -> dict[str, bool]:
     """Unarchive a thread."""
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
 
@@ -2549,12 +3280,10 @@ async def unarchive_thread_endpoint(thread_id: str) -> dict[str, bool]:
     unarchive_thread(thread_id)
 
     # Notify all subscribers about the unarchive
-    for queues in thread_subscribers.values():
-        for queue in queues:
-            await queue.put({
-                "type": "thread_unarchived",
-                "data": {"threadId": thread_id},
-            })
+    _broadcast_to_all_subscribers({
+        "type": "thread_unarchived",
+        "data": {"threadId": thread_id},
+    })
 
     return {"success": True}
 
@@ -2571,12 +3300,10 @@ async def reset_all_threads_endpoint(confirm: bool = False) -> dict[str, Any]:
     deleted_count = reset_all_threads()
 
     # Notify all subscribers about the reset
-    for queues in thread_subscribers.values():
-        for queue in queues:
-            await queue.put({
-                "type": "all_threads_reset",
-                "data": {},
-            })
+    _broadcast_to_all_subscribers({
+        "type": "all_threads_reset",
+        "data": {},
+    })
 
     return {"success": True, "deletedCount": deleted_count}
 
@@ -2588,7 +3315,7 @@ async def get_thread_tokens(thread_id: str) -> dict[str, Any]:
     Returns estimated token count and breakdown by role.
     Useful for monitoring context usage and deciding when to compact.
     """
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
 
@@ -2601,7 +3328,7 @@ async def get_thread_usage(thread_id: str) -> dict[str, Any]:
 
     Returns persisted input/output tokens and cost, plus aggregated child usage.
     """
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
 
@@ -2615,7 +3342,7 @@ async def submit_answer(thread_id: str, request: AnswerRequest) -> dict[str, boo
     This endpoint is called when a user responds to an AskUserQuestion from the agent.
     The answer is passed back to the agent through the can_use_tool hook.
     """
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
 
@@ -2636,7 +3363,7 @@ async def handle_plan_action(thread_id: str, request: PlanActionRequest) -> dict
         - modify: Allow user to modify the plan (re-enable input)
         - compact: Trigger context compaction
     """
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
 
@@ -2708,68 +3435,120 @@ async def handle_plan_action(thread_id: str, request: PlanActionRequest) -> dict
         raise HTTPException(status_code=400, detail=f"Unknown action: {request.action}")
 
 
-def _list_files_sync(work_dir: str, query: str | None, limit: int) -> list[dict[str, Any]]:
-    """Synchronous helper for listing files (runs in thread pool).
+# Common patterns to always ignore when listing files
+_ALWAYS_IGNORE = [
+    ".git", ".git/**", "__pycache__", "__pycache__/**",
+    "node_modules", "node_modules/**", ".venv", ".venv/**",
+    "*.pyc", "*.pyo", ".DS_Store", "*.swp", "*.swo",
+    ".mainthread", ".mainthread/**",
+]
 
-    Lists files in the working directory, respecting .gitignore patterns.
-    Filters by query if provided (case-insensitive fuzzy match on filename).
+# Compiled ignore patterns per work dir: (.gitignore (mtime_ns, size), regex).
+# Recompiled only when the .gitignore file changes.
+_ignore_regex_cache: dict[str, tuple[tuple[int, int] | None, re.Pattern[str]]] = {}
 
-    Args:
-        work_dir: Directory to search
-        query: Optional search query
-        limit: Maximum files to return
 
-    Returns:
-        List of file info dicts with path and name
-    """
-    import fnmatch
+def _get_ignore_regex(work_path: Path) -> re.Pattern[str]:
+    """Compile a work dir's .gitignore and the built-in patterns into one regex."""
+    gitignore_path = work_path / ".gitignore"
+    try:
+        st = gitignore_path.stat()
+        stamp: tuple[int, int] | None = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = None
 
-    work_path = Path(work_dir)
-    if not work_path.exists():
-        return []
+    key = str(work_path)
+    cached = _ignore_regex_cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
 
     # Load .gitignore patterns
-    gitignore_patterns: list[str] = []
-    gitignore_path = work_path / ".gitignore"
-    if gitignore_path.exists():
+    patterns: list[str] = []
+    if stamp is not None:
         try:
             with open(gitignore_path) as f:
                 for line in f:
                     line = line.strip()
                     if line and not line.startswith("#"):
-                        gitignore_patterns.append(line)
+                        patterns.append(line)
         except OSError:
             pass
+    patterns.extend(_ALWAYS_IGNORE)
+
+    ignore_re = re.compile("|".join(fnmatch.translate(p) for p in patterns))
+    if len(_ignore_regex_cache) >= _GIT_INFO_CACHE_MAX:
+        _ignore_regex_cache.pop(next(iter(_ignore_regex_cache)), None)
+    _ignore_regex_cache[key] = (stamp, ignore_re)
+    return ignore_re
+
+
+# Full file listings per work dir: (listed_at, signal mtimes, files or None).
+# @-mention lookups filter the cached listing in memory instead of walking the
+# tree on every keystroke. A listing is reused until the work dir root,
+# .gitignore or .git/HEAD changes, or FILE_LIST_CACHE_TTL_SECONDS passes
+# (which bounds staleness for files added deeper in the tree). Trees with more
+# than FILE_LIST_CACHE_MAX_FILES files are cached as None and walked per query.
+FILE_LIST_CACHE_TTL_SECONDS = 10.0
+FILE_LIST_CACHE_MAX_FILES = 10000
+_file_list_cache: dict[
+    str, tuple[float, tuple[int | None, ...], list[dict[str, Any]] | None]
+] = {}
+
+
+def _is_ignored(ignore_re: re.Pattern[str], rel_path: str) -> bool:
+    """Check if a relative path or its name matches any ignore pattern."""
+    return bool(ignore_re.match(rel_path) or ignore_re.match(rel_path.rpartition("/")[2]))
+
+
+def _walk_files(
+    work_dir: str,
+    query_lower: str | None,
+    limit: int,
+    prefix: str = "",
+    skip: str | None = None,
+    files: list[dict[str, Any]] | None = None,
+) -> list[dict[str, Any]]:
+    """Walk a work dir breadth-first, listing files that match the query.
 
-    # Common patterns to always ignore
-    always_ignore = [
-        ".git", ".git/**", "__pycache__", "__pycache__/**",
-        "node_modules", "node_modules/**", ".venv", ".venv/**",
-        "*.pyc", "*.pyo", ".DS_Store", "*.swp", "*.swo",
-        ".mainthread", ".mainthread/**",
-    ]
-    gitignore_patterns.extend(always_ignore)
+    The walk starts at the relative directory prefix (ending in "/") and
+    does not descend into the relative directory skip. Matches are appended
+    to files, if given.
+    """
+    ignore_re = _get_ignore_regex(Path(work_dir))
 
     def should_ignore(rel_path: str) -> bool:
-        """Check if path matches any ignore pattern."""
-        for pattern in gitignore_patterns:
-            if fnmatch.fnmatch(rel_path, pattern):
-                return True
-            if fnmatch.fnmatch(rel_path.split("/")[-1], pattern):
-                return True
-        return False
+        """Check if the path or its name matches any ignore pattern."""
+        return _is_ignored(ignore_re, rel_path)
+
+    if files is None:
+        files = []
+
+    # Breadth-first walk with scandir: entry types come from the directory
+    # listing, and ignored directories are pruned instead of descended into.
+    # Each item is (relative path prefix, directory path).
+    pending: deque[tuple[str, str]] = deque([(prefix, os.path.join(work_dir, prefix))])
+    while pending and len(files) < limit:
+        prefix, directory = pending.popleft()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
 
-    files: list[dict[str, Any]] = []
-    query_lower = query.lower() if query else None
+        for entry in entries:
+            rel_path = prefix + entry.name
 
-    try:
-        for item in work_path.rglob("*"):
-            if not item.is_file():
+            if should_ignore(rel_path):
                 continue
 
-            rel_path = str(item.relative_to(work_path))
-
-            if should_ignore(rel_path):
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if rel_path + "/" != skip:
+                        pending.append((rel_path + "/", entry.path))
+                    continue
+                if not entry.is_file():
+                    continue
+            except OSError:
                 continue
 
             # Filter by query if provided
@@ -2779,21 +3558,139 @@ def _list_files_sync(work_dir: str, query: str | None, limit: int) -> list[dict[
 
             files.append({
                 "path": rel_path,
-                "name": item.name,
+                "name": entry.name,
             })
 
             if len(files) >= limit:
                 break
 
-    except OSError:
-        pass
+    return files
+
+
+def _get_cached_file_list(work_dir: str) -> list[dict[str, Any]] | None:
+    """Return the full file listing for a work dir, or None if the tree is too big."""
+    work_path = Path(work_dir)
+    stamp = (
+        _mtime_ns(work_path),
+        _mtime_ns(work_path / ".gitignore"),
+        _mtime_ns(work_path / ".git" / "HEAD"),
+    )
+    cached = _file_list_cache.get(work_dir)
+    if (
+        cached is not None
+        and cached[1] == stamp
+        and time.monotonic() - cached[0] < FILE_LIST_CACHE_TTL_SECONDS
+    ):
+        return cached[2]
+
+    walked = _walk_files(work_dir, None, FILE_LIST_CACHE_MAX_FILES + 1)
+    files = walked if len(walked) <= FILE_LIST_CACHE_MAX_FILES else None
+    if len(_file_list_cache) >= _GIT_INFO_CACHE_MAX:
+        _file_list_cache.pop(next(iter(_file_list_cache)), None)
+    _file_list_cache[work_dir] = (time.monotonic(), stamp, files)
+    return files
+
+
+def _walk_large_tree(work_dir: str, query: str | None, limit: int) -> list[dict[str, Any]]:
+    """List matching files in a tree too big to cache, walking as little as possible.
+
+    A query with a directory part such as "src/ser" usually refers to files
+    under that directory, so when it names a directory, that subtree is
+    walked first; the walk stops as soon as the limit is reached. The rest
+    of the tree is only walked when more matches are needed, so files that
+    merely contain the query elsewhere in their path are still found.
+    """
+    query_lower = query.lower() if query else None
+    prefix_dir = query.rpartition("/")[0].strip("/") if query else ""
+    parts = prefix_dir.split("/") if prefix_dir else []
+    if not parts or any(part in ("", ".", "..") for part in parts):
+        return _walk_files(work_dir, query_lower, limit)
+
+    # The subtree must be one the full walk would reach: every component a
+    # real (non-symlink) directory that isn't ignored
+    ignore_re = _get_ignore_regex(Path(work_dir))
+    for i in range(len(parts)):
+        rel_dir = "/".join(parts[:i + 1])
+        path = os.path.join(work_dir, rel_dir)
+        if _is_ignored(ignore_re, rel_dir) or os.path.islink(path) or not os.path.isdir(path):
+            return _walk_files(work_dir, query_lower, limit)
+
+    prefix = prefix_dir + "/"
+    files = _walk_files(work_dir, query_lower, limit, prefix=prefix)
+    if len(files) < limit:
+        _walk_files(work_dir, query_lower, limit, skip=prefix, files=files)
+    return files
+
 
+def _list_files_sync(work_dir: str, query: str | None, limit: int) -> list[dict[str, Any]]:
+    """Synchronous helper for listing files (runs in thread pool).
+
+    Lists files in the working directory, respecting .gitignore patterns.
+    Filters by query if provided (case-insensitive fuzzy match on filename).
+
+    Args:
+        work_dir: Directory to search
+        query: Optional search query
+        limit: Maximum files to return
+
+    Returns:
+        List of file info dicts with path and name
+    """
+    if not os.path.isdir(work_dir):
+        return []
+
+    query_lower = query.lower() if query else None
+    all_files = _get_cached_file_list(work_dir)
+    if all_files is None:
+        return _walk_large_tree(work_dir, query, limit)
+
+    files: list[dict[str, Any]] = []
+    for info in all_files:
+        if query_lower and query_lower not in info["path"].lower():
+            continue
+        files.append(dict(info))
+        if len(files) >= limit:
+            break
     return files
 
 
-def _read_file_contents(work_dir: str, file_paths: list[str], max_size: int = 100000) -> str:
+def _read_one_file(work_root: str, rel_path: str, max_size: int) -> tuple[str | None, str | None, int]:
+    """Read one referenced file for context (runs in thread pool).
+
+    work_root must already be resolved with os.path.realpath. Returns
+    (error, content, file_size). Files larger than max_size on their own are
+    not read, since they could never fit in the context.
+    """
+    # Security: ensure file is within work_dir. commonpath compares whole
+    # components, so a sibling like /foo/barbaz never passes for /foo/bar.
+    resolved = os.path.realpath(os.path.join(work_root, rel_path))
+    if os.path.commonpath([work_root, resolved]) != work_root:
+        return "[Error: Path outside working directory]", None, 0
+
+    try:
+        st = os.stat(resolved)
+    except (FileNotFoundError, NotADirectoryError):
+        return "[Error: File not found]", None, 0
+
+    if not stat.S_ISREG(st.st_mode):
+        return "[Error: Not a file]", None, 0
+
+    file_size = st.st_size
+    if file_size > max_size:
+        return None, None, file_size
+
+    with open(resolved, encoding="utf-8", errors="replace") as f:
+        return None, f.read(), file_size
+
+
+async def _read_file_contents(work_dir: str, file_paths: list[str], max_size: int = 100000) -> str:
     """Read contents of multiple files and format them for context.
 
+    Files are read concurrently; the size budget is then applied in
+    reference order, so the result matches reading them one by one. Unlike a
+    serial loop, files after the one that exhausts the budget are still read
+    (each at most max_size) and then discarded.
+
     Args:
         work_dir: Base working directory
         file_paths: List of relative file paths
@@ -2802,39 +3699,35 @@ def _read_file_contents(work_dir: str, file_paths: list[str], max_size: int = 10
     Returns:
         Formatted string with file contents
     """
-    work_path = Path(work_dir)
+    # Resolved once for every file's containment check
+    work_root = os.path.realpath(work_dir)
+
+    # The default executor's worker count already bounds how many files are
+    # open at once
+    results = await asyncio.gather(
+        *(asyncio.to_thread(_read_one_file, work_root, p, max_size) for p in file_paths),
+        return_exceptions=True,
+    )
+
     contents: list[str] = []
     total_size = 0
+    for rel_path, result in zip(file_paths, results, strict=True):
+        if isinstance(result, BaseException):
+            contents.append(f"<file path=\"{rel_path}\">\n[Error reading file: {result}]\n</file>")
+            continue
+        error, file_content, file_size = result
+        if error is not None:
+            contents.append(f"<file path=\"{rel_path}\">\n{error}\n</file>")
+            continue
+
+        if total_size + file_size > max_size:
+            contents.append(f"<file path=\"{rel_path}\">\n[Truncated: Total context size exceeded]\n</file>")
+            break
 
-    for rel_path in file_paths:
-        try:
-            file_path = work_path / rel_path
-            # Security: ensure file is within work_dir
-            resolved = file_path.resolve()
-            if not str(resolved).startswith(str(work_path.resolve())):
-                contents.append(f"<file path=\"{rel_path}\">\n[Error: Path outside working directory]\n</file>")
-                continue
-
-            if not resolved.exists():
-                contents.append(f"<file path=\"{rel_path}\">\n[Error: File not found]\n</file>")
-                continue
-
-            if not resolved.is_file():
-                contents.append(f"<file path=\"{rel_path}\">\n[Error: Not a file]\n</file>")
-                continue
-
-            file_size = resolved.stat().st_size
-            if total_size + file_size > max_size:
-                contents.append(f"<file path=\"{rel_path}\">\n[Truncated: Total context size exceeded]\n</file>")
-                break
-
-            with open(resolved, encoding="utf-8", errors="replace") as f:
-                file_content = f.read()
-                total_size += len(file_content)
-                contents.append(f"<file path=\"{rel_path}\">\n{file_content}\n</file>")
-
-        except Exception as e:
-            contents.append(f"<file path=\"{rel_path}\">\n[Error reading file: {e}]\n</file>")
+        # Only files larger than the whole budget come back unread
+        assert file_content is not None
+        total_size += len(file_content)
+        contents.append(f"<file path=\"{rel_path}\">\n{file_content}\n</file>")
 
     return "\n\n".join(contents)
 
@@ -2855,7 +3748,7 @@ async def list_thread_files(
     Returns:
         List of file info dicts with path and name
     """
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
 
@@ -2874,7 +3767,7 @@ async def stop_thread(thread_id: str) -> dict[str, bool]:
 
     Cancels the active task for the thread if one exists.
     """
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
 
@@ -2897,12 +3790,12 @@ async def stream_thread_events(
     Supports reconnection recovery via last_event_id query parameter.
     On reconnect, client sends last received event ID to replay missed events.
     """
-    thread = get_thread(thread_id)
+    thread = get_thread(thread_id, include_messages=False)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
 
-    queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
-    thread_subscribers[thread_id].append(queue)
+    queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=SSE_QUEUE_MAX)
+    thread_subscribers[thread_id].add(queue)
 
     async def event_generator():
         try:
@@ -2914,17 +3807,18 @@ async def stream_thread_events(
 
             # Replay missed events from SQLite (survives server restarts)
             if last_event_id is not None:
-                missed_events = get_events_since(thread_id, last_event_id)
-                if missed_events:
-                    logger.info(
-                        f"[SSE] Replaying {len(missed_events)} missed events for thread {thread_id} from DB"
-                    )
-                for event in missed_events:
+                replayed = 0
+                for event in iter_events_since(thread_id, last_event_id):
+                    replayed += 1
                     yield {
                         "event": event["event_type"],
                         "data": event["data"],  # Already JSON string from DB
                         "id": str(event["seq_id"]),
                     }
+                if replayed:
+                    logger.info(
+                        f"[SSE] Replayed {replayed} missed events for thread {thread_id} from DB"
+                    )
 
             while True:
                 try:
@@ -2939,7 +3833,8 @@ async def stream_thread_events(
                     seq_id = event.get("_seq_id", 0)
                     yield {
                         "event": event["type"],
-                        "data": json.dumps(event["data"]),
+                        # Serialized once by the broadcaster, shared by all subscribers
+                        "data": event.get("_data_json") or json.dumps(event["data"]),
                         "id": str(seq_id),
                     }
                 except TimeoutError:
@@ -2947,10 +3842,7 @@ async def stream_thread_events(
                     yield {"comment": "heartbeat"}
         finally:
             # Clean up subscriber on disconnect
-            if queue in thread_subscribers[thread_id]:
-                thread_subscribers[thread_id].remove(queue)
-            if not thread_subscribers[thread_id]:
-                del thread_subscribers[thread_id]
+            _remove_subscriber(thread_id, queue)
 
     return EventSourceResponse(event_generator())
 
@@ -2965,10 +3857,61 @@ async def broadcast_to_thread(thread_id: str, event: dict[str, Any]) -> None:
     event_type = event.get("type", "unknown")
     data_json = json.dumps(event.get("data", {}))
     seq_id = add_event(thread_id, event_type, data_json)
-    event_with_id = {**event, "_seq_id": seq_id}
 
-    for queue in thread_subscribers.get(thread_id, []):
-        await queue.put(event_with_id)
+    # Every event type is still persisted when nobody is watching: sub-threads
+    # stream headless and the UI later subscribes with last_event_id=0 to
+    # replay all of it. Only the fan-out is skipped.
+    queues = thread_subscribers.get(thread_id)
+    if not queues:
+        return
+
+    event_with_id = {**event, "_seq_id": seq_id, "_data_json": data_json}
+    # Snapshot: a slow subscriber may be removed while we iterate
+    for queue in list(queues):
+        _enqueue_sse_event(thread_id, queue, event_with_id)
+
+
+def _broadcast_to_all_subscribers(event: dict[str, Any]) -> None:
+    """Send a non-persisted event to every SSE subscriber of every thread."""
+    event = {**event, "_data_json": json.dumps(event.get("data", {}))}
+    for thread_id, queues in list(thread_subscribers.items()):
+        for queue in list(queues):
+            _enqueue_sse_event(thread_id, queue, event)
+
+
+def _enqueue_sse_event(
+    thread_id: str, queue: asyncio.Queue[dict[str, Any]], event: dict[str, Any]
+) -> None:
+    """Queue an event for one subscriber without ever blocking the producer.
+
+    A full queue means the client has stopped reading. It is disconnected so
+    the agent stream keeps flowing; on reconnect it replays what it missed.
+    """
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        _remove_subscriber(thread_id, queue)
+        _signal_subscriber_shutdown(queue)
+        logger.warning(
+            f"[SSE] Disconnected slow subscriber for thread {thread_id} "
+            f"({SSE_QUEUE_MAX} events behind)"
+        )
+
+
+def _remove_subscriber(thread_id: str, queue: asyncio.Queue[dict[str, Any]]) -> None:
+    """Drop a subscriber, deleting the thread's entry once it has none left."""
+    queues = thread_subscribers.get(thread_id)
+    if queues is not None:
+        queues.discard(queue)
+        if not queues:
+            del thread_subscribers[thread_id]
+
+
+def _signal_subscriber_shutdown(queue: asyncio.Queue[dict[str, Any]]) -> None:
+    """Tell a subscriber's event generator to close, discarding its backlog."""
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait({"type": "shutdown", "data": {}})
 
 
 @app.on_event("shutdown")
@@ -2976,7 +3919,7 @@ async def shutdown():
     """Clean up SSE connections on shutdown."""
     for _thread_id, queues in list(thread_subscribers.items()):
         for queue in queues:
-            await queue.put({"type": "shutdown", "data": {}})
+            _signal_subscriber_shutdown(queue)
     thread_subscribers.clear()
 
 
@@ -2995,9 +3938,8 @@ if _static_dir.exists() and (_static_dir / "assets").exists():
 @app.get("/", include_in_schema=False)
 async def serve_spa_root():
     """Serve the SPA index.html for the root path."""
-    index_path = _static_dir / "index.html"
-    if index_path.exists():
-        return FileResponse(index_path)
+    if _INDEX_EXISTS:
+        return FileResponse(_INDEX_PATH)
     return JSONResponse({"error": "Frontend not built"}, status_code=404)
 
 
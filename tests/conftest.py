@@ -19,6 +19,34 @@ class MockAgentMessage:
     metadata: dict[str, Any] | None = None
 
 
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point the db module at a fresh database file for each test."""
+    from mainthread import db
+
+    db.close_connections()
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.db")
+    db.init_database()
+    yield db
+    db.flush_events()
+    db.flush_usage()
+    db.close_connections()
+
+
+@pytest.fixture
+def broadcasts(monkeypatch):
+    """Record events passed to server.broadcast_to_thread instead of sending them."""
+    from mainthread import server
+
+    sent: list[dict[str, Any]] = []
+
+    async def record(thread_id, event):
+        sent.append(event)
+
+    monkeypatch.setattr(server, "broadcast_to_thread", record)
+    return sent
+
+
 # Common tool IDs for testing
 TOOL_ID_1 = "toolu_abc123"
 TOOL_ID_2 = "toolu_def456"
@@ -0,0 +1,42 @@
+"""
+Tests for the resizable agent concurrency limit.
+
+These tests validate:
+1. Slots cap the number of concurrently running agents
+2. Raising the limit admits waiters immediately
+"""
+
+import asyncio
+
+from mainthread.server import AgentSlots
+
+
+class TestAgentSlots:
+    """Test the AgentSlots admission control."""
+
+    async def test_limit_caps_concurrency(self):
+        """No more than `limit` holders should run at once."""
+        slots = AgentSlots(2)
+        peak = 0
+
+        async def worker():
+            nonlocal peak
+            async with slots:
+                peak = max(peak, slots.active)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(worker() for _ in range(6)))
+        assert peak == 2
+        assert slots.active == 0
+
+    async def test_raising_limit_admits_waiter(self):
+        """A waiter blocked on a full limit should proceed once the limit grows."""
+        slots = AgentSlots(1)
+        await slots.acquire()
+        waiter = asyncio.create_task(slots.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        await slots.set_limit(2)
+        await asyncio.wait_for(waiter, timeout=1.0)
+        assert slots.active == 2
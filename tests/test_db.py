@@ -0,0 +1,475 @@
+"""
+Tests for SQLite persistence.
+
+These tests validate:
+1. Connection setup (WAL, pragmas, transactions)
+2. Thread/message/event CRUD round-trips
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+
+class TestConnectionSetup:
+    """Test connection-level configuration."""
+
+    def test_wal_mode_enabled(self, temp_db):
+        """Database should be in WAL journal mode after init."""
+        with temp_db.get_db(readonly=True) as conn:
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+    def test_connection_pragmas(self, temp_db):
+        """Every connection should get synchronous=NORMAL and a busy timeout."""
+        with temp_db.get_db(readonly=True) as conn:
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+            assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+
+    def test_write_rolled_back_on_error(self, temp_db):
+        """An exception inside get_db() should roll back the transaction."""
+        with pytest.raises(RuntimeError), temp_db.get_db() as conn:
+            conn.execute("INSERT INTO threads (id, title) VALUES (?, ?)", ("t1", "Rolled back"))
+            raise RuntimeError("boom")
+        assert temp_db.get_thread("t1") is None
+
+    def test_read_connections_are_readonly(self, temp_db):
+        """Read connections should reject writes."""
+        with pytest.raises(sqlite3.OperationalError), temp_db.get_db(readonly=True) as conn:
+            conn.execute("INSERT INTO threads (id, title) VALUES (?, ?)", ("t2", "Nope"))
+
+    def test_reads_see_committed_writes(self, temp_db):
+        """A read after a write commit should observe the new row."""
+        thread = temp_db.create_thread("Visible")
+        with temp_db.get_db(readonly=True) as conn:
+            row = conn.execute("SELECT title FROM threads WHERE id = ?", (thread["id"],)).fetchone()
+        assert row["title"] == "Visible"
+
+    def test_schema_initialized_lazily(self, temp_db, tmp_path, monkeypatch):
+        """The first get_db() on a new path should create and version the schema."""
+        temp_db.close_connections()
+        fresh_path = tmp_path / "fresh.db"
+        monkeypatch.setattr(temp_db, "DB_PATH", fresh_path)
+        assert not fresh_path.exists()
+
+        with temp_db.get_db(readonly=True) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0] == 0
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        assert version == temp_db.SCHEMA_VERSION
+
+
+class TestThreadsAndEvents:
+    """Test basic thread and event round-trips."""
+
+    def test_create_and_get_thread(self, temp_db):
+        """A created thread should be readable with its messages."""
+        thread = temp_db.create_thread("Test thread")
+        temp_db.add_message(thread["id"], "user", "hello")
+
+        fetched = temp_db.get_thread(thread["id"])
+        assert fetched is not None
+        assert fetched["title"] == "Test thread"
+        assert [m["content"] for m in fetched["messages"]] == ["hello"]
+
+    def test_get_thread_without_messages(self, temp_db):
+        """include_messages=False should return the same row with no messages."""
+        thread = temp_db.create_thread("Test thread")
+        temp_db.add_message(thread["id"], "user", "hello")
+
+        full = temp_db.get_thread(thread["id"])
+        light = temp_db.get_thread(thread["id"], include_messages=False)
+        assert light["messages"] == []
+        assert {**light, "messages": full["messages"]} == full
+
+    def test_thread_summaries_count_messages(self, temp_db):
+        """Summaries should carry message counts and skip archived threads."""
+        busy = temp_db.create_thread("Busy")
+        temp_db.add_message(busy["id"], "user", "one")
+        temp_db.add_message(busy["id"], "assistant", "two")
+        empty = temp_db.create_thread("Empty", parent_id=busy["id"])
+        archived = temp_db.create_thread("Archived")
+        temp_db.archive_thread(archived["id"])
+
+        summaries = {t["id"]: t for t in temp_db.get_thread_summaries()}
+        assert set(summaries) == {busy["id"], empty["id"]}
+        assert summaries[busy["id"]]["messageCount"] == 2
+        assert summaries[empty["id"]]["messageCount"] == 0
+        assert summaries[empty["id"]]["parentId"] == busy["id"]
+
+    def test_thread_counts(self, temp_db):
+        """Counts should split threads by archive state."""
+        temp_db.create_thread("Open")
+        archived = temp_db.create_thread("Archived")
+        temp_db.archive_thread(archived["id"])
+
+        assert temp_db.get_thread_counts() == {"total": 2, "active": 1, "archived": 1}
+
+    def test_create_ephemeral_thread_matches_get_thread(self, temp_db):
+        """The returned ephemeral thread should match a fresh read of the row."""
+        parent = temp_db.create_thread("Parent")
+        created = temp_db.create_ephemeral_thread(
+            "toolu_task1", "Task: explore", parent["id"], work_dir="/tmp"
+        )
+        assert created["status"] == "pending"
+        assert created["isEphemeral"] is True
+        assert created == temp_db.get_thread("toolu_task1")
+
+    def test_update_ephemeral_thread_status_skips_regular_threads(self, temp_db):
+        """Only ephemeral Task threads should be updated."""
+        parent = temp_db.create_thread("Parent")
+        temp_db.create_ephemeral_thread("toolu_task1", "Task: explore", parent["id"])
+
+        assert temp_db.update_ephemeral_thread_status("toolu_task1", "done") is True
+        assert temp_db.update_ephemeral_thread_status(parent["id"], "done") is False
+        assert temp_db.get_thread("toolu_task1")["status"] == "done"
+        assert temp_db.get_thread(parent["id"])["status"] == "active"
+
+    def test_events_since(self, temp_db):
+        """Events should be replayed in seq_id order after the given ID."""
+        thread = temp_db.create_thread("Events")
+        first = temp_db.add_event(thread["id"], "text_delta", '{"content": "a"}')
+        second = temp_db.add_event(thread["id"], "text_delta", '{"content": "b"}')
+
+        events = temp_db.get_events_since(thread["id"], first)
+        assert [e["seq_id"] for e in events] == [second]
+        assert temp_db.get_latest_seq_id(thread["id"]) == second
+
+    def test_buffered_events_for_deleted_thread_skipped(self, temp_db, monkeypatch):
+        """A batch holding events of a since-deleted thread should still insert the rest."""
+        monkeypatch.setattr(temp_db, "EVENT_FLUSH_INTERVAL_SECONDS", 60)
+        kept = temp_db.create_thread("Kept")
+        deleted = temp_db.create_thread("Deleted")
+        temp_db.add_event(deleted["id"], "text_delta", "{}")
+        kept_seq = temp_db.add_event(kept["id"], "text_delta", "{}")
+        temp_db.delete_thread(deleted["id"])
+
+        assert [e["seq_id"] for e in temp_db.get_events_since(kept["id"], 0)] == [kept_seq]
+        assert temp_db.get_events_since(deleted["id"], 0) == []
+
+    def test_failed_event_flush_keeps_events(self, temp_db, monkeypatch):
+        """Events whose insert fails stay buffered and land on the next flush."""
+        monkeypatch.setattr(temp_db, "EVENT_FLUSH_INTERVAL_SECONDS", 60)
+        thread = temp_db.create_thread("Retry")
+        seq_ids = [temp_db.add_event(thread["id"], "text_delta", "{}") for _ in range(2)]
+
+        sql = temp_db._SQL_ADD_EVENT
+        monkeypatch.setattr(temp_db, "_SQL_ADD_EVENT", "INSERT INTO missing VALUES (?, ?, ?, ?)")
+        with pytest.raises(sqlite3.OperationalError):
+            temp_db.flush_events()
+        later = temp_db.add_event(thread["id"], "text_delta", "{}")
+
+        monkeypatch.setattr(temp_db, "_SQL_ADD_EVENT", sql)
+        events = temp_db.get_events_since(thread["id"], 0)
+        assert [e["seq_id"] for e in events] == [*seq_ids, later]
+
+    def test_full_event_batch_flushed_off_caller_thread(self, temp_db, monkeypatch):
+        """A full batch triggers the flush timer instead of inserting inline."""
+        monkeypatch.setattr(temp_db, "EVENT_FLUSH_INTERVAL_SECONDS", 60)
+        monkeypatch.setattr(temp_db, "EVENT_FLUSH_BATCH_SIZE", 2)
+        flushed = threading.Event()
+        flush_threads = []
+
+        def record_flush():
+            flush_threads.append(threading.current_thread())
+            flushed.set()
+
+        monkeypatch.setattr(temp_db, "flush_events", record_flush)
+        thread = temp_db.create_thread("Batch")
+        temp_db.add_event(thread["id"], "text_delta", "{}")
+        temp_db.add_event(thread["id"], "text_delta", "{}")
+
+        assert flushed.wait(timeout=1.0)
+        assert flush_threads != [threading.current_thread()]
+
+    def test_iter_events_since_spans_chunks(self, temp_db, monkeypatch):
+        """Replay should resume across chunk boundaries without gaps or repeats."""
+        monkeypatch.setattr(temp_db, "EVENT_REPLAY_CHUNK_SIZE", 2)
+        thread = temp_db.create_thread("Chunks")
+        seq_ids = [temp_db.add_event(thread["id"], "text_delta", "{}") for _ in range(5)]
+
+        replayed = [e["seq_id"] for e in temp_db.iter_events_since(thread["id"], seq_ids[0])]
+        assert replayed == seq_ids[1:]
+
+    def test_large_event_data_compressed(self, temp_db):
+        """Large payloads are stored compressed and replayed as the original JSON."""
+        thread = temp_db.create_thread("Compressed")
+        small = '{"content": "hi"}'
+        large = '{"assistantMessage": {"content": "%s"}}' % ("word " * 200)
+        temp_db.add_event(thread["id"], "text_delta", small)
+        temp_db.add_event(thread["id"], "complete", large)
+        temp_db.flush_events()
+
+        with temp_db.get_db(readonly=True) as conn:
+            stored = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT typeof(data) FROM events ORDER BY seq_id"
+                ).fetchall()
+            ]
+        assert stored == ["text", "blob"]
+        assert [e["data"] for e in temp_db.get_events_since(thread["id"], 0)] == [small, large]
+
+    def test_stuck_running_threads(self, temp_db):
+        """Only unarchived running threads past the age threshold are stuck."""
+        stale = temp_db.create_thread("Stale")
+        fresh = temp_db.create_thread("Fresh")
+        archived = temp_db.create_thread("Archived")
+        for thread in (stale, fresh, archived):
+            temp_db.update_thread_status(thread["id"], "running")
+        temp_db.archive_thread(archived["id"])
+        with temp_db.get_db() as conn:
+            conn.execute(
+                "UPDATE threads SET updated_at = "
+                "strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime', '-2 hours') "
+                "WHERE id IN (?, ?)",
+                (stale["id"], archived["id"]),
+            )
+
+        stuck = temp_db.get_stuck_running_threads(3600)
+        assert [t["id"] for t in stuck] == [stale["id"]]
+        assert 7190 <= stuck[0]["stuckSeconds"] <= 7210
+
+    def test_bulk_update_thread_status(self, temp_db):
+        """Only the listed threads should change status."""
+        first = temp_db.create_thread("First")
+        second = temp_db.create_thread("Second")
+        other = temp_db.create_thread("Other")
+        temp_db.bulk_update_thread_status([first["id"], second["id"]], "needs_attention")
+
+        assert temp_db.get_thread(first["id"])["status"] == "needs_attention"
+        assert temp_db.get_thread(second["id"])["status"] == "needs_attention"
+        assert temp_db.get_thread(other["id"])["status"] == "active"
+        with pytest.raises(ValueError):
+            temp_db.bulk_update_thread_status([first["id"]], "bogus")
+
+    def test_bulk_update_skips_threads_that_moved_on(self, temp_db):
+        """A thread that finished after being selected keeps its new status."""
+        finished = temp_db.create_thread("Finished")
+        stuck = temp_db.create_thread("Stuck")
+        for thread in (finished, stuck):
+            temp_db.update_thread_status(thread["id"], "running")
+        selected = [finished["id"], stuck["id"]]
+        temp_db.update_thread_status(finished["id"], "done")
+
+        updated = temp_db.bulk_update_thread_status(selected, "needs_attention", "running")
+        assert updated == [stuck["id"]]
+        assert temp_db.get_thread(finished["id"])["status"] == "done"
+        assert temp_db.get_thread(stuck["id"])["status"] == "needs_attention"
+
+    def test_update_status_with_session(self, temp_db):
+        """A session ID saved with the status should stick until replaced."""
+        thread = temp_db.create_thread("Session")
+        temp_db.update_thread_status(thread["id"], "done", "sess-1")
+        temp_db.update_thread_status(thread["id"], "active")
+
+        updated = temp_db.get_thread(thread["id"])
+        assert updated["status"] == "active"
+        assert updated["sessionId"] == "sess-1"
+
+    def test_recent_work_dirs_ordered_by_latest_use(self, temp_db):
+        """Directories should be unique and ordered by their most recent thread."""
+        temp_db.create_thread("A1", work_dir="/a")
+        temp_db.create_thread("B1", work_dir="/b")
+        temp_db.create_thread("No dir")
+        temp_db.create_thread("A2", work_dir="/a")
+        with temp_db.get_db() as conn:
+            # Make creation order explicit regardless of clock resolution
+            for i, title in enumerate(["A1", "B1", "A2"]):
+                conn.execute(
+                    "UPDATE threads SET created_at = ? WHERE title = ?",
+                    (f"2026-01-0{i + 1}T00:00:00", title),
+                )
+
+        assert temp_db.get_recent_work_dirs(limit=5) == ["/a", "/b"]
+        assert temp_db.get_recent_work_dirs(limit=1) == ["/a"]
+
+    def test_usage_with_children(self, temp_db):
+        """Usage should report own totals and the sum over direct children."""
+        parent = temp_db.create_thread("Parent")
+        child_a = temp_db.create_thread("Child A", parent_id=parent["id"])
+        child_b = temp_db.create_thread("Child B", parent_id=parent["id"])
+        temp_db.update_thread_usage(parent["id"], 10, 20, 0.5)
+        temp_db.update_thread_usage(child_a["id"], 1, 2, 0.25)
+        temp_db.update_thread_usage(child_b["id"], 3, 4, 0.25)
+
+        usage = temp_db.get_thread_usage_with_children(parent["id"])
+        assert usage == {
+            "inputTokens": 10,
+            "outputTokens": 20,
+            "totalCostUsd": 0.5,
+            "childrenInputTokens": 4,
+            "childrenOutputTokens": 6,
+            "childrenTotalCostUsd": 0.5,
+        }
+
+    def test_usage_buffered_until_flush(self, temp_db, monkeypatch):
+        """Usage deltas should accumulate in memory and land in one flush."""
+        monkeypatch.setattr(temp_db, "USAGE_FLUSH_INTERVAL_SECONDS", 60)
+        thread = temp_db.create_thread("Buffered")
+        temp_db.update_thread_usage(thread["id"], 5, 1, 0.1)
+        temp_db.update_thread_usage(thread["id"], 5, 1, 0.1)
+        temp_db.update_thread_usage(thread["id"], 0, 0, 0.0)  # no-op
+
+        assert temp_db.get_thread(thread["id"])["inputTokens"] == 0
+        temp_db.flush_usage()
+        fetched = temp_db.get_thread(thread["id"])
+        assert fetched["inputTokens"] == 10
+        assert fetched["outputTokens"] == 2
+
+    def test_failed_usage_flush_keeps_deltas(self, temp_db, monkeypatch):
+        """Deltas whose write fails are merged back and added by the next flush."""
+        monkeypatch.setattr(temp_db, "USAGE_FLUSH_INTERVAL_SECONDS", 60)
+        thread = temp_db.create_thread("Retry")
+        temp_db.update_thread_usage(thread["id"], 5, 1, 0.1)
+
+        sql = temp_db._SQL_UPDATE_THREAD_USAGE
+        monkeypatch.setattr(temp_db, "_SQL_UPDATE_THREAD_USAGE", "UPDATE missing SET x = ?")
+        with pytest.raises(sqlite3.OperationalError):
+            temp_db.flush_usage()
+        temp_db.update_thread_usage(thread["id"], 5, 1, 0.1)
+
+        monkeypatch.setattr(temp_db, "_SQL_UPDATE_THREAD_USAGE", sql)
+        temp_db.flush_usage()
+        fetched = temp_db.get_thread(thread["id"])
+        assert fetched["inputTokens"] == 10
+        assert fetched["outputTokens"] == 2
+
+    def test_usage_null_columns_backfilled(self, temp_db, tmp_path, monkeypatch):
+        """Legacy NULL usage values should be zeroed at init so updates add to them."""
+        temp_db.close_connections()
+        legacy_path = tmp_path / "legacy.db"
+        with sqlite3.connect(legacy_path) as legacy:
+            legacy.execute(
+                "CREATE TABLE threads (id TEXT PRIMARY KEY, title TEXT NOT NULL, "
+                "status TEXT DEFAULT 'active', parent_id TEXT, work_dir TEXT, "
+                "session_id TEXT, model TEXT, extended_thinking INTEGER DEFAULT 1, "
+                "plan_mode INTEGER DEFAULT 1, git_branch TEXT, git_repo TEXT, "
+                "is_worktree INTEGER DEFAULT 0, archived_at TEXT, "
+                "input_tokens INTEGER, output_tokens INTEGER, "
+                "total_cost_usd REAL, created_at TEXT, updated_at TEXT)"
+            )
+            legacy.execute("INSERT INTO threads (id, title) VALUES ('old', 'Legacy')")
+        legacy.close()
+        monkeypatch.setattr(temp_db, "DB_PATH", legacy_path)
+        temp_db.init_database()
+
+        temp_db.update_thread_usage("old", 7, 0, 0.5)
+        temp_db.flush_usage()
+        fetched = temp_db.get_thread("old")
+        assert fetched["inputTokens"] == 7
+        assert fetched["totalCostUsd"] == 0.5
+
+    def test_usage_unknown_thread(self, temp_db):
+        """Unknown threads should report zero usage."""
+        usage = temp_db.get_thread_usage_with_children("missing")
+        assert usage["inputTokens"] == 0
+        assert usage["childrenTotalCostUsd"] == 0.0
+
+
+class TestQueryPlans:
+    """Test that hot queries are served by indexes rather than table scans."""
+
+    @staticmethod
+    def _plan(conn, sql: str, params: tuple) -> str:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        return " | ".join(row[3] for row in rows)
+
+    def test_event_replay_uses_thread_seq_index(self, temp_db):
+        """SSE replay and MAX(seq_id) lookups should search idx_events_thread_seq."""
+        with temp_db.get_db(readonly=True) as conn:
+            replay = self._plan(
+                conn,
+                "SELECT seq_id, event_type, data FROM events "
+                "WHERE thread_id = ? AND seq_id > ? ORDER BY seq_id ASC",
+                ("t", 0),
+            )
+            latest = self._plan(conn, "SELECT MAX(seq_id) FROM events WHERE thread_id = ?", ("t",))
+        assert "USING INDEX idx_events_thread_seq" in replay
+        assert "TEMP B-TREE" not in replay
+        assert "COVERING INDEX idx_events_thread_seq" in latest
+
+    def test_recent_work_dirs_uses_partial_index(self, temp_db):
+        """Recent work dirs should be read from the covering partial index."""
+        with temp_db.get_db(readonly=True) as conn:
+            plan = self._plan(
+                conn,
+                "SELECT work_dir FROM threads WHERE work_dir IS NOT NULL AND work_dir != '' "
+                "GROUP BY work_dir ORDER BY MAX(created_at) DESC LIMIT ?",
+                (5,),
+            )
+        assert "COVERING INDEX idx_threads_workdir_created" in plan
+
+    def test_stuck_threads_use_status_index(self, temp_db):
+        """The watchdog query should search idx_threads_status_updated."""
+        with temp_db.get_db(readonly=True) as conn:
+            plan = self._plan(conn, temp_db._SQL_STUCK_RUNNING_THREADS, ("-60 seconds",))
+        assert "USING INDEX idx_threads_status_updated" in plan
+
+
+class TestEventCleanup:
+    """Test batched removal of old SSE events."""
+
+    def test_cleanup_deletes_only_old_events_in_batches(self, temp_db, monkeypatch):
+        """Old events should be removed across several batches; recent ones kept."""
+        monkeypatch.setattr(temp_db, "EVENT_CLEANUP_BATCH_SIZE", 2)
+        thread = temp_db.create_thread("Cleanup")
+        with temp_db.get_db() as conn:
+            conn.executemany(
+                "INSERT INTO events (thread_id, event_type, data, created_at) "
+                "VALUES (?, 'text_delta', '{}', datetime('now', '-2 days'))",
+                [(thread["id"],)] * 5,
+            )
+        recent = temp_db.add_event(thread["id"], "text_delta", "{}")
+
+        assert temp_db.cleanup_old_events(max_age_hours=24) == 5
+        assert [e["seq_id"] for e in temp_db.get_events_since(thread["id"], 0)] == [recent]
+
+    def test_cleanup_keeps_recent_event_inside_expired_range(self, temp_db):
+        """A recent event between two old ones should survive the range delete."""
+        thread = temp_db.create_thread("Cleanup")
+        with temp_db.get_db() as conn:
+            for age in ("-2 days", "0 seconds", "-3 days"):
+                conn.execute(
+                    "INSERT INTO events (thread_id, event_type, data, created_at) "
+                    "VALUES (?, 'text_delta', '{}', datetime('now', ?))",
+                    (thread["id"], age),
+                )
+
+        assert temp_db.cleanup_old_events(max_age_hours=24) == 2
+        assert len(temp_db.get_events_since(thread["id"], 0)) == 1
+
+
+class TestReadConnections:
+    """Test per-thread read connection reuse."""
+
+    def test_read_connection_reused_per_thread(self, temp_db):
+        """Consecutive reads on one thread should reuse the same connection."""
+        with temp_db.get_db(readonly=True) as first:
+            pass
+        with temp_db.get_db(readonly=True) as second:
+            pass
+        assert first is second
+
+    def test_read_connection_distinct_across_threads(self, temp_db):
+        """Each OS thread should get its own read connection."""
+        seen = []
+
+        def _read():
+            with temp_db.get_db(readonly=True) as conn:
+                seen.append(conn)
+
+        worker = threading.Thread(target=_read)
+        worker.start()
+        worker.join()
+        with temp_db.get_db(readonly=True) as conn:
+            seen.append(conn)
+        assert seen[0] is not seen[1]
+
+    def test_nested_reads_share_connection(self, temp_db):
+        """A nested read on the same thread should reuse the outer transaction."""
+        with temp_db.get_db(readonly=True) as outer:
+            with temp_db.get_db(readonly=True) as inner:
+                assert inner is outer
+            assert outer.in_transaction
@@ -0,0 +1,60 @@
+"""
+Tests for the work directory picker helpers.
+
+These tests validate:
+1. Project folder and git repo suggestions
+2. Directory browsing with partial paths
+"""
+
+from mainthread import server
+from mainthread.server import _browse_directory_sync, _get_directory_suggestions
+
+
+class TestDirectorySuggestions:
+    """Test project folder and git repo suggestions for the create dialog."""
+
+    async def test_git_repos_found_in_project_folder(self, temp_db, tmp_path, monkeypatch):
+        """Only directories holding a .git entry are suggested as repos."""
+        projects = tmp_path / "Projects"
+        (projects / "repo" / ".git").mkdir(parents=True)
+        (projects / "plain").mkdir()
+        (projects / "notes.txt").write_text("")
+        monkeypatch.setenv("HOME", str(tmp_path))
+
+        suggestions = await _get_directory_suggestions()
+        assert [(s["path"], s["type"]) for s in suggestions] == [
+            (str(projects), "folder"),
+            (str(projects / "repo"), "git"),
+        ]
+
+    async def test_project_scan_reused_within_ttl(self, temp_db, tmp_path, monkeypatch):
+        """Repeat calls reuse the folder scan but still pick up recent dirs."""
+        (tmp_path / "Code").mkdir()
+        monkeypatch.setenv("HOME", str(tmp_path))
+        assert [s["type"] for s in await server._get_directory_suggestions()] == ["folder"]
+
+        def fail(base):
+            raise AssertionError("cached project scan should have been used")
+
+        monkeypatch.setattr(server, "_scan_project_folder", fail)
+        temp_db.create_thread("Recent", work_dir=str(tmp_path))
+        suggestions = await server._get_directory_suggestions()
+        assert [s["type"] for s in suggestions] == ["folder", "recent"]
+
+
+class TestBrowseDirectory:
+    """Test the directory browser behind the work dir picker."""
+
+    def test_lists_sorted_entries_with_prefix(self, tmp_path):
+        """Partial paths list matching siblings, case-insensitively sorted."""
+        for name in ("beta", "Alpha", "alpine", "other"):
+            (tmp_path / name).mkdir()
+        (tmp_path / "album.txt").write_text("")
+
+        result = _browse_directory_sync(str(tmp_path / "al"), "directory")
+        assert [e["name"] for e in result] == ["Alpha", "alpine"]
+        assert result[0] == {"path": str(tmp_path / "Alpha"), "name": "Alpha", "isDir": True}
+
+        result = _browse_directory_sync(str(tmp_path), "all")
+        assert [e["name"] for e in result] == ["album.txt", "Alpha", "alpine", "beta", "other"]
+        assert result[0]["isDir"] is False
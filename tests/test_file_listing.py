@@ -0,0 +1,142 @@
+"""
+Tests for @-mention file listing and file context reading.
+
+These tests validate:
+1. Files are listed relative to the work dir, respecting ignore patterns
+2. Ignored directories are never descended into
+3. Query filtering and the result limit
+4. Cached listings and their invalidation
+5. Referenced files are read in order within the context budget
+"""
+
+from mainthread import server
+from mainthread.server import _list_files_sync, _read_file_contents
+
+
+def _make_tree(root):
+    """Create a small project tree with ignored and nested files."""
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "src" / "pkg" / "module.py").write_text("")
+    (root / "src" / "main.py").write_text("")
+    (root / "README.md").write_text("")
+    (root / "node_modules" / "lib").mkdir(parents=True)
+    (root / "node_modules" / "lib" / "index.js").write_text("")
+    (root / "build").mkdir()
+    (root / "build" / "out.js").write_text("")
+    (root / "cache.pyc").write_text("")
+    (root / ".gitignore").write_text("# comment\nbuild\n")
+
+
+class TestListFiles:
+    """Test the work dir walk behind the @-mention picker."""
+
+    def test_lists_files_and_skips_ignored(self, tmp_path):
+        """Ignored names and everything under ignored directories are skipped."""
+        _make_tree(tmp_path)
+        files = _list_files_sync(str(tmp_path), None, 100)
+        assert sorted(f["path"] for f in files) == [
+            ".gitignore", "README.md", "src/main.py", "src/pkg/module.py",
+        ]
+        assert {"path": "src/pkg/module.py", "name": "module.py"} in files
+
+    def test_shallow_files_listed_first(self, tmp_path):
+        """The walk is breadth-first, so a small limit returns top-level files."""
+        _make_tree(tmp_path)
+        files = _list_files_sync(str(tmp_path), None, 2)
+        assert {f["path"] for f in files} == {".gitignore", "README.md"}
+
+    def test_query_filters_relative_path(self, tmp_path):
+        """Queries match anywhere in the relative path, case-insensitively."""
+        _make_tree(tmp_path)
+        files = _list_files_sync(str(tmp_path), "PKG", 100)
+        assert [f["path"] for f in files] == ["src/pkg/module.py"]
+
+    def test_missing_work_dir(self, tmp_path):
+        """A work dir that no longer exists lists nothing."""
+        assert _list_files_sync(str(tmp_path / "gone"), None, 10) == []
+
+    def test_gitignore_changes_picked_up(self, tmp_path):
+        """Compiled ignore patterns are rebuilt when .gitignore changes."""
+        _make_tree(tmp_path)
+        assert "README.md" in {f["path"] for f in _list_files_sync(str(tmp_path), None, 100)}
+
+        (tmp_path / ".gitignore").write_text("build\n*.md\n")
+        assert "README.md" not in {f["path"] for f in _list_files_sync(str(tmp_path), None, 100)}
+
+    def test_listing_cached_between_queries(self, tmp_path, monkeypatch):
+        """Queries filter the cached listing until the work dir changes."""
+        _make_tree(tmp_path)
+        assert len(server._list_files_sync(str(tmp_path), None, 100)) == 4
+
+        def fail(*args):
+            raise AssertionError("cached listing should have been used")
+
+        monkeypatch.setattr(server, "_walk_files", fail)
+        files = server._list_files_sync(str(tmp_path), "main", 100)
+        assert [f["path"] for f in files] == ["src/main.py"]
+        monkeypatch.undo()
+
+        (tmp_path / "main_new.py").write_text("")
+        files = server._list_files_sync(str(tmp_path), "main", 100)
+        assert [f["path"] for f in files] == ["main_new.py", "src/main.py"]
+
+    def test_large_tree_walks_query_directory_first(self, tmp_path, monkeypatch):
+        """Uncacheable trees walk the directory named by the query first."""
+        _make_tree(tmp_path)
+        (tmp_path / "lib" / "src" / "pkg").mkdir(parents=True)
+        (tmp_path / "lib" / "src" / "pkg" / "extra.py").write_text("")
+        monkeypatch.setattr(server, "FILE_LIST_CACHE_MAX_FILES", 1)
+
+        files = server._list_files_sync(str(tmp_path), "src/pkg/", 1)
+        assert [f["path"] for f in files] == ["src/pkg/module.py"]
+
+        files = server._list_files_sync(str(tmp_path), "src/pkg/", 10)
+        assert sorted(f["path"] for f in files) == ["lib/src/pkg/extra.py", "src/pkg/module.py"]
+
+
+class TestReadFileContents:
+    """Test reading @-mentioned files into message context."""
+
+    async def test_reads_in_reference_order(self, tmp_path):
+        """Concurrent reads still produce blocks in reference order."""
+        (tmp_path / "a.txt").write_text("alpha")
+        (tmp_path / "b.txt").write_text("beta")
+        context = await _read_file_contents(str(tmp_path), ["b.txt", "missing.txt", "a.txt"])
+        assert context == (
+            '<file path="b.txt">\nbeta\n</file>\n\n'
+            '<file path="missing.txt">\n[Error: File not found]\n</file>\n\n'
+            '<file path="a.txt">\nalpha\n</file>'
+        )
+
+    async def test_budget_truncates_remaining_files(self, tmp_path):
+        """Files past the size budget are truncated and later files dropped."""
+        (tmp_path / "a.txt").write_text("x" * 6)
+        (tmp_path / "b.txt").write_text("y" * 6)
+        (tmp_path / "c.txt").write_text("z")
+        context = await _read_file_contents(str(tmp_path), ["a.txt", "b.txt", "c.txt"], max_size=10)
+        assert context == (
+            '<file path="a.txt">\nxxxxxx\n</file>\n\n'
+            '<file path="b.txt">\n[Truncated: Total context size exceeded]\n</file>'
+        )
+
+    async def test_rejects_paths_outside_work_dir(self, tmp_path):
+        """Relative paths escaping the work dir are refused."""
+        work = tmp_path / "work"
+        work.mkdir()
+        (tmp_path / "secret.txt").write_text("secret")
+        context = await _read_file_contents(str(work), ["../secret.txt"])
+        assert context == (
+            '<file path="../secret.txt">\n'
+            "[Error: Path outside working directory]\n</file>"
+        )
+
+    async def test_rejects_sibling_with_shared_prefix(self, tmp_path):
+        """A sibling directory sharing the work dir's name prefix is outside it."""
+        (tmp_path / "work").mkdir()
+        (tmp_path / "workbaz").mkdir()
+        (tmp_path / "workbaz" / "secret.txt").write_text("secret")
+        context = await _read_file_contents(str(tmp_path / "work"), ["../workbaz/secret.txt"])
+        assert context == (
+            '<file path="../workbaz/secret.txt">\n'
+            "[Error: Path outside working directory]\n</file>"
+        )
@@ -6,16 +6,31 @@ These tests validate:
 2. Regular git repos return branch and repo name
 3. Worktree detection works correctly
 4. Edge cases (missing dirs, None input, detached HEAD)
+5. Standard repos are read from .git files without spawning git
 """
 
+import asyncio
 import os
+import shutil
 import subprocess
 import tempfile
-import shutil
+
 import pytest
 
 # Import the functions to test
-from mainthread.server import _run_git_command, _detect_git_info_sync
+from mainthread import server
+from mainthread.agents import get_registry
+from mainthread.server import (
+    _create_git_worktree_sync,
+    _detect_git_info_from_files,
+    _detect_git_info_sync,
+    _detect_git_info_with_git,
+    _get_git_info_detailed_sync,
+    _list_git_branches,
+    _read_git_branches,
+    _repo_name_from_url,
+    _run_git_command,
+)
 
 
 class TestGitCommandRunner:
@@ -264,3 +279,315 @@ class TestGitInfoDetection:
         # Both should detect it's not a worktree
         assert actual_result["is_worktree"] is False
         assert symlink_result["is_worktree"] is False
+
+    def test_subdirectory_of_repo(self, tmp_path):
+        """A directory nested inside a repo should report the repo's branch."""
+        subprocess.run(["git", "init", "-b", "trunk"], cwd=tmp_path, capture_output=True)
+        nested = tmp_path / "src" / "pkg"
+        nested.mkdir(parents=True)
+
+        result = _detect_git_info_sync(str(nested))
+        assert result["git_branch"] == "trunk"
+        assert result["git_repo"] == "pkg"
+        assert result["is_worktree"] is False
+
+    def test_no_git_subprocess_for_standard_repo(self, tmp_path, monkeypatch):
+        """Standard repos are read from .git files without running git."""
+        subprocess.run(["git", "init", "-b", "main"], cwd=tmp_path, capture_output=True)
+        subprocess.run(
+            ["git", "remote", "add", "origin", "git@github.com:testuser/fs-repo.git"],
+            cwd=tmp_path,
+            capture_output=True,
+        )
+
+        def fail(*args, **kwargs):
+            raise AssertionError("git subprocess should not be spawned")
+
+        monkeypatch.setattr(subprocess, "run", fail)
+        result = _detect_git_info_sync(str(tmp_path))
+        assert result == {"git_branch": "main", "git_repo": "fs-repo", "is_worktree": False}
+
+
+class TestGitCliFallback:
+    """Test the git CLI fallback used for layouts the file reader skips."""
+
+    def test_matches_file_reader(self, tmp_path):
+        """Both detection paths should agree on a repo with a worktree."""
+        main_repo = tmp_path / "main"
+        main_repo.mkdir()
+        subprocess.run(["git", "init", "-b", "main"], cwd=main_repo, capture_output=True)
+        subprocess.run(
+            ["git", "-c", "user.email=t@t.com", "-c", "user.name=T", "commit",
+             "--allow-empty", "-m", "init"],
+            cwd=main_repo,
+            capture_output=True,
+        )
+        subprocess.run(
+            ["git", "remote", "add", "origin", "https://github.com/testuser/cli-repo.git"],
+            cwd=main_repo,
+            capture_output=True,
+        )
+        worktree_path = tmp_path / "wt"
+        subprocess.run(
+            ["git", "worktree", "add", "-b", "feature", str(worktree_path)],
+            cwd=main_repo,
+            capture_output=True,
+        )
+
+        for path in (main_repo, worktree_path):
+            assert _detect_git_info_with_git(str(path)) == _detect_git_info_from_files(path)
+
+    def test_unborn_branch(self, tmp_path):
+        """A repo without commits is still detected, just without a branch."""
+        subprocess.run(["git", "init"], cwd=tmp_path, capture_output=True)
+        result = _detect_git_info_with_git(str(tmp_path))
+        assert result == {"git_branch": None, "git_repo": tmp_path.name, "is_worktree": False}
+
+
+class TestGitInfoDetailed:
+    """Test the detailed git info used by the thread creation dialog."""
+
+    def test_repo_root_matches_git(self, tmp_path):
+        """The repo root read from disk should match git's --show-toplevel."""
+        main_repo = tmp_path / "main"
+        main_repo.mkdir()
+        subprocess.run(["git", "init", "-b", "main"], cwd=main_repo, capture_output=True)
+        subprocess.run(
+            ["git", "-c", "user.email=t@t.com", "-c", "user.name=T", "commit",
+             "--allow-empty", "-m", "init"],
+            cwd=main_repo,
+            capture_output=True,
+        )
+        worktree_path = tmp_path / "wt"
+        subprocess.run(
+            ["git", "worktree", "add", "-b", "feature", str(worktree_path)],
+            cwd=main_repo,
+            capture_output=True,
+        )
+        nested = main_repo / "src"
+        nested.mkdir()
+
+        for path in (main_repo, nested, worktree_path):
+            toplevel = subprocess.run(
+                ["git", "rev-parse", "--show-toplevel"],
+                cwd=path,
+                capture_output=True,
+                text=True,
+            ).stdout.strip()
+            assert _get_git_info_detailed_sync(str(path))["repoRoot"] == toplevel
+
+    def test_branches_match_git(self, tmp_path):
+        """Branches read from refs/heads and packed-refs should match git's list."""
+        subprocess.run(["git", "init", "-b", "main"], cwd=tmp_path, capture_output=True)
+        subprocess.run(
+            ["git", "-c", "user.email=t@t.com", "-c", "user.name=T", "commit",
+             "--allow-empty", "-m", "init"],
+            cwd=tmp_path,
+            capture_output=True,
+        )
+        for name in ("packed", "feature/nested"):
+            subprocess.run(["git", "branch", name], cwd=tmp_path, capture_output=True)
+        subprocess.run(["git", "pack-refs", "--all"], cwd=tmp_path, capture_output=True)
+        subprocess.run(["git", "branch", "loose"], cwd=tmp_path, capture_output=True)
+
+        branches = _read_git_branches(tmp_path / ".git")
+        assert branches == ["feature/nested", "loose", "main", "packed"]
+        assert branches == _list_git_branches(str(tmp_path))
+
+
+class TestGitInfoCache:
+    """Test per-work-dir caching of git detection results."""
+
+    def test_cached_until_head_changes(self, tmp_path, monkeypatch):
+        """Repeat lookups reuse the cached result until HEAD is rewritten."""
+        subprocess.run(["git", "init", "-b", "main"], cwd=tmp_path, capture_output=True)
+        assert _detect_git_info_sync(str(tmp_path))["git_branch"] == "main"
+
+        def fail(path):
+            raise AssertionError("cached result should have been used")
+
+        monkeypatch.setattr(server, "_detect_git_info_from_files", fail)
+        assert _detect_git_info_sync(str(tmp_path))["git_branch"] == "main"
+        monkeypatch.undo()
+
+        subprocess.run(
+            ["git", "symbolic-ref", "HEAD", "refs/heads/other"], cwd=tmp_path, capture_output=True
+        )
+        assert _detect_git_info_sync(str(tmp_path))["git_branch"] == "other"
+
+    def test_branches_cached_until_refs_change(self, tmp_path, monkeypatch):
+        """Branch lists are reused until a branch is created or deleted."""
+        subprocess.run(["git", "init", "-b", "main"], cwd=tmp_path, capture_output=True)
+        subprocess.run(
+            ["git", "-c", "user.email=t@t.com", "-c", "user.name=T", "commit",
+             "--allow-empty", "-m", "init"],
+            cwd=tmp_path,
+            capture_output=True,
+        )
+        assert server._get_git_branches_sync(str(tmp_path)) == ["main"]
+
+        def fail(path):
+            raise AssertionError("cached branches should have been used")
+
+        monkeypatch.setattr(server, "_read_git_branches", fail)
+        assert server._get_git_branches_sync(str(tmp_path)) == ["main"]
+        monkeypatch.undo()
+
+        subprocess.run(["git", "branch", "topic"], cwd=tmp_path, capture_output=True)
+        assert server._get_git_branches_sync(str(tmp_path)) == ["main", "topic"]
+
+
+    def test_worktrees_share_branch_cache(self, tmp_path, monkeypatch):
+        """Linked worktrees reuse the branch list cached for their repository."""
+        main_repo = tmp_path / "main"
+        main_repo.mkdir()
+        subprocess.run(["git", "init", "-b", "main"], cwd=main_repo, capture_output=True)
+        subprocess.run(
+            ["git", "-c", "user.email=t@t.com", "-c", "user.name=T", "commit",
+             "--allow-empty", "-m", "init"],
+            cwd=main_repo,
+            capture_output=True,
+        )
+        worktree_path = tmp_path / "wt"
+        subprocess.run(
+            ["git", "worktree", "add", "-b", "feature", str(worktree_path)],
+            cwd=main_repo,
+            capture_output=True,
+        )
+        assert server._get_git_branches_sync(str(main_repo)) == ["feature", "main"]
+
+        def fail(path):
+            raise AssertionError("the repository's cached branches should have been used")
+
+        monkeypatch.setattr(server, "_read_git_branches", fail)
+        assert server._get_git_branches_sync(str(worktree_path)) == ["feature", "main"]
+
+
+class TestBackgroundWorktree:
+    """Test that sub-thread worktrees are created after the thread itself."""
+
+    async def test_thread_switches_to_worktree_when_ready(self, temp_db, tmp_path):
+        """The thread is created in the base dir, then moved onto its worktree."""
+        subprocess.run(["git", "init", "-b", "main"], cwd=tmp_path, capture_output=True)
+        subprocess.run(
+            ["git", "-c", "user.email=t@t.com", "-c", "user.name=T", "commit",
+             "--allow-empty", "-m", "init"],
+            cwd=tmp_path,
+            capture_output=True,
+        )
+        parent = temp_db.create_thread("Parent", work_dir=str(tmp_path))
+
+        thread = await server.create_thread_for_agent(
+            "Child", parent_id=parent["id"], work_dir=str(tmp_path), use_worktree=True
+        )
+        assert thread["_worktree_info"]["pending"] is True
+        assert thread["workDir"] == str(tmp_path)
+        assert thread["isWorktree"] is False
+
+        await server._pending_worktrees[thread["id"]]
+        updated = temp_db.get_thread(thread["id"])
+        assert updated["isWorktree"] is True
+        assert updated["workDir"].startswith(str(tmp_path / ".mainthread" / "worktrees"))
+        assert updated["gitBranch"] == updated["worktreeBranch"]
+        assert thread["id"] not in server._pending_worktrees
+
+    async def test_failed_worktree_reported_to_parent(self, temp_db, tmp_path, monkeypatch):
+        """A failed worktree leaves the thread in the base dir and tells the parent."""
+        subprocess.run(["git", "init", "-b", "main"], cwd=tmp_path, capture_output=True)
+        subprocess.run(
+            ["git", "-c", "user.email=t@t.com", "-c", "user.name=T", "commit",
+             "--allow-empty", "-m", "init"],
+            cwd=tmp_path,
+            capture_output=True,
+        )
+        parent = temp_db.create_thread("Parent", work_dir=str(tmp_path))
+
+        async def fail(*args):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(server, "create_git_worktree", fail)
+        thread = await server.create_thread_for_agent(
+            "Child", parent_id=parent["id"], work_dir=str(tmp_path), use_worktree=True
+        )
+        await server._pending_worktrees[thread["id"]]
+
+        assert temp_db.get_thread(thread["id"])["isWorktree"] is False
+        notification = temp_db.get_thread(parent["id"])["messages"][-1]["content"]
+        assert notification.startswith('[notification] Sub-thread "Child" could not get')
+        assert "disk full" in notification
+        events = temp_db.get_events_since(parent["id"], 0)
+        assert "worktree_failed" in [e["event_type"] for e in events]
+
+    def test_branch_collision_gets_suffix(self, tmp_path):
+        """An existing branch makes worktree creation retry with a suffix."""
+        subprocess.run(["git", "init", "-b", "main"], cwd=tmp_path, capture_output=True)
+        subprocess.run(
+            ["git", "-c", "user.email=t@t.com", "-c", "user.name=T", "commit",
+             "--allow-empty", "-m", "init"],
+            cwd=tmp_path,
+            capture_output=True,
+        )
+        subprocess.run(["git", "branch", "mainthread/abcd1234"], cwd=tmp_path, capture_output=True)
+
+        result = _create_git_worktree_sync(str(tmp_path), "abcd1234-rest-of-id")
+        assert result["success"] is True
+        assert result["branch_name"] == "mainthread/abcd1234-2"
+        assert result["worktree_path"].endswith("abcd1234-2")
+
+    async def test_cleanup_defers_branch_delete(self, tmp_path):
+        """The worktree is gone on return; its branch is deleted in the background."""
+        subprocess.run(["git", "init", "-b", "main"], cwd=tmp_path, capture_output=True)
+        subprocess.run(
+            ["git", "-c", "user.email=t@t.com", "-c", "user.name=T", "commit",
+             "--allow-empty", "-m", "init"],
+            cwd=tmp_path,
+            capture_output=True,
+        )
+        created = server._create_git_worktree_sync(str(tmp_path), "feedbeef")
+
+        assert await server.cleanup_git_worktree(created["worktree_path"], created["branch_name"])
+        assert not os.path.exists(created["worktree_path"])
+
+        await asyncio.gather(*get_registry()._background_tasks)
+        assert server._read_git_branches(tmp_path / ".git") == ["main"]
+
+    @pytest.mark.parametrize(
+        ("subdir", "error"),
+        [
+            ("../outside", "Worktree directory must be within the working directory"),
+            ("linked/worktrees", "Worktree path cannot traverse symlinks"),
+        ],
+    )
+    def test_unsafe_worktree_dirs_rejected(self, tmp_path, subdir, error):
+        """Worktree dirs must stay inside the repo without crossing symlinks."""
+        repo = tmp_path / "repo"
+        repo.mkdir()
+        subprocess.run(["git", "init", "-b", "main"], cwd=repo, capture_output=True)
+        (repo / "real").mkdir()
+        (repo / "linked").symlink_to(repo / "real")
+
+        result = _create_git_worktree_sync(str(repo), "abcd1234", subdir)
+        assert result["success"] is False
+        assert result["error"] == error
+
+    def test_not_a_repo(self, tmp_path):
+        """Creating a worktree outside a repo reports a clear error."""
+        result = _create_git_worktree_sync(str(tmp_path), "abcd1234")
+        assert result["success"] is False
+        assert result["error"] == "Not a git repository"
+
+
+class TestRepoNameFromUrl:
+    """Test extracting the repository name from remote URLs."""
+
+    @pytest.mark.parametrize("url", [
+        "https://github.com/user/repo.git",
+        "https://github.com/user/repo/",
+        "git@github.com:user/repo.git",
+        "ssh://git@github.com/user/repo",
+        "git@host:repo.git",
+    ])
+    def test_url_forms(self, url):
+        """Every common remote URL form should yield the bare repo name."""
+        assert _repo_name_from_url(url) == "repo"
+
@@ -7,8 +7,14 @@ These tests validate:
 3. SSE event formatting
 """
 
+import asyncio
+import json
+
 import pytest
-from tests.conftest import MockAgentMessage, TOOL_ID_1, TOOL_ID_2, TOOL_ID_3
+
+from mainthread import server
+from mainthread.server import MessageStreamProcessor, _enqueue_sse_event, thread_subscribers
+from tests.conftest import TOOL_ID_1, TOOL_ID_2, TOOL_ID_3, MockAgentMessage
 
 
 class TestFIFOToolTracking:
@@ -177,3 +183,158 @@ class TestSSEEventFormatting:
                 # In real SDK this might be None, which triggers FIFO fallback
                 # But in our well-formed fixture, it should be present
                 assert tool_use_id is not None
+
+
+class TestSlowSubscribers:
+    """Test bounded SSE queues and slow-client disconnects."""
+
+    def test_full_queue_disconnects_subscriber(self):
+        """A subscriber whose queue is full should be dropped and told to close."""
+        slow: asyncio.Queue = asyncio.Queue(maxsize=2)
+        fast: asyncio.Queue = asyncio.Queue(maxsize=10)
+        thread_subscribers["slow-thread"].update({slow, fast})
+        try:
+            for i in range(3):
+                for queue in list(thread_subscribers["slow-thread"]):
+                    _enqueue_sse_event("slow-thread", queue, {"type": "text_delta", "data": {"i": i}})
+
+            assert thread_subscribers["slow-thread"] == {fast}
+            assert fast.qsize() == 3
+            assert slow.qsize() == 1
+            assert slow.get_nowait()["type"] == "shutdown"
+        finally:
+            thread_subscribers.pop("slow-thread", None)
+
+
+class TestContentBlockSerialization:
+    """Test incremental serialization of streamed content blocks."""
+
+    async def test_cached_json_matches_full_dump(self, temp_db, text_tool_interleaved_sequence):
+        """Cached per-block JSON should always decode to the current blocks."""
+        thread = temp_db.create_thread("Blocks")
+        processor = MessageStreamProcessor(thread["id"])
+        for msg in text_tool_interleaved_sequence:
+            await processor.process_message(msg)
+            assert json.loads(processor.get_content_blocks_json()) == processor.collected_blocks
+
+        await processor.finalize()
+        assert json.loads(processor.get_content_blocks_json()) == processor.collected_blocks
+
+    async def test_deltas_merge_only_into_last_block(self, temp_db):
+        """Text/thinking deltas extend the last block only while it has that type."""
+        thread = temp_db.create_thread("Blocks")
+        processor = MessageStreamProcessor(thread["id"])
+        for msg_type, content in [
+            ("text", "a"), ("text", "b"), ("thinking", "t"), ("thinking", "u"), ("text", "c"),
+        ]:
+            await processor.process_message(MockAgentMessage(type=msg_type, content=content))
+
+        assert [(b["type"], b["content"]) for b in processor.collected_blocks] == [
+            ("text", "ab"), ("thinking", "tu"), ("text", "c"),
+        ]
+
+
+class TestStreamingSaves:
+    """Test coalesced saves of the streaming message."""
+
+    async def test_skipped_save_made_up_after_interval(self, temp_db, monkeypatch):
+        """The last event before an idle stretch is saved without a later event."""
+        monkeypatch.setattr(server, "STREAM_SAVE_INTERVAL_SECONDS", 0.05)
+        thread = temp_db.create_thread("Saves")
+        processor = server.MessageStreamProcessor(thread["id"])
+        await processor.process_message(MockAgentMessage(
+            type="tool_use",
+            content="",
+            metadata={"id": TOOL_ID_1, "name": "Bash", "input": {}},
+        ))
+
+        def saved_blocks():
+            message = temp_db.get_thread(thread["id"])["messages"][-1]
+            return json.loads(message["content_blocks"] or "[]")
+
+        assert saved_blocks() == []
+        await asyncio.sleep(0.15)
+        assert [b["type"] for b in saved_blocks()] == ["tool_use"]
+
+
+class TestTextDeltaCoalescing:
+    """Test batching of consecutive text deltas into one broadcast."""
+
+    async def test_consecutive_text_sent_once_before_tool_use(self, temp_db, broadcasts):
+        """Buffered text must be broadcast as one event, ahead of the next tool_use."""
+        thread = temp_db.create_thread("Coalesce")
+        processor = server.MessageStreamProcessor(thread["id"])
+        for chunk in ["Hel", "lo", " world"]:
+            await processor.process_message(MockAgentMessage(type="text", content=chunk))
+        assert broadcasts == []
+
+        await processor.process_message(MockAgentMessage(
+            type="tool_use",
+            content="",
+            metadata={"id": TOOL_ID_1, "name": "Read", "input": {}},
+        ))
+        assert [e["type"] for e in broadcasts] == ["text_delta", "tool_use"]
+        assert broadcasts[0]["data"] == {"content": "Hello world"}
+
+    async def test_pending_text_flushed_after_window(self, temp_db, broadcasts):
+        """Text should not wait for the next event once the window has passed."""
+        thread = temp_db.create_thread("Coalesce")
+        processor = server.MessageStreamProcessor(thread["id"])
+        await processor.process_message(MockAgentMessage(type="text", content="Hi"))
+        await asyncio.sleep(server.TEXT_DELTA_COALESCE_SECONDS * 4)
+        assert broadcasts == [{"type": "text_delta", "data": {"content": "Hi"}}]
+
+
+class TestNotificationQueue:
+    """Test the bounded per-parent notification queue."""
+
+    async def test_full_queue_merges_pending_notifications(self, monkeypatch):
+        """Overflow should merge notifications rather than drop or block."""
+        queue: asyncio.Queue[str] = asyncio.Queue(maxsize=2)
+        monkeypatch.setitem(server._notification_queues, "parent", queue)
+        for note in ["one", "two", "three"]:
+            await server.run_parent_thread_notification("parent", note)
+
+        assert queue.qsize() == 1
+        assert queue.get_nowait() == "one\ntwo\nthree"
+
+
+class TestParentErrorNotification:
+    """Test the notification sent to a parent when a sub-thread fails."""
+
+    async def test_status_then_persisted_message(self, temp_db, broadcasts):
+        """The status event goes first, followed by the stored notification message."""
+        parent = temp_db.create_thread("Parent")
+        temp_db.update_thread_config(parent["id"], auto_react=False)
+        child = temp_db.create_thread("Child", parent_id=parent["id"])
+        await server._notify_parent_on_subthread_error(child, child["id"], "boom")
+
+        assert [e["type"] for e in broadcasts] == ["subthread_status", "message"]
+        stored = temp_db.get_thread(parent["id"])["messages"]
+        assert stored[-1]["id"] == broadcasts[1]["data"]["message"]["id"]
+        assert "boom" in stored[-1]["content"]
+
+
+class TestStuckThreadRecovery:
+    """Test the watchdog's recovery of threads stuck in running."""
+
+    def test_thread_finished_after_select_not_recovered(self, temp_db, monkeypatch):
+        """Only threads still running when the update lands are returned."""
+        finished = temp_db.create_thread("Finished")
+        stuck = temp_db.create_thread("Stuck")
+        for thread in (finished, stuck):
+            temp_db.update_thread_status(thread["id"], "running")
+
+        def select_then_finish(max_age_seconds):
+            selected = [
+                temp_db.get_thread(t["id"], include_messages=False) for t in (finished, stuck)
+            ]
+            temp_db.update_thread_status(finished["id"], "done")
+            return selected
+
+        monkeypatch.setattr(server, "get_stuck_running_threads", select_then_finish)
+        recovered = server._recover_stuck_threads_sync()
+
+        assert [t["id"] for t in recovered] == [stuck["id"]]
+        assert temp_db.get_thread(finished["id"])["status"] == "done"
+        assert temp_db.get_thread(stuck["id"])["status"] == "needs_attention"